@@ -1,43 +1,79 @@
 from agents.base_agent import BaseAgent
-from utils.data_loader import fetch_data
+from utils.bars import fetch_bars
+from utils.universe_manager import UniverseManager
 from utils.llm_client import LLMClient
 from utils.news_fetcher import NewsFetcher
-import numpy as np
+from utils import indicators
+from datetime import timedelta
 import config
 
+
+def format_price(value):
+    """Price for prompts, 'n/a' for an unavailable indicator."""
+    return f"${value:.2f}" if value is not None else "n/a"
+
+
 class Analyst(BaseAgent):
     def __init__(self):
         super().__init__(name="Analyst", role="Research Analyst")
         self.llm = LLMClient() if config.USE_AI else None
         self.news_fetcher = NewsFetcher(config.NEWS_API_KEY) if config.ENABLE_NEWS else None
+        self.universe_mgr = UniverseManager()
 
-    def run(self, ticker):
+    def run(self, ticker, interval=None):
         """
         Analyzes a specific ticker in depth.
         Returns a dictionary with metrics and AI analysis.
+        
+        Args:
+            ticker (str): Ticker symbol
+            interval (str): Bar interval (default config.BAR_INTERVAL); moving
+                            averages span the same time at any interval
         """
+        interval = interval or config.BAR_INTERVAL
         self.log(f"Analyzing {ticker}...")
-        df = fetch_data(ticker, period="1y")
+        asset_type = self.universe_mgr.get_asset_type(ticker)
+        days = None
+        if interval != '1d':
+            # Enough intraday history for the 200-day average (capped by what Yahoo serves)
+            days = max(config.INTRADAY_LOOKBACK_DAYS, indicators.calendar_days('200d', asset_type))
+        df = fetch_bars(ticker, interval, days)
         
         if df is None or df.empty:
             return None
-
+        
+        # Volatility, drawdown and return cover the lookback period only
+        recent = df
+        if interval != '1d':
+            start = df.index[-1].normalize() - timedelta(days=config.INTRADAY_LOOKBACK_DAYS - 1)
+            recent = df[df.index >= start]
+        
         # Calculate technical metrics
-        volatility = self.calculate_volatility(df)
-        max_drawdown = self.calculate_max_drawdown(df)
-        trend_strength = self.calculate_trend_strength(df)
+        volatility = self.calculate_volatility(recent, indicators.periods_per_year(interval, asset_type))
+        max_drawdown = self.calculate_max_drawdown(recent)
+        trend_strength = self.calculate_trend_strength(recent)
         
-        # Get current price and moving averages
-        current_price = float(df['Close'].iloc[-1])
-        sma50 = float(df['Close'].rolling(window=50).mean().iloc[-1]) if len(df) >= 50 else current_price
-        sma200 = float(df['Close'].rolling(window=200).mean().iloc[-1]) if len(df) >= 200 else current_price
+        # Get current price and moving averages (None if the history is too short)
+        closes = indicators.as_array(df['Close'])
+        current_price = float(closes[-1])
+        n50, n200, n20 = (indicators.window_bars(w, interval, asset_type) for w in ('50d', '200d', '20d'))
+        sma50 = float(indicators.sma(closes, n50)[-1]) if len(closes) >= n50 else None
+        sma200 = float(indicators.sma(closes, n200)[-1]) if len(closes) >= n200 else None
+        if sma50 is None or sma200 is None:
+            self.log(f"Not enough {interval} history for the 50/200-day averages of {ticker} ({len(closes)} bars)")
+        # Average daily volume, whatever the bar size
+        avg_volume = (float(indicators.sma(indicators.as_array(df['Volume']), n20)[-1])
+                      * indicators.bars_per_day(interval, asset_type)) if len(closes) >= n20 else 0.0
+        lookback = "1-Year" if interval == '1d' else f"{config.INTRADAY_LOOKBACK_DAYS}-Day"
         
         analysis_result = {
             'ticker': ticker,
+            'interval': interval,
             'current_price': current_price,
             'sma50': sma50,
             'sma200': sma200,
             'volatility': volatility,
+            'avg_volume': avg_volume,
             'max_drawdown': max_drawdown,
             'trend_strength': trend_strength,
             'ai_outlook': None,
@@ -50,11 +86,11 @@ class Analyst(BaseAgent):
 
 Ticker: {ticker}
 Price: ${current_price:.2f}
-50-day Average: ${sma50:.2f}
-200-day Average: ${sma200:.2f}
+50-day Average: {format_price(sma50)}
+200-day Average: {format_price(sma200)}
 Annual Volatility: {volatility*100:.1f}%
-1-Year Max Drawdown: {max_drawdown*100:.1f}%
-1-Year Return: {trend_strength*100:.1f}%
+{lookback} Max Drawdown: {max_drawdown*100:.1f}%
+{lookback} Return: {trend_strength*100:.1f}%
 
 Provide a brief 2-sentence technical summary of the current market position and trend."""
             
@@ -67,21 +103,14 @@ Provide a brief 2-sentence technical summary of the current market position and
         
         return analysis_result
 
-    def calculate_volatility(self, df):
+    def calculate_volatility(self, df, periods_per_year=indicators.TRADING_DAYS_PER_YEAR):
         # Annualized volatility
-        returns = df['Close'].pct_change().dropna()
-        vol = returns.std() * np.sqrt(252)
-        return float(vol)
+        return indicators.volatility(df['Close'], periods_per_year)
 
     def calculate_max_drawdown(self, df):
         # Max percentage drop from peak
-        prices = df['Close']
-        rolling_max = prices.cummax()
-        drawdown = (prices - rolling_max) / rolling_max
-        return float(drawdown.min())
+        return indicators.max_drawdown(df['Close'])
 
     def calculate_trend_strength(self, df):
         # A simple metric: returns over the period
-        start_price = df['Close'].iloc[0]
-        end_price = df['Close'].iloc[-1]
-        return float((end_price - start_price) / start_price)
+        return indicators.total_return(df['Close'])
@@ -5,8 +5,12 @@ from agents.risk_manager import RiskManager
 from agents.execution import ExecutionAgent
 from agents.reporting import ReportingAgent
 from agents.portfolio_manager import PortfolioManager
+from agents.session import TradingSession
 from agents.strategies.trend_strategy import TrendStrategy
 from agents.strategies.gemini_strategy import GeminiStrategy
+from utils.order_book import OrderBook
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import time
 import config
 from datetime import datetime
@@ -22,6 +26,7 @@ class Captain(BaseAgent):
         self.executor = ExecutionAgent()
         self.reporter = ReportingAgent()
         self.portfolio_mgr = PortfolioManager()
+        self.order_book = OrderBook(self.executor.exposure.universe_mgr)
         
         # Strategies (List of active strategies)
         # Use AI strategy if enabled, otherwise fallback to simple trend
@@ -32,8 +37,17 @@ class Captain(BaseAgent):
             self.strategies = [TrendStrategy()]
             self.log("Using rule-based trend strategy")
 
-    def start_day(self):
-        self.log("Starting Daily Trading Session...")
+    def start_day(self, interval=None):
+        """
+        Run one trading session.
+        
+        Args:
+            interval (str): Analysis bar interval (default config.BAR_INTERVAL). With
+                            intraday bars ('1h', ...) the session can run every hour;
+                            cached past days are not downloaded again.
+        """
+        interval = interval or config.BAR_INTERVAL
+        self.log(f"Starting Trading Session ({interval} bars)...")
         
         # 1. Check Portfolio State
         # Update live values first to ensure dashboard and logic are in sync
@@ -54,88 +68,108 @@ class Captain(BaseAgent):
         
         daily_trades_count = 0 
         rejection_reasons = []
+        self.order_book.clear()
+        signals = []
 
-        # 3. Scan Market
-        candidates = self.scanner.run()
+        # 3. Scan Market - candidates entering the running top-K are analyzed while the scan continues
+        trading = guidance['strategy'] != 'HOLD' and max_new_trades > 0
+        pool = ThreadPoolExecutor(max_workers=config.ANALYSIS_WORKERS) if trading else None
+        analyses = {}
+        try:
+            on_candidate = self._early_analysis(pool, analyses, interval) if pool else None
+            candidates = self.scanner.run(held=list(portfolio.get('holdings', {})), on_candidate=on_candidate)
+        
+            # Reuse the scan's price history (leaders and current holdings) for portfolio-level risk checks
+            self.risk_manager.load_history(self.scanner.history)
         
-        # Stop if portfolio manager says HOLD
-        if guidance['strategy'] == 'HOLD':
-            self.log("Portfolio Manager advises HOLD - skipping trading")
-            self.executor.set_daily_summary({
-                'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                'action': 'HOLD',
-                'reason': guidance['reason'],
-                'trades_count': 0
-            })
-            self.reporter.generate_daily_report()
-            self.log("Daily Session Complete.")
-            return
+            # Stop if portfolio manager says HOLD
+            if guidance['strategy'] == 'HOLD':
+                self.log("Portfolio Manager advises HOLD - skipping trading")
+                self.executor.set_daily_summary({
+                    'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    'action': 'HOLD',
+                    'reason': guidance['reason'],
+                    'trades_count': 0
+                })
+                self.reporter.generate_daily_report()
+                self.log("Daily Session Complete.")
+                return
         
-        for candidate in candidates:
-            # Check if we've hit the portfolio manager's limit
-            if daily_trades_count >= max_new_trades:
-                self.log(f"Reached portfolio manager limit ({max_new_trades} new positions)")
-                rejection_reasons.append("Reached max daily positions limit")
-                break
+            for candidate in candidates:
+                # Nothing to allocate if the portfolio manager allows no new positions
+                if max_new_trades <= 0:
+                    self.log(f"Reached portfolio manager limit ({max_new_trades} new positions)")
+                    rejection_reasons.append("Reached max daily positions limit")
+                    break
             
-            ticker = candidate['ticker']
-            self.log(f"Processing candidate: {ticker}")
+                ticker = candidate['ticker']
+                self.log(f"Processing candidate: {ticker}")
             
-            # 3. Analyze Deeply
-            analysis = self.analyst.run(ticker)
-            if not analysis:
-                rejection_reasons.append(f"{ticker}: Analysis failed")
-                continue
+                # 3. Analyze Deeply
+                analysis = self._analysis(ticker, analyses, interval)
+                if not analysis:
+                    rejection_reasons.append(f"{ticker}: Analysis failed")
+                    continue
                 
-            # 4. Ask Strategies
-            for strategy in self.strategies:
-                # For AI strategies, pass the full analysis and portfolio context
-                if hasattr(strategy, 'run') and strategy.name == 'GeminiAI':
-                    signal = strategy.run(ticker, analysis, portfolio_context=portfolio)
-                else:
-                    # Traditional strategies just need the ticker
-                    signal = strategy.run(ticker)
+                # 4. Ask Strategies
+                for strategy in self.strategies:
+                    # For AI strategies, pass the full analysis and portfolio context
+                    if hasattr(strategy, 'run') and strategy.name == 'GeminiAI':
+                        signal = strategy.run(ticker, analysis, portfolio_context=portfolio)
+                    else:
+                        # Traditional strategies just need the ticker
+                        signal = strategy.run(ticker)
                 
-                # If we have a signal
-                if signal['signal'] in ['BUY', 'SELL']:
-                    self.log(f"Strategy {strategy.name} generated {signal['signal']} for {ticker} ({signal['confidence']*100:.0f}%)")
+                    # If we have a signal
+                    if signal['signal'] in ['BUY', 'SELL']:
+                        self.log(f"Strategy {strategy.name} generated {signal['signal']} for {ticker} ({signal['confidence']*100:.0f}%)")
                     
-                    # Add Ticker to signal for context (if not already there)
-                    if 'ticker' not in signal:
-                        signal['ticker'] = ticker
+                        # Add Ticker to signal for context (if not already there)
+                        if 'ticker' not in signal:
+                            signal['ticker'] = ticker
                     
-                    # Ensure price is set
-                    if 'price' not in signal or signal['price'] == 0:
-                        signal['price'] = analysis.get('current_price', 0)
+                        # Ensure price is set
+                        if 'price' not in signal or signal['price'] == 0:
+                            signal['price'] = analysis.get('current_price', 0)
                     
-                    # 5. Risk Check
-                    is_safe, reason = self.risk_manager.validate_trade(signal, portfolio, daily_trades_count)
+                        # Liquidity context for the fill simulator
+                        signal.setdefault('avg_volume', analysis.get('avg_volume'))
+                        signal.setdefault('volatility', analysis.get('volatility'))
                     
-                    if is_safe:
-                        self.log(f"Risk Check Passed. Executing...")
-                        
-                        # Calculate Quantity
-                        quantity = self.risk_manager.calculate_position_size(signal, portfolio)
-                        if quantity > 0:
-                            success = self.executor.execute_order(signal, quantity)
-                            if success:
-                                daily_trades_count += 1
-                                # Refresh portfolio state for next loop
-                                portfolio = self.executor.get_portfolio_state()
-                            else:
-                                self.log("Execution failed.")
-                                rejection_reasons.append(f"{ticker}: Execution failed (funds?)")
-                        else:
-                            self.log("Calculated quantity is 0 (insufficient funds?).")
-                            rejection_reasons.append(f"{ticker}: Position size 0 (insufficient funds)")
+                        signals.append(signal)
                     else:
-                        self.log(f"Risk Check Failed: {reason}")
-                        rejection_reasons.append(f"{ticker}: Risk check ({reason})")
-                else:
-                    self.log(f"No trade signal from {strategy.name} for {ticker}")
-                    rejection_reasons.append(f"{ticker}: No signal from {strategy.name}")
+                        self.log(f"No trade signal from {strategy.name} for {ticker}")
+                        rejection_reasons.append(f"{ticker}: No signal from {strategy.name}")
+        finally:
+            # Analyses started for candidates that were displaced later (or before an error) are not needed
+            if pool:
+                pool.shutdown(wait=False, cancel_futures=True)
 
-        # 6. End of Day Reporting
+        # 5. Risk Check: validate and size all signals together, most confident first
+        accepted, quantities, reasons = self.risk_manager.validate_many(
+            signals, portfolio, daily_trades_count, max_trades=max_new_trades)
+        for signal, is_safe, quantity, reason in zip(signals, accepted, quantities, reasons):
+            if is_safe:
+                self.log(f"Risk Check Passed: {signal['signal']} {quantity} {signal['ticker']}. Queuing order...")
+                self.order_book.add(signal, int(quantity))
+                daily_trades_count += 1
+            else:
+                self.log(f"Risk Check Failed: {reason}")
+                rejection_reasons.append(f"{signal['ticker']}: Risk check ({reason})")
+
+        # 6. Execute the session's orders as one netted batch
+        if len(self.order_book):
+            orders = self.order_book.net()
+            fills = self.executor.execute_batch(orders)
+            self.log(f"Executed {len(fills)}/{len(orders)} netted orders ({len(self.order_book)} queued)")
+            if len(fills) < len(orders):
+                filled = {fill['ticker'] for fill in fills}
+                rejection_reasons.extend(f"{signal['ticker']}: Execution failed (funds?)"
+                                         for signal, _ in orders if signal['ticker'] not in filled)
+            daily_trades_count = len(fills)
+            self.order_book.clear()
+
+        # 7. End of Day Reporting
         summary_action = "TRADED" if daily_trades_count > 0 else "NO_TRADES"
         if daily_trades_count == 0:
             if not candidates:
@@ -163,6 +197,65 @@ class Captain(BaseAgent):
         self.reporter.generate_daily_report()
         self.log("Daily Session Complete.")
 
+    def _early_analysis(self, pool, analyses, interval):
+        """
+        Build the scanner callback that starts analyzing candidates on the pool as
+        soon as they enter the scan's running top-K.
+        
+        Args:
+            pool (ThreadPoolExecutor): Runs the analyses
+            analyses (dict): Filled with ticker -> Future of (ran, analysis)
+            interval (str): Analysis bar interval
+            
+        Returns:
+            callable: on_candidate(candidate, leader_tickers) for MarketScanner.run
+        """
+        leaders = set()
+        lock = threading.Lock()
+
+        def analyze(ticker):
+            # Candidates displaced while queued are skipped (no wasted AI calls)
+            with lock:
+                if ticker not in leaders:
+                    return False, None
+            return True, self.analyst.run(ticker, interval)
+
+        def on_candidate(candidate, leader_tickers):
+            with lock:
+                leaders.clear()
+                leaders.update(leader_tickers)
+            if candidate['ticker'] not in analyses:
+                analyses[candidate['ticker']] = pool.submit(analyze, candidate['ticker'])
+
+        return on_candidate
+
+    def _analysis(self, ticker, analyses, interval):
+        """Result of the analysis started during the scan, or a fresh one if it was skipped."""
+        future = analyses.get(ticker)
+        if future is not None and not future.cancelled():
+            ran, analysis = future.result()
+            if ran:
+                return analysis
+        return self.analyst.run(ticker, interval)
+
+    def run_session(self, feed, interval=None):
+        """
+        Continuous session mode: trade on every bar of a feed (e.g. utils.feeds.ReplayFeed)
+        instead of the one-shot daily scan.
+        
+        Returns:
+            dict: Session report with counters and per-bar latency
+        """
+        session = TradingSession(self.risk_manager, self.executor, self.strategies, interval)
+        report = session.run(feed)
+        self.executor.set_daily_summary({
+            'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'action': "TRADED" if report['fills'] else "NO_TRADES",
+            'reason': f"Event-driven session: {report['bars']} bars, {report['fills']} fills.",
+            'trades_count': report['fills']
+        })
+        return report
+
 if __name__ == "__main__":
     captain = Captain()
     captain.start_day()
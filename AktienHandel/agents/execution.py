@@ -1,17 +1,33 @@
 from agents.base_agent import BaseAgent
+from utils.exposure import ExposureBook
+from utils.equity_curve import EquityCurve
+from utils.journal import PortfolioJournal, apply_fill
+from utils.fill_model import FillModel
 import config
-import json
-import csv
 import os
 from datetime import datetime
 import pandas as pd
 
 class ExecutionAgent(BaseAgent):
-    def __init__(self):
+    def __init__(self, data_dir=None):
+        """
+        Args:
+            data_dir (str): Keep an isolated portfolio in this directory (simulations,
+                            load tests) instead of the configured data files
+        """
         super().__init__(name="Executor", role="Paper Broker")
-        self.portfolio_file = config.PORTFOLIO_FILE
-        self.trade_log_file = config.TRADE_LOG_FILE
-        self.initialize_portfolio()
+        path = lambda default: os.path.join(data_dir, os.path.basename(default)) if data_dir else default
+        self.portfolio_file = path(config.PORTFOLIO_FILE)
+        self.trade_log_file = path(config.TRADE_LOG_FILE)
+        self.exposure = ExposureBook()
+        self.equity_curve = EquityCurve(path(config.EQUITY_CURVE_FILE))
+        self.fill_model = FillModel() if config.ENABLE_FILL_SIMULATION else None
+        self.journal = PortfolioJournal(
+            self.portfolio_file, self.trade_log_file,
+            path(config.PORTFOLIO_WAL_FILE), path(config.PORTFOLIO_LOCK_FILE)
+        )
+        with self.journal.lock:
+            self.initialize_portfolio()
 
     def initialize_portfolio(self):
         """Creates portfolio file if it doesn't exist."""
@@ -28,15 +44,19 @@ class ExecutionAgent(BaseAgent):
             self.log("Initialized new portfolio.")
         
         # Ensure log file exists/header
-        if not os.path.exists(self.trade_log_file):
-            with open(self.trade_log_file, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(['Date', 'Ticker', 'Action', 'Quantity', 'Price', 'Total', 'Reason'])
+        self.journal.trade_log.ensure_header()
 
-    def get_portfolio_state(self):
+    def get_portfolio_state(self, prices=None):
+        """
+        Portfolio state valued at current prices.
+        
+        Args:
+            prices (dict): Optional ticker -> price already known (e.g. from a bar feed);
+                           only holdings missing from it are fetched
+        """
         try:
-            with open(self.portfolio_file, 'r') as f:
-                state = json.load(f)
+            # Snapshot plus any fills replayed from the write-ahead log
+            state = self.journal.load()
             
             # Calculate current total value including stock positions
             total_value = state.get('cash', 0)
@@ -45,6 +65,11 @@ class ExecutionAgent(BaseAgent):
             # Add value of all stock positions at current prices
             from utils.data_loader import fetch_data
             for ticker, quantity in holdings.items():
+                if prices and ticker in prices:
+                    current_price = float(prices[ticker])
+                    total_value += current_price * quantity
+                    state.setdefault('current_prices', {})[ticker] = current_price
+                    continue
                 df = fetch_data(ticker, period="1d")
                 if df is not None and not df.empty:
                     close_val = df['Close'].iloc[-1]
@@ -56,10 +81,15 @@ class ExecutionAgent(BaseAgent):
             
             state['total_value'] = total_value
             
+            # Market values per position / asset class from this price snapshot
+            self.exposure.rebuild(holdings, state.get('current_prices', {}))
+            state['exposure'] = self.exposure.to_dict()
+            
             # Calculate performance metrics
             initial_value = config.INITIAL_CASH
             state['profit_loss'] = total_value - initial_value
             state['return_pct'] = ((total_value - initial_value) / initial_value) * 100
+            state['drawdown_pct'] = self.equity_curve.current_drawdown(total_value) * 100
             
             # Add recent trades summary
             state['recent_trades'] = self._get_recent_trades(5)
@@ -79,111 +109,187 @@ class ExecutionAgent(BaseAgent):
             }
     
     def _get_recent_trades(self, count=5):
-        """Get recent trades from the trade log."""
+        """Get recent trades from the end of the trade log (ring buffer, no full parse)."""
         try:
-            import csv
-            if not os.path.exists(self.trade_log_file):
-                return []
-            
-            with open(self.trade_log_file, 'r', encoding='utf-8', errors='replace') as f:
-                reader = csv.DictReader(f)
-                trades = list(reader)
-                return trades[-count:] if trades else []
+            return self.journal.trade_log.tail(count)
         except Exception as e:
             return []
 
+    def count_trades(self, day):
+        """
+        Trades logged on a calendar day. The log is in time order, so only its
+        tail is read (a past day with later trades after it counts as 0).
+        
+        Args:
+            day (date): Trading day
+        """
+        prefix = day.isoformat()
+        count = 50
+        while True:
+            try:
+                rows = self.journal.trade_log.tail_rows(count)
+            except OSError:
+                return 0
+            trades = 0
+            for row in reversed(rows):
+                if not row or not row[0].startswith(prefix):
+                    break
+                trades += 1
+            if trades < len(rows) or len(rows) < count:
+                return trades
+            count *= 2
+
     def save_portfolio(self, state):
-        with open(self.portfolio_file, 'w') as f:
-            json.dump(state, f, indent=4)
+        """Atomically snapshot state (cash/holdings always come from the journal)."""
+        self.journal.checkpoint(state)
 
     def execute_order(self, signal, quantity):
         """
         Executes the order and updates portfolio/logs.
+        Holds the portfolio lock so concurrent sessions cannot interleave fills.
+        """
+        return len(self.execute_batch([(signal, quantity)])) > 0
+
+    def execute_batch(self, orders, prices=None):
+        """
+        Executes a batch of orders as one transaction.
+        Sells are filled first so their proceeds fund the buys; cash is checked in one
+        pass, then the portfolio is revalued, journaled and saved once.
+
+        Args:
+            orders (list): (signal, quantity) tuples, e.g. from OrderBook.net()
+            prices (dict): Optional known ticker -> price for the valuation (see get_portfolio_state)
+
+        Returns:
+            list: Fill dicts of the executed orders
         """
+        if not orders:
+            return []
+        with self.journal.lock:
+            state = self.get_portfolio_state(prices)
+            ordered = [o for o in orders if o[0].get('signal') == 'SELL'] + \
+                      [o for o in orders if o[0].get('signal') == 'BUY']
+
+            fills = []
+            for signal, quantity in ordered:
+                fill = self._build_fill(signal, quantity, state)
+                if fill:
+                    apply_fill(state, fill)
+                    self.exposure.apply_fill(fill['ticker'], fill['action'], fill['quantity'], fill['price'])
+                    fills.append(fill)
+
+            if not fills:
+                return []
+
+            self._revalue(state, {fill['ticker']: fill['price'] for fill in fills}, prices)
+            
+            # WAL -> trade log -> atomic snapshot, replayed on startup if interrupted
+            self.journal.commit(state, fills)
+            return fills
+
+    def _build_fill(self, signal, quantity, state):
+        """Price one order against the current (in-transaction) cash and holdings."""
         ticker = signal.get('ticker')
         action = signal.get('signal')
         price = signal.get('price')
         reason = signal.get('reason')
         
-        state = self.get_portfolio_state()
         cash = state['cash']
         holdings = state['holdings']
         
-        total_cost = price * quantity
+        fees = 0.0
+        if self.fill_model:
+            is_crypto = self.exposure.universe_mgr.is_crypto(ticker)
+            liquidity = (signal.get('avg_volume'), signal.get('volatility'), is_crypto)
+            if action == 'BUY':
+                # Slippage and fees may push a full-cash order over budget; trim it
+                quantity = min(quantity, self.fill_model.max_affordable(cash, price, *liquidity))
+            result = self.fill_model.fill(price, quantity, action, *liquidity)
+            if result['filled_qty'] <= 0:
+                self.log(f"Execution Failed: No fill for {ticker} (insufficient liquidity or funds)")
+                return None
+            if result['filled_qty'] < quantity:
+                self.log(f"Partial fill: {result['filled_qty']}/{quantity} {ticker}")
+            quantity = result['filled_qty']
+            price = result['fill_price']  # Unrounded, so quantity * price +/- fees == total
+            fees = result['fees']
+            total_cost = abs(result['cash_flow'])  # BUY: notional + fees, SELL: notional - fees
+        else:
+            total_cost = price * quantity
         
         if action == 'BUY':
             if cash < total_cost:
                 self.log("Execution Failed: Insufficient funds (Race condition?)")
-                return False
-            
-            cash -= total_cost
-            holdings[ticker] = holdings.get(ticker, 0) + quantity
-            self.log(f"BOUGHT {quantity} {ticker} @ {price}")
+                return None
+            self.log(f"BOUGHT {quantity} {ticker} @ {round(price, 4)}" + (f" (fees {fees:.2f})" if fees else ""))
             
         elif action == 'SELL':
             current_qty = holdings.get(ticker, 0)
             if current_qty < quantity:
                 self.log("Execution Failed: Not enough shares")
-                return False
-                
-            cash += total_cost
-            holdings[ticker] = current_qty - quantity
-            if holdings[ticker] == 0:
-                del holdings[ticker]
-            self.log(f"SOLD {quantity} {ticker} @ {price}")
-
-        # Update State
-        state['cash'] = cash
-        state['holdings'] = holdings
-        
-        # Calculate total_value including all stock holdings
-        total_value = cash
+                return None
+            self.log(f"SOLD {quantity} {ticker} @ {round(price, 4)}" + (f" (fees {fees:.2f})" if fees else ""))
+
+        fill = {
+            'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'ticker': ticker,
+            'action': action,
+            'quantity': quantity,
+            'price': price,
+            'total': total_cost,
+            'fees': fees,
+            'reason': reason
+        }
+        return fill
+
+    def _revalue(self, state, fill_prices, known_prices=None):
+        """
+        Recompute total value and performance metrics once after a batch of fills.
+        Known prices (e.g. from a feed) come first, then this batch's fill prices,
+        then prices already fetched by get_portfolio_state; only positions with
+        none of these are fetched.
+        """
+        prices = state.setdefault('current_prices', {})
+        # Closed positions keep no price (a stale one would value a later re-buy)
+        for ticker_symbol in [t for t in prices if t not in state['holdings']]:
+            del prices[ticker_symbol]
+        total_value = state['cash']
         from utils.data_loader import fetch_data
-        for ticker_symbol, qty in holdings.items():
-            try:
-                df = fetch_data(ticker_symbol, period="1d")
-                if df is not None and not df.empty:
-                    close_val = df['Close'].iloc[-1]
-                    if isinstance(close_val, pd.Series):
-                        close_val = close_val.iloc[0]
-                    current_price = float(close_val)
-                    total_value += current_price * qty
-                    state.setdefault('current_prices', {})[ticker_symbol] = current_price
-            except Exception as e:
-                self.log(f"Warning: Could not fetch price for {ticker_symbol}: {e}")
-                # Fallback: use the trade price if it's the ticker we just traded
-                if ticker_symbol == ticker:
-                    total_value += price * qty
+        for ticker_symbol, qty in state['holdings'].items():
+            if known_prices and ticker_symbol in known_prices:
+                prices[ticker_symbol] = float(known_prices[ticker_symbol])
+            elif ticker_symbol in fill_prices:
+                prices[ticker_symbol] = float(fill_prices[ticker_symbol])
+            if ticker_symbol not in prices:
+                try:
+                    df = fetch_data(ticker_symbol, period="1d")
+                    if df is not None and not df.empty:
+                        close_val = df['Close'].iloc[-1]
+                        if isinstance(close_val, pd.Series):
+                            close_val = close_val.iloc[0]
+                        prices[ticker_symbol] = float(close_val)
+                except Exception as e:
+                    self.log(f"Warning: Could not fetch price for {ticker_symbol}: {e}")
+            current_price = prices.get(ticker_symbol)
+            if current_price is not None:
+                total_value += current_price * qty
+                self.exposure.update_price(ticker_symbol, current_price)
         
         state['total_value'] = total_value
+        state['exposure'] = self.exposure.to_dict()
         
         # Calculate performance metrics
         initial_value = config.INITIAL_CASH
         state['profit_loss'] = total_value - initial_value
         state['return_pct'] = ((total_value - initial_value) / initial_value) * 100
-        
-        
-        # Track last trade
-        state['last_trade'] = {
-            'ticker': ticker,
-            'action': action,
-            'quantity': quantity,
-            'price': price,
-            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-        state['trade_count'] = state.get('trade_count', 0) + 1
-        
-        self.save_portfolio(state)
-        self.log_trade(ticker, action, quantity, price, total_cost, reason)
-        return True
+        state['drawdown_pct'] = self.equity_curve.append(total_value) * 100
 
     def log_trade(self, ticker, action, quantity, price, total, reason):
-        with open(self.trade_log_file, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                ticker, action, quantity, price, total, reason
-            ])
+        self.journal.append_trade_rows([{
+            'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'ticker': ticker, 'action': action, 'quantity': quantity,
+            'price': price, 'total': total, 'reason': reason
+        }])
 
     def update_live_values(self):
         """
@@ -191,8 +297,11 @@ class ExecutionAgent(BaseAgent):
         Useful for dashboard synchronization.
         """
         # get_portfolio_state already fetches live prices
-        state = self.get_portfolio_state()
-        self.save_portfolio(state)
+        with self.journal.lock:
+            state = self.get_portfolio_state()
+            if state.get('total_value', 0) > 0:
+                state['drawdown_pct'] = self.equity_curve.append(state['total_value']) * 100
+            self.save_portfolio(state)
         # self.log(f"Portfolio valuation updated: EUR {state['total_value']:.2f}")
         return state
 
@@ -201,6 +310,7 @@ class ExecutionAgent(BaseAgent):
         Updates the daily summary in portfolio.json to explain what happened today.
         summary_data: dict with keys 'date', 'action', 'reason', 'trades'
         """
-        state = self.get_portfolio_state()
-        state['last_session'] = summary_data
-        self.save_portfolio(state)
+        with self.journal.lock:
+            state = self.get_portfolio_state()
+            state['last_session'] = summary_data
+            self.save_portfolio(state)
@@ -1,8 +1,209 @@
 from agents.base_agent import BaseAgent
-from utils.data_loader import fetch_data, fetch_batch_data, get_ticker_info, passes_filters
+from utils.data_loader import fetch_data, fetch_batch_data, get_ticker_info, passes_filters, get_shared_panel, split_rate_limits
 from utils.universe_manager import UniverseManager
+from utils import indicators
+from utils.top_k import TopK
+from utils.price_panel import PricePanel
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
 import config
 
+
+def analyze_ticker(ticker, df, asset_type):
+    """
+    Analyze a single ticker for interesting signals.
+    Module-level so scan shards can run it in worker processes.
+    
+    Args:
+        ticker (str): Ticker symbol
+        df (DataFrame): Price data, or a field -> array mapping (e.g. PricePanel.view)
+        asset_type (str): 'stock' or 'crypto'
+        
+    Returns:
+        tuple: (candidate dict or None, rejection reason or None)
+    """
+    # Ensure we have enough data (check for NON-NaN data)
+    closes = indicators.as_array(df['Close'])
+    valid = ~np.isnan(closes)
+    valid_closes = closes[valid]
+    if len(valid_closes) < 50:
+        return None, 'insufficient_data'
+
+    current_price = valid_closes[-1]
+    
+    # Simple technical checks
+    sma50 = indicators.sma(valid_closes, 50)[-1]
+    sma20 = indicators.sma(valid_closes, 20)[-1]
+    
+    # Calculate momentum (20-day return)
+    momentum = indicators.momentum(valid_closes, 20)
+    
+    # Calculate volume trend (fill info if volume missing)
+    if 'Volume' in df:
+        volume = indicators.as_array(df['Volume'])[valid]
+        avg_volume = indicators.sma(volume, 20)[-1]
+        recent_volume = volume[-5:].mean()
+        volume_ratio = recent_volume / avg_volume if avg_volume > 0 else 1
+    else:
+        volume_ratio = 1.0
+    
+    return screen_candidate(ticker, asset_type, current_price, sma50, sma20, momentum, volume_ratio)
+
+
+def screen_candidate(ticker, asset_type, current_price, sma50, sma20, momentum, volume_ratio):
+    """
+    Screening criteria on precomputed indicators (shared by the scan and the
+    event-driven session, which maintains the indicators incrementally).
+    
+    Returns:
+        tuple: (candidate dict or None, rejection reason or None)
+    """
+    # Different criteria for stocks vs crypto
+    if asset_type == 'crypto':
+        # Crypto: Look for strong momentum and volume
+        if momentum > 0.05 and volume_ratio > 1.0:  # 5% gain with volume
+            return {
+                'ticker': ticker,
+                'asset_type': 'crypto',
+                'reason': 'Crypto momentum with volume',
+                'price': float(current_price),
+                'sma50': float(sma50),
+                'sma20': float(sma20),
+                'momentum': float(momentum),
+                'volume_ratio': float(volume_ratio),
+                'score': float(momentum * 2 + volume_ratio)  # Prioritize momentum for crypto
+            }, None
+    else:
+        # Stocks: Traditional trend following
+        # Price > SMA50 or strong recent momentum
+        if current_price > sma50 or momentum > 0.03:
+            return {
+                'ticker': ticker,
+                'asset_type': 'stock',
+                'reason': 'Above SMA50' if current_price > sma50 else 'Positive momentum',
+                'price': float(current_price),
+                'sma50': float(sma50),
+                'sma20': float(sma20),
+                'momentum': float(momentum),
+                'volume_ratio': float(volume_ratio),
+                'score': float((current_price / sma50 - 1) + momentum)
+            }, None
+    
+    return None, 'criteria_fail'
+
+
+def new_scan_stats():
+    return {'total': 0, 'insufficient_data': 0, 'low_momentum': 0, 'accepted': 0, 'fetch_failed': 0}
+
+
+def iter_panels(tickers, period="6mo", chunk_size=100):
+    """
+    Download price data chunk by chunk into compact PricePanels.
+    Each chunk's DataFrames are converted as soon as they arrive and only one
+    chunk's panel is held in memory. Tickers in a fresh published price panel
+    are read from its memory map instead.
+    
+    Args:
+        tickers (list): Tickers to download
+        period (str): History period
+        chunk_size (int): Tickers per batch request (1 = one request per ticker)
+        
+    Yields:
+        tuple: (PricePanel, tickers of the chunk found in it)
+    """
+    panel = get_shared_panel(period)
+    if panel is not None:
+        yield panel, [t for t in tickers if t in panel]
+        tickers = [t for t in tickers if t not in panel]
+    
+    for start in range(0, len(tickers), chunk_size):
+        chunk = tickers[start:start + chunk_size]
+        if len(chunk) == 1:
+            df = fetch_data(chunk[0], period=period)
+            data_dict = {chunk[0]: df} if df is not None else {}
+        else:
+            data_dict = fetch_batch_data(chunk, period=period)
+        panel = PricePanel.from_frames(data_dict)
+        del data_dict
+        yield panel, [t for t in chunk if t in panel]
+
+
+def iter_candidates(tickers, asset_type_of, stats, period="6mo", chunk_size=100, held=(), held_closes=None):
+    """
+    Screening pipeline: download -> analyze -> yield each passing ticker.
+    
+    Args:
+        tickers (list): Tickers to screen
+        asset_type_of (callable): ticker -> 'stock' or 'crypto'
+        stats (dict): Counters (see new_scan_stats), updated in place
+        period (str): History period
+        chunk_size (int): Tickers per batch request
+        held (set): Tickers of current positions
+        held_closes (dict): Receives ticker -> close Series of every held ticker,
+                            whether or not it passes (for the portfolio risk checks)
+        
+    Yields:
+        tuple: (candidate dict, close Series)
+    """
+    stats['total'] += len(tickers)
+    fetched = 0
+    for panel, found in iter_panels(tickers, period, chunk_size):
+        for ticker in found:
+            bars = panel.view(ticker)  # Zero-copy columns of the panel
+            if np.isnan(bars['Close']).all():
+                continue
+            fetched += 1
+            if held_closes is not None and ticker in held:
+                held_closes[ticker] = panel.to_series(ticker)
+            try:
+                candidate, reason = analyze_ticker(ticker, bars, asset_type_of(ticker))
+            except Exception as e:
+                print(f"[Scanner] Error analyzing {ticker}: {e}")
+                candidate, reason = None, 'error'
+            if candidate:
+                stats['accepted'] += 1
+                yield candidate, panel.to_series(ticker)
+            elif reason == 'insufficient_data':
+                stats['insufficient_data'] += 1
+            else:
+                stats['low_momentum'] += 1
+    stats['fetch_failed'] += len(tickers) - fetched
+
+
+def screen_shard(tickers, asset_types, top_k, period="6mo", history_days=None, held=()):
+    """
+    Fetch and screen one shard of the universe (runs in a worker process).
+    
+    Only the shard's top_k candidates and their closes are returned, so memory
+    in the parent stays bounded by shards x top_k regardless of universe size.
+    
+    Args:
+        tickers (list): Tickers in this shard
+        asset_types (list): 'stock'/'crypto' per ticker
+        top_k (int): Candidates to keep from this shard
+        period (str): History period to download
+        history_days (int): Closes to return per kept candidate (for risk checks)
+        held (list): Tickers of current positions, whose closes are returned as well
+        
+    Returns:
+        tuple: (top candidates, stats dict, ticker -> close Series)
+    """
+    stats = new_scan_stats()
+    leaders = TopK(top_k, key=lambda entry: entry[0]['score'])
+    types = dict(zip(tickers, asset_types))
+    trim = lambda closes: closes.iloc[-(history_days or len(closes)):]
+    held_closes = {}
+    for candidate, closes in iter_candidates(tickers, types.get, stats, period, chunk_size=len(tickers),
+                                             held=set(held), held_closes=held_closes):
+        leaders.push((candidate, trim(closes)))
+
+    kept = leaders.items()
+    history = {t: trim(closes) for t, closes in held_closes.items()}
+    history.update((c['ticker'], closes) for c, closes in kept)
+    return [c for c, _ in kept], stats, history
+
+
 class MarketScanner(BaseAgent):
     """
     Intelligent market scanner that efficiently scans large universes.
@@ -12,15 +213,29 @@ class MarketScanner(BaseAgent):
     def __init__(self):
         super().__init__(name="Scanner", role="Market Scout")
         self.universe_mgr = UniverseManager()
+        self.history = {}  # ticker -> close series of the last scan's candidates and held tickers
+        self.held = set()
+        self.on_candidate = None
 
-    def run(self):
+    def run(self, held=None, on_candidate=None):
         """
         Scans the trading universe with intelligent filtering.
         
+        Args:
+            held (list): Tickers of current positions; their closes are kept in
+                         self.history for the risk checks even if they do not pass
+            on_candidate (callable): Called as on_candidate(candidate, leader_tickers)
+                                     whenever a candidate enters the running top-K, so
+                                     analysis can start before the scan finishes (a
+                                     candidate can still be displaced later)
+        
         Returns:
             list: Top candidates for deeper analysis
         """
         self.log("Starting market scan...")
+        self.history = {}
+        self.held = set(held or ())
+        self.on_candidate = on_candidate
         
         # Get universe based on config
         universe = self.universe_mgr.get_universe(
@@ -46,7 +261,10 @@ class MarketScanner(BaseAgent):
         
         # Stage 2: Technical screening
         self.log("Stage 2: Technical screening...")
-        candidates = self._technical_screen(all_tickers)
+        if config.ENABLE_SHARDED_SCAN and len(all_tickers) >= config.SHARDED_SCAN_MIN_TICKERS:
+            candidates = self._sharded_screen(all_tickers)
+        else:
+            candidates = self._technical_screen(all_tickers)
         self.log(f"After technical screening: {len(candidates)} candidates")
         
         # Stage 3: Rank and select top N
@@ -87,143 +305,139 @@ class MarketScanner(BaseAgent):
         
         return filtered
     
+    def stream(self, tickers, leaders, stats=None, held_closes=None):
+        """
+        Screen tickers chunk by chunk and yield each candidate that enters the running top-K.
+        
+        Lets downstream stages start on the current leaders before the scan
+        finishes. A yielded candidate can later be displaced by a stronger one;
+        `leaders` always holds the current top-K.
+        
+        Args:
+            tickers (list): Tickers to screen
+            leaders (TopK): Ranking of (candidate, closes) entries, updated in place
+            stats (dict): Optional counters (see new_scan_stats)
+            held_closes (dict): Receives the closes of held tickers (see iter_candidates)
+            
+        Yields:
+            dict: Candidate that is currently among the top-K
+        """
+        stats = new_scan_stats() if stats is None else stats
+        # Small lists are fetched per ticker, larger ones in batch chunks
+        chunk_size = 1 if len(tickers) <= 20 else config.SCAN_CHUNK_SIZE
+        for candidate, closes in iter_candidates(tickers, self.universe_mgr.get_asset_type, stats, config.SCAN_PERIOD,
+                                                 chunk_size, self.held, held_closes):
+            if leaders.push((candidate, closes)):
+                yield candidate
+    
     def _technical_screen(self, tickers):
         """
         Apply technical filters to identify interesting tickers.
+        Memory is O(TOP_CANDIDATES_COUNT + SCAN_CHUNK_SIZE), not O(universe).
         
         Args:
             tickers (list): List of tickers to screen
             
         Returns:
-            list: Candidates with technical data
+            list: Top candidates with technical data, best first
         """
-        candidates = []
-        stats = {'total': 0, 'insufficient_data': 0, 'low_momentum': 0, 'accepted': 0, 'fetch_failed': 0}
-        
-        # For large universes, batch fetch data
-        if len(tickers) > 20:
-            # Batch processing
-            self.log(f"Batch fetching data for {len(tickers)} tickers...")
-            data_dict = fetch_batch_data(tickers, period="6mo", max_workers=10)
-            
-            stats['total'] = len(tickers)
-            stats['fetch_failed'] = len(tickers) - len(data_dict)
-            
-            for ticker in tickers:
-                if ticker not in data_dict:
-                    continue
-                    
-                df = data_dict[ticker]
-                candidate, reason = self._analyze_ticker(ticker, df)
-                if candidate:
-                    candidates.append(candidate)
-                    stats['accepted'] += 1
-                else:
-                    if reason == 'insufficient_data':
-                        stats['insufficient_data'] += 1
-                    else:
-                        stats['low_momentum'] += 1
-        else:
-            # Sequential processing for small lists
-            stats['total'] = len(tickers)
-            for ticker in tickers:
-                self.log(f"Checking {ticker}...")
-                df = fetch_data(ticker, period="6mo")
-                
-                if df is None or df.empty:
-                    stats['fetch_failed'] += 1
-                    continue
-                
-                candidate, reason = self._analyze_ticker(ticker, df)
-                if candidate:
-                    candidates.append(candidate)
-                    stats['accepted'] += 1
-                else:
-                    if reason == 'insufficient_data':
-                        stats['insufficient_data'] += 1
-                    else:
-                        stats['low_momentum'] += 1
+        stats = new_scan_stats()
+        leaders = TopK(config.TOP_CANDIDATES_COUNT, key=lambda entry: entry[0]['score'])
+        self.log(f"Screening {len(tickers)} tickers in chunks of {config.SCAN_CHUNK_SIZE}...")
+        
+        held_closes = {}
+        for candidate in self.stream(tickers, leaders, stats, held_closes):
+            if self.on_candidate:
+                self.on_candidate(candidate, [c['ticker'] for c, _ in leaders.items()])
+        
+        kept = leaders.items()
+        self.history.update(held_closes)
+        for candidate, closes in kept:
+            self.history[candidate['ticker']] = closes
         
         self.log(f"Screening Stats: Checked {stats['total']} | Failed Fetch: {stats['fetch_failed']} | No Data: {stats['insufficient_data']} | Criteria Fail: {stats['low_momentum']} | Passed: {stats['accepted']}")
-        return candidates
+        return [candidate for candidate, _ in kept]
     
-    def _analyze_ticker(self, ticker, df):
+    def _sharded_screen(self, tickers):
         """
-        Analyze a single ticker for interesting signals.
+        Screen a large universe in shards across a process pool.
+        
+        Each shard is downloaded and screened in a worker; at most
+        SCAN_WORKERS * 2 shards are in flight. Shard results are merged
+        into a global top-k heap as they complete.
         
         Args:
-            ticker (str): Ticker symbol
-            df (DataFrame): Price data
+            tickers (list): List of tickers to screen
             
         Returns:
-            dict: Candidate dict or None
+            list: Top candidates across all shards
         """
-        try:
-            # Ensure we have enough data (check for NON-NaN data)
-            valid_closes = df['Close'].dropna()
-            if len(valid_closes) < 50:
-                return None, 'insufficient_data'
+        size = config.SCAN_SHARD_SIZE
+        top_k = config.TOP_CANDIDATES_COUNT
+        shards = [tickers[i:i + size] for i in range(0, len(tickers), size)]
+        asset_types = [['crypto' if c else 'stock' for c in self.universe_mgr.crypto_mask(shard)] for shard in shards]
+        self.log(f"Sharded scan: {len(shards)} shards of up to {size} tickers on {config.SCAN_WORKERS} workers")
+        
+        stats = new_scan_stats()
+        leaders = TopK(top_k)
+        
+        def merge(result):
+            shard_candidates, shard_stats, closes = result
+            for key in stats:
+                stats[key] += shard_stats[key]
+            for candidate in shard_candidates:
+                if leaders.push(candidate) and self.on_candidate:
+                    self.on_candidate(candidate, [c['ticker'] for c in leaders.items()])
+            self.history.update(closes)
+        
+        args = [(shard, types, top_k, config.SCAN_PERIOD, config.RISK_LOOKBACK_DAYS + 1, [t for t in shard if t in self.held])
+                for shard, types in zip(shards, asset_types)]
+        finished = set()  # Shards merged or given up on
 
-            current_price = valid_closes.iloc[-1]
-            
-            # Simple technical checks
-            sma50 = valid_closes.rolling(window=50).mean().iloc[-1]
-            sma20 = valid_closes.rolling(window=20).mean().iloc[-1]
-            
-            # Calculate momentum (20-day return)
-            momentum = (current_price - valid_closes.iloc[-20]) / valid_closes.iloc[-20]
-            
-            # Calculate volume trend (fill info if volume missing)
-            if 'Volume' in df.columns:
-                avg_volume = df['Volume'].rolling(window=20).mean().iloc[-1]
-                recent_volume = df['Volume'].iloc[-5:].mean()
-                volume_ratio = recent_volume / avg_volume if avg_volume > 0 else 1
-            else:
-                volume_ratio = 1.0
-            
-            # Determine asset type
-            asset_type = self.universe_mgr.get_asset_type(ticker)
-            
-            # Different criteria for stocks vs crypto
-            if asset_type == 'crypto':
-                # Crypto: Look for strong momentum and volume
-                if momentum > 0.05 and volume_ratio > 1.0:  # 5% gain with volume
-                    return {
-                        'ticker': ticker,
-                        'asset_type': 'crypto',
-                        'reason': 'Crypto momentum with volume',
-                        'price': float(current_price),
-                        'sma50': float(sma50),
-                        'sma20': float(sma20),
-                        'momentum': float(momentum),
-                        'volume_ratio': float(volume_ratio),
-                        'score': float(momentum * 2 + volume_ratio)  # Prioritize momentum for crypto
-                    }, None
-            else:
-                # Stocks: Traditional trend following
-                # Price > SMA50 or strong recent momentum
-                if current_price > sma50 or momentum > 0.03:
-                    return {
-                        'ticker': ticker,
-                        'asset_type': 'stock',
-                        'reason': 'Above SMA50' if current_price > sma50 else 'Positive momentum',
-                        'price': float(current_price),
-                        'sma50': float(sma50),
-                        'sma20': float(sma20),
-                        'momentum': float(momentum),
-                        'volume_ratio': float(volume_ratio),
-                        'score': float((current_price / sma50 - 1) + momentum)
-                    }, None
-            
-            return None, 'criteria_fail'
-            
-        except Exception as e:
-            self.log(f"Error analyzing {ticker}: {e}")
-            return None, 'error'
-            
-        except Exception as e:
-            self.log(f"Error analyzing {ticker}: {e}")
-            return None
+        def collect(index, run):
+            try:
+                merge(run())
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                # One shard's data or network error only costs that shard
+                self.log(f"Shard {index + 1}/{len(shards)} failed ({e}), skipping it")
+                stats['total'] += len(shards[index])
+                stats['fetch_failed'] += len(shards[index])
+            finished.add(index)
+
+        try:
+            # Workers download at once, so each gets its share of the rate limits
+            pool = ProcessPoolExecutor(max_workers=config.SCAN_WORKERS, initializer=split_rate_limits,
+                                       initargs=(config.SCAN_WORKERS,))
+        except (OSError, NotImplementedError) as e:
+            # No process support (restricted environment)
+            self.log(f"Process pool unavailable ({e}), screening shards sequentially")
+            pool = None
+        if pool is not None:
+            try:
+                with pool:
+                    pending = {}
+                    for index, shard_args in enumerate(args):
+                        # Bounded concurrency: never queue more than 2 shards per worker
+                        if len(pending) >= config.SCAN_WORKERS * 2:
+                            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                            for future in done:
+                                collect(pending.pop(future), future.result)
+                        pending[pool.submit(screen_shard, *shard_args)] = index
+                    for future in wait(pending).done:
+                        collect(pending[future], future.result)
+            except BrokenProcessPool as e:
+                self.log(f"Process pool failed ({e}), screening the remaining shards sequentially")
+        
+        for index, shard_args in enumerate(args):
+            if index not in finished:
+                collect(index, lambda: screen_shard(*shard_args))
+        
+        kept = set(c['ticker'] for c in leaders.items())
+        self.history = {t: closes for t, closes in self.history.items() if t in kept or t in self.held}
+        self.log(f"Screening Stats: Checked {stats['total']} | Failed Fetch: {stats['fetch_failed']} | No Data: {stats['insufficient_data']} | Criteria Fail: {stats['low_momentum']} | Passed: {stats['accepted']}")
+        return leaders.items()
     
     def _rank_candidates(self, candidates):
         """
@@ -238,9 +452,5 @@ class MarketScanner(BaseAgent):
         if not candidates:
             return []
         
-        # Sort by score (higher is better)
-        ranked = sorted(candidates, key=lambda x: x.get('score', 0), reverse=True)
-        
-        # Return top N
-        top_n = config.TOP_CANDIDATES_COUNT
-        return ranked[:top_n]
+        # Top N by score (higher is better) with a bounded heap
+        return TopK(config.TOP_CANDIDATES_COUNT).extend(candidates).items()
@@ -1,6 +1,9 @@
 from agents.base_agent import BaseAgent
 from utils.llm_client import LLMClient
 from utils.universe_manager import UniverseManager
+from utils.exposure import get_allocations
+from utils.equity_curve import EquityCurve
+from utils.benchmark import BenchmarkTracker
 import config
 
 class PortfolioManager(BaseAgent):
@@ -12,6 +15,8 @@ class PortfolioManager(BaseAgent):
         super().__init__(name="PortfolioMgr", role="Portfolio Manager")
         self.llm = LLMClient() if config.USE_AI else None
         self.universe_mgr = UniverseManager()
+        self.equity_curve = EquityCurve()
+        self.benchmark_tracker = BenchmarkTracker()
 
     def evaluate_portfolio(self, portfolio_state):
         """
@@ -36,10 +41,20 @@ class PortfolioManager(BaseAgent):
         crypto_value, stock_value = self._calculate_allocations(portfolio_state)
         crypto_pct = (crypto_value / total_value * 100) if total_value > 0 else 0
         
-        # Get benchmark performance
-        from utils.benchmark import BenchmarkTracker
-        benchmark_tracker = BenchmarkTracker()
-        comparison = benchmark_tracker.compare_performance(return_pct)
+        # Get benchmark performance (prices are cached across trackers)
+        comparison = self.benchmark_tracker.compare_performance(return_pct)
+        
+        # Hard stop: no new positions while the drawdown limit is breached
+        drawdown = self.equity_curve.current_drawdown(total_value or None)
+        if drawdown >= config.MAX_DRAWDOWN_PCT:
+            reason = f"Drawdown {drawdown*100:.1f}% from peak exceeds {config.MAX_DRAWDOWN_PCT*100:.0f}% limit, buying halted"
+            self.log(reason)
+            return {
+                'strategy': 'HOLD',
+                'reason': reason,
+                'max_new_positions': 0,
+                'benchmark_comparison': comparison
+            }
         
         # Default rule-based guidance with benchmark awareness
         if return_pct < -5:
@@ -156,22 +171,8 @@ REASON: Portfolio underperforming MSCI World, need stronger growth stocks"""
         Returns:
             tuple: (crypto_value, stock_value)
         """
-        holdings = portfolio_state.get('holdings', {})
-        crypto_value = 0.0
-        stock_value = 0.0
-        
-        for ticker, shares in holdings.items():
-            # Get current price from portfolio state or estimate
-            # This is a simplified version - in real implementation,
-            # we'd fetch current prices
-            value = shares * 100  # Placeholder calculation
-            
-            if self.universe_mgr.is_crypto(ticker):
-                crypto_value += value
-            else:
-                stock_value += value
-        
-        return crypto_value, stock_value
+        allocations = get_allocations(portfolio_state, self.universe_mgr)
+        return allocations.get('crypto', 0.0), allocations.get('stock', 0.0)
     
     def get_crypto_allocation_info(self, portfolio_state):
         """
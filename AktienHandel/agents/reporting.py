@@ -149,6 +149,16 @@ class ReportingAgent(BaseAgent):
         else:
             print(" Benchmark data not available")
         
+        # Time-weighted return vs all configured benchmarks (one cached batch download)
+        multi = benchmark_tracker.service.compare_all()
+        if multi and multi['benchmarks']:
+            print("\n" + "-" * 70)
+            print(f" TIME-WEIGHTED RETURN SINCE {multi['start_date']}")
+            print("-" * 70)
+            print(f" {'Portfolio':18s} {multi['portfolio_return']:+7.2f}%")
+            for name, result in multi['benchmarks'].items():
+                print(f" {name:18s} {result['return_pct']:+7.2f}%   (alpha {result['alpha']:+.2f}%)")
+        
         # Investment Development
         print("\n" + "-" * 70)
         print(" INVESTMENT DEVELOPMENT")
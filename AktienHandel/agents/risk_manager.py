@@ -1,11 +1,31 @@
 from agents.base_agent import BaseAgent
 from utils.universe_manager import UniverseManager
+from utils.exposure import get_allocations
+from utils.portfolio_risk import PortfolioRiskEngine, MIN_OBSERVATIONS
+from utils import optimizer
+from utils.equity_curve import EquityCurve
+import numpy as np
 import config
 
 class RiskManager(BaseAgent):
     def __init__(self):
         super().__init__(name="RiskGuard", role="Risk Manager")
         self.universe_mgr = UniverseManager()
+        self.portfolio_risk = PortfolioRiskEngine(self.universe_mgr) if config.ENABLE_PORTFOLIO_RISK else None
+        self.equity_curve = EquityCurve()
+
+    def load_history(self, data_dict):
+        """
+        Feed already-downloaded price data into the portfolio risk engine.
+        
+        Args:
+            data_dict (dict): ticker -> DataFrame or close Series
+        """
+        if not self.portfolio_risk:
+            return
+        for ticker, data in data_dict.items():
+            closes = data['Close'] if hasattr(data, 'columns') else data
+            self.portfolio_risk.add_series(ticker, closes)
 
     def validate_trade(self, signal, portfolio_state, current_daily_trades):
         """
@@ -31,9 +51,11 @@ class RiskManager(BaseAgent):
         if current_daily_trades >= config.MAX_TRADES_PER_DAY:
             return False, f"Daily trade limit reached ({config.MAX_TRADES_PER_DAY})"
 
-        # 2. Check Drawdown (Simplified: if cash is too low compared to initial, stop buying)
-        # Real drawdown calculation would need historical portfolio values.
-        # Here we just check if we have enough cash for a BUY.
+        # 2. Check Drawdown from the equity curve's running peak (no new BUYs once breached)
+        if action == 'BUY':
+            drawdown = self.equity_curve.current_drawdown(portfolio_state.get('total_value') or None)
+            if drawdown >= config.MAX_DRAWDOWN_PCT:
+                return False, f"Max drawdown reached ({drawdown*100:.1f}% >= {config.MAX_DRAWDOWN_PCT*100:.0f}%)"
         
         if action == 'BUY':
             cash = portfolio_state.get('cash', 0.0)
@@ -75,6 +97,183 @@ class RiskManager(BaseAgent):
             if ticker not in portfolio_state.get('holdings', {}):
                 return False, f"Not holding {ticker}"
 
+        # 5. Portfolio-level risk (VaR, beta, sector concentration) after the trade
+        if action == 'BUY' and self.portfolio_risk:
+            trade_value = self.calculate_position_size(signal, portfolio_state) * price
+            if trade_value > 0:
+                risk = self.portfolio_risk.evaluate_trade(portfolio_state, ticker, trade_value)
+                is_safe, reason = self._check_portfolio_risk(risk)
+                if not is_safe:
+                    return False, reason
+
+        return True, "Approved"
+
+    def validate_many(self, signals, portfolio_state, current_daily_trades=0, max_trades=None):
+        """
+        Checks and sizes a whole batch of signals at once.
+        
+        The per-signal checks of validate_trade (drawdown, position size, cash,
+        existing holdings, crypto allocation, portfolio risk) are evaluated as
+        array operations. Surviving orders are then allocated greedily by
+        confidence until the cash budget, crypto headroom or trade limit runs out.
+        
+        Args:
+            signals (list): Trade signals ({'ticker', 'signal', 'price', 'confidence'})
+            portfolio_state (dict): Current cash and holdings.
+            current_daily_trades (int): Number of trades made today.
+            max_trades (int): Optional extra cap on accepted orders (e.g. portfolio manager limit)
+            
+        Returns:
+            np.ndarray: Boolean accept mask, aligned with signals
+            np.ndarray: Quantities (0 where rejected)
+            list: Reason per signal ("Approved" or why it was rejected)
+        """
+        n = len(signals)
+        accepted = np.zeros(n, dtype=bool)
+        quantities = np.zeros(n, dtype=np.int64)
+        reasons = ["Approved"] * n
+        if n == 0:
+            return accepted, quantities, reasons
+
+        tickers = np.array([s.get('ticker') for s in signals], dtype=object)
+        actions = np.array([s.get('signal') for s in signals], dtype=object)
+        prices = np.array([s.get('price') or 0.0 for s in signals], dtype=np.float64)
+        confidence = np.array([s.get('confidence', 0.0) for s in signals], dtype=np.float64)
+        is_crypto = self.universe_mgr.crypto_mask(tickers.astype(str))
+
+        holdings = portfolio_state.get('holdings', {})
+        cash = portfolio_state.get('cash', 0.0)
+        total_value = portfolio_state.get('total_value', cash)
+        crypto_value = self._calculate_crypto_value(portfolio_state)
+        crypto_cap = total_value * config.MAX_CRYPTO_ALLOCATION_PCT
+        held = np.isin(tickers, list(holdings))
+        is_buy = actions == 'BUY'
+        is_sell = actions == 'SELL'
+
+        # Position caps per signal (crypto also capped by the remaining allocation)
+        max_amt = total_value * np.where(is_crypto, config.MAX_CRYPTO_POSITION_SIZE_PCT, config.MAX_POSITION_SIZE_PCT)
+        max_amt = np.where(is_crypto, np.minimum(max_amt, max(0.0, crypto_cap - crypto_value)), max_amt)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cap_qty = np.where(prices > 0, np.floor(np.minimum(max_amt, cash) / prices), 0).astype(np.int64)
+
+        drawdown = self.equity_curve.current_drawdown(portfolio_state.get('total_value') or None)
+        daily_full = current_daily_trades >= config.MAX_TRADES_PER_DAY
+
+        # First failing check wins, in the same order as validate_trade
+        checks = [
+            (~(is_buy | is_sell), "Invalid Action"),
+            (np.full(n, daily_full), f"Daily trade limit reached ({config.MAX_TRADES_PER_DAY})"),
+            (is_buy & (drawdown >= config.MAX_DRAWDOWN_PCT),
+             f"Max drawdown reached ({drawdown*100:.1f}% >= {config.MAX_DRAWDOWN_PCT*100:.0f}%)"),
+            (is_buy & is_crypto & (total_value > 0) & (crypto_value >= crypto_cap), "Crypto allocation limit reached"),
+            (is_buy & (prices > max_amt), "Price exceeds max position size"),
+            (is_buy & (prices > cash), "Insufficient Cash"),
+            (is_buy & held, "Already holding"),
+            (is_sell & ~held, "Not holding"),
+        ]
+        rejected = np.zeros(n, dtype=bool)
+        for mask, reason in checks:
+            for i in np.flatnonzero(mask & ~rejected):
+                reasons[i] = f"{reason} ({tickers[i]})" if tickers[i] else reason
+            rejected |= mask
+
+        # Only the most confident surviving signal per ticker is kept
+        order = np.argsort(-confidence, kind='stable')
+        alive = order[~rejected[order]]
+        _, first = np.unique(tickers[alive].astype(str), return_index=True)
+        duplicate = ~rejected
+        duplicate[alive[first]] = False
+        for i in np.flatnonzero(duplicate):
+            reasons[i] = f"Duplicate signal for ticker ({tickers[i]})"
+        rejected |= duplicate
+
+        # Portfolio-level risk for the remaining BUYs at their full size
+        candidates = np.flatnonzero(is_buy & ~rejected & (cap_qty > 0))
+        if self.portfolio_risk and len(candidates):
+            risks = self.portfolio_risk.evaluate_trades(portfolio_state, list(tickers[candidates]),
+                                                        cap_qty[candidates] * prices[candidates])
+            for i, risk in zip(candidates, risks):
+                is_safe, reason = self._check_portfolio_risk(risk)
+                if not is_safe:
+                    rejected[i] = True
+                    reasons[i] = reason
+
+        # Optimizer sizing across all surviving BUYs (replaces the flat per-position cap)
+        buys = np.flatnonzero(is_buy & ~rejected)
+        if config.POSITION_SIZING_METHOD != 'fixed' and len(buys) and total_value > 0:
+            weights = self._optimize_weights(list(tickers[buys]), confidence[buys],
+                                             max_amt[buys] / total_value, cash / total_value)
+            if weights is not None:
+                cap_qty[buys] = np.minimum(cap_qty[buys], np.floor(weights * total_value / prices[buys]))
+
+        # Greedy allocation by confidence within cash, crypto headroom and trade slots
+        slots = config.MAX_TRADES_PER_DAY - current_daily_trades
+        if max_trades is not None:
+            slots = min(slots, max_trades)
+        budget = cash
+        crypto_headroom = max(0.0, crypto_cap - crypto_value)
+        for i in order:
+            if rejected[i]:
+                continue
+            if slots <= 0:
+                reasons[i] = "Trade limit reached for this session"
+                continue
+            if is_sell[i]:
+                quantity = int(holdings.get(tickers[i], 0))
+            else:
+                affordable = budget if not is_crypto[i] else min(budget, crypto_headroom)
+                quantity = int(min(cap_qty[i], affordable // prices[i]))
+                if quantity <= 0:
+                    reasons[i] = "Position size 0 (cash budget exhausted)"
+                    continue
+                budget -= quantity * prices[i]
+                if is_crypto[i]:
+                    crypto_headroom -= quantity * prices[i]
+            accepted[i] = True
+            quantities[i] = quantity
+            slots -= 1
+
+        return accepted, quantities, reasons
+
+    def _optimize_weights(self, tickers, confidence, caps, budget):
+        """
+        Target weights from config.POSITION_SIZING_METHOD using the risk engine's return history.
+        Tickers without enough history keep their flat cap.
+        
+        Returns:
+            np.ndarray: Weights (fractions of total value), or None to fall back to fixed sizing
+        """
+        if not self.portfolio_risk:
+            return None
+        self.portfolio_risk.ensure(tickers)
+        names, returns = self.portfolio_risk.return_matrix(tickers)
+        if not names or len(returns) < MIN_OBSERVATIONS:
+            return None
+
+        index = np.array([tickers.index(t) for t in names])
+        missing = np.setdiff1d(np.arange(len(tickers)), index)
+        weights = caps.copy()
+        budget = max(0.0, budget - caps[missing].sum())
+        weights[index] = optimizer.optimize(returns, caps[index], budget,
+                                            config.POSITION_SIZING_METHOD, confidence[index])
+        self.log(f"{config.POSITION_SIZING_METHOD} weights: " +
+                 ", ".join(f"{t} {w*100:.1f}%" for t, w in zip(tickers, weights)))
+        return weights
+
+    def _check_portfolio_risk(self, risk):
+        """
+        Apply portfolio-level limits to the metrics from PortfolioRiskEngine.
+        VaR and beta limits only reject trades that increase the metric.
+        """
+        if risk['sector_pct'] > config.MAX_SECTOR_CONCENTRATION_PCT:
+            return False, f"Sector concentration {risk['sector']} {risk['sector_pct']*100:.1f}% > {config.MAX_SECTOR_CONCENTRATION_PCT*100:.0f}%"
+        
+        if risk['var_pct'] is not None and risk['marginal_var_pct'] > 0 and risk['var_pct'] > config.MAX_PORTFOLIO_VAR_PCT:
+            return False, f"Portfolio VaR {risk['var_pct']*100:.2f}% > {config.MAX_PORTFOLIO_VAR_PCT*100:.1f}%"
+        
+        if risk['beta'] is not None and risk['marginal_beta'] > 0 and risk['beta'] > config.MAX_PORTFOLIO_BETA:
+            return False, f"Portfolio beta {risk['beta']:.2f} > {config.MAX_PORTFOLIO_BETA:.2f}"
+        
         return True, "Approved"
         
     def calculate_position_size(self, signal, portfolio_state):
@@ -91,6 +290,9 @@ class RiskManager(BaseAgent):
         
         if is_crypto:
             max_amt = total_value * config.MAX_CRYPTO_POSITION_SIZE_PCT
+            # Never exceed the remaining crypto allocation headroom
+            headroom = total_value * config.MAX_CRYPTO_ALLOCATION_PCT - self._calculate_crypto_value(portfolio_state)
+            max_amt = max(0.0, min(max_amt, headroom))
         else:
             max_amt = total_value * config.MAX_POSITION_SIZE_PCT
         
@@ -101,13 +303,5 @@ class RiskManager(BaseAgent):
         return quantity
     
     def _calculate_crypto_value(self, portfolio_state):
-        """Calculate total crypto value in portfolio."""
-        holdings = portfolio_state.get('holdings', {})
-        crypto_value = 0.0
-        
-        for ticker, shares in holdings.items():
-            if self.universe_mgr.is_crypto(ticker):
-                # Simplified - would need actual current prices
-                crypto_value += shares * 100  # Placeholder
-        
-        return crypto_value
+        """Calculate total crypto market value in portfolio (O(1) with an exposure snapshot)."""
+        return get_allocations(portfolio_state, self.universe_mgr).get('crypto', 0.0)
@@ -0,0 +1,196 @@
+from agents.base_agent import BaseAgent
+from agents.market_scanner import screen_candidate
+from agents.strategies.trend_strategy import TrendStrategy
+from utils.incremental import IndicatorState
+from utils.order_book import OrderBook
+from collections import deque
+import numpy as np
+import time
+import config
+
+
+class TradingSession(BaseAgent):
+    """
+    Event-driven trading loop over a bar feed (see utils.feeds).
+
+    Each bar updates only its own ticker's indicators (O(1)), then re-screens
+    and re-evaluates that ticker alone. Risk checks run only when a ticker's
+    signal changes (e.g. its trend flips), so the per-bar cost does not grow
+    with the watchlist. Orders of one bar timestamp are executed together as
+    a netted batch, priced from the feed instead of new downloads.
+
+    Time spent per stage (indicators, strategy, risk, execution) is recorded,
+    as are queueing lag and signal-to-fill latency for feeds whose events carry
+    a 'due' time (utils.feeds.PanelFeed), to find where the loop saturates.
+    """
+
+    STAGES = ('indicators', 'strategy', 'risk', 'execution')
+
+    def __init__(self, risk_manager, executor, strategies=None, interval=None, max_trades=None):
+        super().__init__(name="Session", role="Intraday Session")
+        self.risk_manager = risk_manager
+        self.executor = executor
+        self.universe_mgr = executor.exposure.universe_mgr
+        # Strategies that can evaluate from indicator values (AI strategies cannot run per bar)
+        self.strategies = [s for s in (strategies or []) if hasattr(s, 'evaluate')] or [TrendStrategy()]
+        self.interval = interval or config.BAR_INTERVAL
+        self.max_trades = config.MAX_TRADES_PER_DAY if max_trades is None else max_trades
+        self.order_book = OrderBook(self.universe_mgr)
+        self.states = {}  # ticker -> IndicatorState
+        self.prices = {}  # ticker -> last close from the feed
+        self.last_action = {}  # ticker -> last signal acted on (re-checked only after it changes)
+        self.latencies = deque(maxlen=100_000)  # seconds per bar
+        self.lags = deque(maxlen=100_000)  # seconds a bar waited past its due time
+        self.fill_latencies = []  # seconds from the signal's bar being due to its fill
+        self.stage_seconds = dict.fromkeys(self.STAGES, 0.0)
+        self.stage_calls = dict.fromkeys(self.STAGES, 0)
+        self.stats = {'bars': 0, 'evaluated': 0, 'signals': 0, 'orders': 0, 'fills': 0}
+        self.portfolio = None
+        self.trades = 0  # Fills on the current trading day (including earlier sessions')
+        self._day = None
+        self._pending_time = None
+
+    def run(self, feed):
+        """
+        Consume a feed until it ends.
+
+        Returns:
+            dict: Session report (see report)
+        """
+        self.log(f"Starting event-driven session ({self.interval} bars)...")
+        self.portfolio = self.executor.get_portfolio_state(self.prices)
+        start = time.perf_counter()
+        for bar in feed:
+            self.on_bar(bar)
+        self.flush()
+        report = self.report(time.perf_counter() - start)
+        self.log(f"Session complete: {report['bars']} bars, {report['fills']} fills, "
+                 f"p50 {report['latency_ms']['p50']:.3f} ms / p99 {report['latency_ms']['p99']:.3f} ms per bar")
+        return report
+
+    def _timed(self, stage, started):
+        """Book the time since `started` to a stage; returns the current time."""
+        now = time.perf_counter()
+        self.stage_seconds[stage] += now - started
+        self.stage_calls[stage] += 1
+        return now
+
+    def on_bar(self, bar):
+        """Process one bar event."""
+        start = time.perf_counter()
+        if 'due' in bar:
+            self.lags.append(max(0.0, start - bar['due']))
+        ticker, when = bar['ticker'], bar['time']
+        if self._pending_time is not None and when != self._pending_time:
+            self.flush()
+        if when.date() != self._day:
+            # New trading day: the daily trade limit starts over from what is already logged for it
+            self._day = when.date()
+            self.trades = self.executor.count_trades(self._day)
+
+        started = time.perf_counter()
+        state = self.states.get(ticker)
+        if state is None:
+            state = self.states[ticker] = IndicatorState(self.interval, self.universe_mgr.get_asset_type(ticker))
+        if state.update(bar.get('Close'), bar.get('Volume', 0.0)):
+            self.prices[ticker] = state.price
+            self.stats['bars'] += 1
+            snapshot = state.snapshot()
+            started = self._timed('indicators', started)
+            self._evaluate(ticker, snapshot, when, bar.get('due', start), started)
+        self.latencies.append(time.perf_counter() - start)
+
+    def _evaluate(self, ticker, snapshot, when, received, started):
+        """Re-screen one ticker and run strategy and risk if its signal changed."""
+        held = self.portfolio['holdings'].get(ticker, 0) > 0
+        if not held:
+            if np.isnan(snapshot['sma50']) or np.isnan(snapshot['momentum']):
+                return
+            candidate, _ = screen_candidate(ticker, self.universe_mgr.get_asset_type(ticker), snapshot['price'],
+                                            snapshot['sma50'], snapshot['sma20'], snapshot['momentum'],
+                                            snapshot['volume_ratio'])
+            if candidate is None:
+                self._timed('strategy', started)
+                return
+        self.stats['evaluated'] += 1
+
+        for strategy in self.strategies:
+            signal = strategy.evaluate(snapshot)
+            action = signal['signal']
+            if action not in ('BUY', 'SELL') or self.last_action.get(ticker) == action:
+                continue
+            if action == 'SELL' and not held:
+                continue
+            self.stats['signals'] += 1
+            started = self._timed('strategy', started)
+
+            signal['ticker'] = ticker
+            signal['avg_volume'] = snapshot['avg_volume']
+            signal['volatility'] = snapshot['volatility']
+            signal['received'] = received
+            # Orders still pending for this timestamp count towards the limit and use cash and position room
+            trades = self.trades + len(self.order_book)
+            if trades >= self.max_trades:
+                return
+
+            projected = self.order_book.project(self.portfolio) if len(self.order_book) else self.portfolio
+            accepted, quantities, reasons = self.risk_manager.validate_many(
+                [signal], projected, trades, max_trades=self.max_trades)
+            self._timed('risk', started)
+            if accepted[0]:
+                # Only accepted orders count as acted on; a rejected signal is retried on later bars
+                self.last_action[ticker] = action
+                self.order_book.add(signal, int(quantities[0]))
+                self._pending_time = when
+                self.stats['orders'] += 1
+            return
+        self._timed('strategy', started)
+
+    def flush(self):
+        """Execute the orders queued for the current timestamp as one batch."""
+        if not len(self.order_book):
+            return
+        started = time.perf_counter()
+        orders = self.order_book.net()
+        fills = self.executor.execute_batch(orders, prices=self.prices)
+        self.stats['fills'] += len(fills)
+        self.trades += len(fills)
+        self.order_book.clear()
+        self._pending_time = None
+        self.portfolio = self.executor.get_portfolio_state(self.prices)
+
+        done = self._timed('execution', started)
+        received = {signal['ticker']: signal.get('received', started) for signal, _ in orders}
+        self.fill_latencies.extend(done - received[fill['ticker']] for fill in fills if fill['ticker'] in received)
+
+    def report(self, elapsed=None):
+        """
+        Counters, latencies and per-stage cost.
+
+        Returns:
+            dict: bars, evaluated, signals, orders, fills, tickers,
+                  latency_ms (processing per bar), lag_ms (queueing behind the feed),
+                  signal_to_fill_ms (p50/p95/p99/max each), stages (calls, mean_ms and
+                  max_per_sec per stage) and bars_per_sec
+        """
+        stages = {}
+        for stage in self.STAGES:
+            calls, seconds = self.stage_calls[stage], self.stage_seconds[stage]
+            mean = seconds / calls if calls else 0.0
+            stages[stage] = {'calls': calls, 'mean_ms': mean * 1000.0,
+                             'max_per_sec': 1.0 / mean if mean else None}
+        report = dict(self.stats, tickers=len(self.states),
+                      latency_ms=_percentiles(self.latencies), lag_ms=_percentiles(self.lags),
+                      signal_to_fill_ms=_percentiles(self.fill_latencies), stages=stages)
+        if elapsed:
+            report['bars_per_sec'] = self.stats['bars'] / elapsed
+        return report
+
+
+def _percentiles(seconds):
+    """p50/p95/p99/max in milliseconds (zeros without samples)."""
+    values = np.array(seconds) * 1000.0
+    if not len(values):
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99), 'max': float(values.max())}
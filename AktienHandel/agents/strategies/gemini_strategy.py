@@ -1,4 +1,5 @@
 from agents.base_agent import BaseAgent
+from agents.analyst import format_price
 from utils.llm_client import LLMClient
 from utils.news_fetcher import NewsFetcher
 from utils.universe_manager import UniverseManager
@@ -129,8 +130,8 @@ class GeminiStrategy(BaseAgent):
 
 Stock: {ticker}
 Current Price: ${analysis.get('current_price', 0):.2f}
-50-day Moving Average: ${analysis.get('sma50', 0):.2f}
-200-day Moving Average: ${analysis.get('sma200', 0):.2f}
+50-day Moving Average: {format_price(analysis.get('sma50'))}
+200-day Moving Average: {format_price(analysis.get('sma200'))}
 Volatility: {analysis.get('volatility', 0)*100:.1f}%
 1-Year Return: {analysis.get('trend_strength', 0)*100:.1f}%{portfolio_text}{news_text}
 
@@ -152,8 +153,8 @@ REASON: Strong uptrend with positive news sentiment"""
 
 Crypto: {ticker}
 Current Price: ${analysis.get('current_price', 0):.2f}
-50-day Moving Average: ${analysis.get('sma50', 0):.2f}
-200-day Moving Average: ${analysis.get('sma200', 0):.2f}
+50-day Moving Average: {format_price(analysis.get('sma50'))}
+200-day Moving Average: {format_price(analysis.get('sma200'))}
 Volatility: {analysis.get('volatility', 0)*100:.1f}%
 1-Year Return: {analysis.get('trend_strength', 0)*100:.1f}%{portfolio_text}{news_text}
 
@@ -173,8 +174,13 @@ REASON: Strong momentum with positive community sentiment"""
     def _fallback_decision(self, analysis):
         """Simple rule-based fallback when AI is unavailable."""
         price = analysis.get('current_price', 0)
-        sma50 = analysis.get('sma50', 0)
-        sma200 = analysis.get('sma200', 0)
+        # Unavailable averages (short history) never confirm a trend
+        sma50 = analysis.get('sma50')
+        sma200 = analysis.get('sma200')
+        if sma50 is None:
+            sma50 = price
+        if sma200 is None:
+            sma200 = sma50
         
         # Simple trend following logic
         if price > sma50 > sma200:
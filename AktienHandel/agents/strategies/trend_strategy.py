@@ -1,6 +1,7 @@
 from agents.base_agent import BaseAgent
 from utils.data_loader import fetch_data
-import pandas as pd
+from utils import indicators
+import numpy as np
 
 class TrendStrategy(BaseAgent):
     def __init__(self):
@@ -17,13 +18,27 @@ class TrendStrategy(BaseAgent):
         if df is None or len(df) < 200:
             return {'signal': 'HOLD', 'reason': 'Insufficient Data', 'confidence': 0.0}
 
-        # Calculate Indicators
-        df['SMA50'] = df['Close'].rolling(window=50).mean()
-        df['SMA200'] = df['Close'].rolling(window=200).mean()
+        # Calculate Indicators (on the raw close array, df stays untouched)
+        closes = indicators.as_array(df['Close'])
+        return self.evaluate({
+            'price': closes[-1],
+            'sma50': indicators.sma(closes, 50)[-1],
+            'sma200': indicators.sma(closes, 200)[-1],
+        })
+
+    def evaluate(self, snapshot):
+        """
+        Trend signal from indicator values, without fetching data.
+        Used by the event-driven session with incrementally updated indicators.
         
-        current_price = df['Close'].iloc[-1]
-        sma50 = df['SMA50'].iloc[-1]
-        sma200 = df['SMA200'].iloc[-1]
+        Args:
+            snapshot (dict): 'price', 'sma50' and 'sma200'
+        """
+        current_price = snapshot['price']
+        sma50 = snapshot['sma50']
+        sma200 = snapshot['sma200']
+        if np.isnan(sma200) or np.isnan(sma50):
+            return {'signal': 'HOLD', 'reason': 'Insufficient Data', 'confidence': 0.0}
         
         # Golden Cross checks (approximate current state)
         # Strong Buy: Price > SMA50 > SMA200
@@ -6,17 +6,26 @@ import os
 DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
 PORTFOLIO_FILE = os.path.join(DATA_DIR, 'portfolio.json')
 TRADE_LOG_FILE = os.path.join(DATA_DIR, 'trade_log.csv')
+PORTFOLIO_WAL_FILE = os.path.join(DATA_DIR, 'portfolio.wal')  # Write-ahead log of fills not yet checkpointed
+PORTFOLIO_LOCK_FILE = os.path.join(DATA_DIR, 'portfolio.lock')  # Cross-process lock for portfolio writes
 BENCHMARK_FILE = os.path.join(DATA_DIR, 'benchmark.json')
+EQUITY_CURVE_FILE = os.path.join(DATA_DIR, 'equity_curve.bin')  # Binary (timestamp, value, peak) records
+BENCHMARK_HISTORY_FILE = os.path.join(DATA_DIR, 'benchmark_history.bin')  # Full benchmark snapshot history
+UNIVERSE_DIR = os.path.join(DATA_DIR, 'universes')  # One symbol file (CSV/Parquet) per named universe
+PRICE_PANEL_DIR = os.path.join(DATA_DIR, 'price_panel')  # Memory-mapped OHLCV shared between processes
+BAR_CACHE_DIR = os.path.join(DATA_DIR, 'bars')  # Intraday bars partitioned by interval and day
 
 # ===== TRADING UNIVERSE CONFIGURATION =====
 # Universe Mode Options:
-# - 'all': All stocks + crypto (S&P500 + NASDAQ100 + European + Crypto)
+# - 'all': All stocks + crypto (every file in UNIVERSE_DIR)
 # - 'sp500': S&P 500 stocks only
 # - 'nasdaq100': NASDAQ-100 stocks only
 # - 'us_stocks': Combined S&P500 + NASDAQ100 (no duplicates)
 # - 'europe': Major European stocks (DAX, FTSE)
 # - 'crypto': Cryptocurrencies only
 # - 'custom': Use CUSTOM_UNIVERSE list below
+# - any other file name in UNIVERSE_DIR, e.g. 'russell3000' for data/universes/russell3000.csv
+#   (columns: symbol, exchange, asset_class, sector)
 UNIVERSE_MODE = 'us_stocks'  # <-- Change this to select your universe
 
 # Custom universe (only used if UNIVERSE_MODE = 'custom')
@@ -27,25 +36,90 @@ ENABLE_CRYPTO = True  # Enable/disable cryptocurrency trading
 MAX_CRYPTO_ALLOCATION_PCT = 0.20  # Max 20% of portfolio in crypto
 MAX_CRYPTO_POSITION_SIZE_PCT = 0.03  # Max 3% per crypto position (more volatile)
 
+# Bar Interval (analysis resolution)
+BAR_INTERVAL = '1d'  # '1d' or intraday '1m', '5m', '15m', '1h' (e.g. for hourly sessions)
+INTRADAY_LOOKBACK_DAYS = 30  # Calendar days of intraday volatility/drawdown/return (averages load up to 200 sessions)
+BAR_CACHE_TODAY_TTL = 300  # Seconds before today's (still growing) bar partition is re-downloaded
+
 # Market Filtering (to reduce scan time)
 MIN_MARKET_CAP = 1_000_000_000  # Minimum $1B market cap (set to 0 to disable)
 MIN_AVG_VOLUME = 100_000  # Minimum average daily volume (set to 0 to disable)
 TOP_CANDIDATES_COUNT = 30  # Max number of stocks to analyze deeply after pre-filtering
+SCAN_CHUNK_SIZE = 100  # Tickers downloaded per batch request while screening
+SCAN_PERIOD = '6mo'  # History downloaded per ticker for screening
+PRICE_PANEL_MAX_AGE = 6 * 3600  # Seconds a published price panel is used instead of downloading
+
+# Sharded Scanning (large universes)
+ENABLE_SHARDED_SCAN = True  # Screen big universes in shards across worker processes
+SHARDED_SCAN_MIN_TICKERS = 500  # Universes smaller than this use the single-batch scan
+SCAN_SHARD_SIZE = 200  # Tickers per download/screening shard
+SCAN_WORKERS = min(4, os.cpu_count() or 1)  # Worker processes (each downloads one shard at a time)
+ANALYSIS_WORKERS = 4  # Leading candidates analyzed in the background while the scan is still running
 
 # Risk Management Limits
 MAX_TRADES_PER_DAY = 5
-MAX_DRAWDOWN_PCT = 0.10  # Stop trading if portfolio is down 10%
+MAX_DRAWDOWN_PCT = 0.10  # Stop buying if portfolio is 10% below its peak value (equity curve)
 MAX_POSITION_SIZE_PCT = 0.05  # Max 5% of portfolio per trade
 
+# Portfolio Risk Limits (covariance-based, evaluated on every BUY)
+ENABLE_PORTFOLIO_RISK = True  # Enable/disable VaR, beta and sector concentration gates
+RISK_LOOKBACK_DAYS = 126  # Rolling window of daily returns for the covariance matrix (~6 months)
+VAR_CONFIDENCE = 0.95  # Confidence level for 1-day historical VaR/CVaR
+MAX_PORTFOLIO_VAR_PCT = 0.03  # Reject BUYs that push 1-day VaR above 3% of portfolio value
+MAX_PORTFOLIO_BETA = 1.5  # Reject BUYs that push portfolio beta to the benchmark above 1.5
+MAX_SECTOR_CONCENTRATION_PCT = 0.30  # Max 30% of portfolio in a single sector
+
+# Position Sizing
+# - 'fixed': MAX_POSITION_SIZE_PCT (or crypto limit) per trade, highest confidence first
+# - 'mean_variance': Trade off signal alpha against covariance of the candidates
+# - 'kelly': Fractional Kelly (mean-variance with risk aversion 1 / KELLY_FRACTION)
+# - 'risk_parity': Equal risk contribution across the candidates
+POSITION_SIZING_METHOD = 'fixed'
+SIGNAL_INFORMATION_RATIO = 0.5  # Annual alpha per unit of volatility for a signal of confidence 1.0
+MV_RISK_AVERSION = 10.0  # Variance penalty for 'mean_variance'
+KELLY_FRACTION = 0.5  # Half Kelly
+
 # Simulation Settings
 INITIAL_CASH = 10000.0  # Start with 10,000 EUR
 PAPER_TRADING = True
 
+# Fill Simulation (paper trading execution costs)
+ENABLE_FILL_SIMULATION = True  # Model spread, market impact, commissions and partial fills
+FILL_SPREAD_BPS = 5  # Quoted bid/ask spread for stocks in basis points (half is paid per trade)
+FILL_CRYPTO_SPREAD_BPS = 20  # Quoted bid/ask spread for crypto in basis points
+FILL_IMPACT_COEF = 1.0  # Square-root impact: coef * daily volatility * sqrt(quantity / avg volume)
+FILL_COMMISSION_BPS = 0  # Commission as basis points of the traded value
+FILL_MIN_COMMISSION = 1.0  # Minimum commission per order (EUR)
+FILL_MAX_PARTICIPATION = 0.05  # Fill at most 5% of average daily volume per order, the rest is dropped
+
 # Data Settings
 HISTORY_DAYS = 365  # Days of history to fetch for analysis
 
+# Bulk Downloads
+DOWNLOAD_CHUNK_SIZE = 100  # Tickers per yfinance batch request
+DOWNLOAD_MAX_WORKERS = 4  # Concurrent batch requests
+DOWNLOAD_MAX_RETRIES = 3  # Retry rounds for tickers missing from their batch (retried individually)
+DOWNLOAD_BACKOFF_BASE = 1.0  # Seconds before the first retry, doubled each round (with jitter)
+DOWNLOAD_BACKOFF_MAX = 30.0  # Upper bound for a single backoff
+QUARANTINE_AFTER_FAILURES = 3  # Consecutive failed downloads before a ticker is skipped
+QUARANTINE_DAYS = 7  # How long a quarantined ticker is skipped
+DOWNLOAD_HEALTH_FILE = os.path.join(DATA_DIR, 'download_health.json')  # Per-ticker failure stats
+RATE_LIMITS = {  # Outbound requests per upstream: (requests per second, burst)
+    'yahoo': (4.0, 10),
+    'default': (5.0, 10),
+}
+
 # Benchmark Settings
 BENCHMARK_TICKER = 'URTH'  # MSCI World ETF for performance comparison
+BENCHMARK_VIEW_POINTS = 200  # Most recent snapshots written to benchmark.json for the dashboard chart
+BENCHMARKS = {  # Benchmarks compared in the daily report (name -> ticker), fetched in one batch
+    'MSCI World': BENCHMARK_TICKER,
+    'S&P 500': '^GSPC',
+    'NASDAQ-100': '^NDX',
+    'BTC': 'BTC-USD',
+}
+BENCHMARK_CACHE_TTL = 900  # Seconds before benchmark prices are downloaded again
+BENCHMARK_PERIOD = '2y'  # History downloaded per benchmark (must cover the equity curve window)
 
 # AI Settings
 USE_AI = True  # Enable/disable AI features
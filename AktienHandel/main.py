@@ -1,9 +1,22 @@
 from agents.captain import Captain
+import argparse
+import os
 
 def main():
+    parser = argparse.ArgumentParser(description="AntiGravity Trading System (Paper Mode)")
+    parser.add_argument('--replay', metavar='DIR',
+                        help="Event-driven session over stored bars (one TICKER.csv of OHLCV bars per ticker)")
+    args = parser.parse_args()
+    if args.replay is not None and not os.path.isdir(args.replay):
+        parser.error(f"--replay: not a directory: {args.replay}")
+
     print("Welcome to AntiGravity Trading System (Paper Mode)")
     captain = Captain()
-    captain.start_day()
+    if args.replay is not None:
+        from utils.feeds import ReplayFeed
+        captain.run_session(ReplayFeed.from_directory(args.replay))
+    else:
+        captain.start_day()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,58 @@
+"""
+Mock Ollama server for reproducible AI benchmarks.
+
+Serves the Ollama API (/api/tags, /api/generate) with canned DECISION/STRATEGY
+replies and simulated model timing, so the AI paths (Analyst, AI strategy,
+PortfolioManager, ReportingAgent) can be timed without a real model:
+
+    python mock_ollama.py --port 11434 --latency lognormal:0.3:0.4 --tokens-per-sec 40
+    python mock_ollama.py --latency fixed:0 --tokens-per-sec 0        # instant replies
+    python mock_ollama.py --error-rate 0.05 --timeout-rate 0.01 --hang 90
+
+Point LOCAL_AI_URL at it (AI_PROVIDER = 'local'). Counters are printed on Ctrl+C.
+"""
+
+import argparse
+import time
+import config
+from utils.mock_llm import MockOllamaServer, parse_latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deterministic stand-in for an Ollama server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11434)
+    parser.add_argument('--latency', default='lognormal:0.3:0.4',
+                        help="Time to first token: fixed:S, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA (seconds)")
+    parser.add_argument('--tokens-per-sec', type=float, default=40.0, help="Generation speed (0 = instant)")
+    parser.add_argument('--prompt-tokens-per-sec', type=float, default=800.0, help="Prompt processing speed (0 = instant)")
+    parser.add_argument('--parallel', type=int, default=4, help="Requests served at once (0 = unlimited)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of requests answered with HTTP 500")
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help="Share of requests never answered")
+    parser.add_argument('--hang', type=float, default=120.0, help="Seconds a timed-out request is held open")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--model', action='append', help=f"Model name to serve (default: {config.LOCAL_AI_MODEL})")
+    args = parser.parse_args()
+
+    server = MockOllamaServer(args.host, args.port, latency=parse_latency(args.latency),
+                              tokens_per_sec=args.tokens_per_sec, prompt_tokens_per_sec=args.prompt_tokens_per_sec,
+                              parallel=args.parallel, error_rate=args.error_rate, timeout_rate=args.timeout_rate,
+                              hang=args.hang, seed=args.seed, models=args.model)
+    server.start()
+    print(f"Mock Ollama serving {', '.join(server.models)} at {server.url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    stats = server.stats()
+    print(f"\n{stats['requests']} requests: {stats['completed']} completed, {stats['errors']} errors, "
+          f"{stats['timeouts']} timeouts, {stats['eval_tokens']} tokens generated")
+    print(f"Replies: {stats['kinds']}, most in flight: {stats['max_active']}, "
+          f"queued {stats['queue_seconds']:.1f}s, busy {stats['busy_seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
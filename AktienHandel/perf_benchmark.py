@@ -0,0 +1,233 @@
+"""
+End-to-end performance benchmark of a daily trading session.
+
+Runs Captain.start_day on a synthetic universe of each size, offline: market
+data comes from synthetic prices served through the yfinance calls, the AI
+agents talk to the mock Ollama server (utils.mock_llm) and any other network
+access is blocked and counted. Every size runs in a fresh process (cold caches,
+own peak RSS) with a throwaway portfolio.
+
+Per stage (startup, portfolio, guidance, scan, analyze, strategy, risk,
+execute, report) it records wall time, CPU time, peak RSS, network calls and
+LLM calls, writes the results as JSON and compares them with a baseline:
+
+    python perf_benchmark.py --sizes 50,500,5000
+    python perf_benchmark.py --baseline data/perf/baseline.json   # exit code 1 on regressions
+
+A missing baseline file is created from the run. Downloads are not rate
+limited by default, so wall time measures the session's own work rather than
+token-bucket sleeps; --throttled keeps the configured RATE_LIMITS.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import multiprocessing
+from datetime import datetime
+import config
+from utils.mock_llm import MockOllamaServer, canned_reply, parse_latency
+from utils.perf import (OfflineMarket, StageProfiler, offline_environment, synthetic_universe, write_universe,
+                        diff_results, peak_rss_mb)
+
+
+STAGES = ('startup', 'portfolio', 'guidance', 'scan', 'analyze', 'strategy', 'risk', 'execute', 'report')
+PROMPT_SPEEDUP = 20  # Mock LLM prompt processing runs this much faster than generation
+DEFAULT_OUTPUT = os.path.join(config.DATA_DIR, 'perf', 'results.json')
+
+
+def session_reply(prompt, rng):
+    """Canned replies, with guidance always AGGRESSIVE so every run goes through analysis and execution."""
+    kind, text = canned_reply(prompt, rng)
+    if kind == 'strategy':
+        text = "STRATEGY: AGGRESSIVE\nMAX_NEW_POSITIONS: 5\nREASON: Benchmark run through the full trading path"
+    return kind, text
+
+
+def run_session(size, llm_latency=('fixed', 0.02), llm_tokens_per_sec=0.0, seed=7, throttled=False):
+    """
+    Benchmark one trading session in this process.
+
+    Args:
+        size (int): Tickers in the synthetic universe
+        llm_latency (tuple): Mock LLM time to first token (see MockOllamaServer)
+        llm_tokens_per_sec (float): Mock LLM generation speed (0 = instant, including the prompt)
+        seed (int): Seed for prices and LLM replies
+        throttled (bool): Keep the configured download rate limits (wall time then
+                          includes the throttling sleeps, see throttled_s)
+
+    Returns:
+        dict: universe, wall_s, cpu_s, peak_rss_mb, setup_rss_mb, peak_rss_children_mb,
+              network_calls, network (per kind), llm_calls, analyzed, fills, throttled_s,
+              sharded_scan and stages (see StageProfiler.report)
+    """
+    from agents.captain import Captain
+    from utils.data_loader import get_data_access_stats
+
+    tickers = synthetic_universe(size)
+    market = OfflineMarket(tickers, seed=seed)
+    profiler = StageProfiler(STAGES)
+    # Scan workers only inherit the offline environment when they are forked
+    sharded = multiprocessing.get_start_method() == 'fork'
+    settings = {'UNIVERSE_MODE': 'perf', 'USE_AI': True}
+    if not sharded:
+        settings['ENABLE_SHARDED_SCAN'] = False
+    if not throttled:
+        settings['RATE_LIMITS'] = {'default': (1e9, 1e9)}
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            MockOllamaServer(latency=llm_latency, tokens_per_sec=llm_tokens_per_sec, seed=seed,
+                             prompt_tokens_per_sec=llm_tokens_per_sec * PROMPT_SPEEDUP,
+                             replies=session_reply) as llm, \
+            offline_environment(tmp, profiler, market, llm.url, settings):
+        write_universe(config.UNIVERSE_DIR, 'perf', tickers)
+        setup_rss = peak_rss_mb()
+        wall, cpu, children = time.perf_counter(), time.process_time(), os.times()
+
+        with profiler.stage('startup'):
+            captain = Captain()
+        fills = []
+        execute_batch = captain.executor.execute_batch
+
+        def record_fills(orders, prices=None):
+            result = execute_batch(orders, prices=prices)
+            fills.extend(result)
+            return result
+
+        captain.executor.execute_batch = record_fills
+        for obj, method, stage in [(captain.executor, 'update_live_values', 'portfolio'),
+                                   (captain.portfolio_mgr, 'evaluate_portfolio', 'guidance'),
+                                   (captain.scanner, 'run', 'scan'),
+                                   (captain.analyst, 'run', 'analyze'),
+                                   (captain.risk_manager, 'load_history', 'risk'),
+                                   (captain.risk_manager, 'validate_many', 'risk'),
+                                   (captain.executor, 'execute_batch', 'execute'),
+                                   (captain.reporter, 'generate_daily_report', 'report')]:
+            profiler.instrument(obj, method, stage)
+        for strategy in captain.strategies:
+            profiler.instrument(strategy, 'run', 'strategy')
+
+        captain.start_day()
+
+        ended = os.times()
+        wall_s = time.perf_counter() - wall
+        cpu_s = (time.process_time() - cpu + ended.children_user + ended.children_system
+                 - children.children_user - children.children_system)
+        throttled = get_data_access_stats()['upstreams'].get('yahoo', {}).get('throttled_seconds', 0.0)
+
+    network = profiler.counts()
+    llm_calls = network.pop('llm')
+    return {
+        'universe': size,
+        'wall_s': wall_s,
+        'cpu_s': cpu_s,
+        'peak_rss_mb': peak_rss_mb(),
+        'setup_rss_mb': setup_rss,
+        'peak_rss_children_mb': peak_rss_mb(children=True),
+        'network_calls': sum(network.values()),
+        'network': network,
+        'llm_calls': llm_calls,
+        'analyzed': profiler.results['analyze']['calls'],
+        'fills': len(fills),
+        'throttled_s': throttled,
+        'sharded_scan': sharded and config.ENABLE_SHARDED_SCAN and size >= config.SHARDED_SCAN_MIN_TICKERS,
+        'stages': profiler.report(wall_s, cpu_s),
+    }
+
+
+def run_isolated(size, args):
+    """Run one size in a fresh interpreter and return its result."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'result.json')
+        command = [sys.executable, os.path.abspath(__file__), '--child', str(size), '--result', path,
+                   '--llm-latency', args.llm_latency, '--llm-tokens-per-sec', str(args.llm_tokens_per_sec),
+                   '--seed', str(args.seed)] + (['--throttled'] if args.throttled else [])
+        output = None if args.verbose else subprocess.DEVNULL
+        subprocess.run(command, check=True, stdout=output, cwd=os.path.dirname(os.path.abspath(__file__)))
+        with open(path, 'r') as f:
+            return json.load(f)
+
+
+def print_run(run):
+    print(f"\nUniverse {run['universe']}: {run['wall_s']:.2f}s wall, {run['cpu_s']:.2f}s CPU, "
+          f"peak RSS {run['peak_rss_mb'] or 0:.0f} MB, {run['network_calls']} network / {run['llm_calls']} LLM calls, "
+          f"{run['analyzed']} analyzed, {run['fills']} fills")
+    print(f"  {'stage':<10} {'calls':>6} {'wall s':>8} {'cpu s':>8} {'+rss MB':>7} {'network':>8} {'llm':>5}")
+    for stage, s in run['stages'].items():
+        rss = f"{s['rss_growth_mb']:.0f}" if s['rss_growth_mb'] is not None else '-'
+        print(f"  {stage:<10} {s['calls']:>6} {s['wall_s']:>8.3f} {s['cpu_s']:>8.3f} "
+              f"{rss:>7} {sum(s['network'].values()):>8} {s['llm_calls']:>5}")
+
+
+def print_diff(rows):
+    regressions = [row for row in rows if row[-1]]
+    print(f"\nCompared with baseline: {len(regressions)} regressions in {len(rows)} metrics")
+    for size, stage, metric, old, new, change, _ in regressions:
+        print(f"  REGRESSION universe {size} {stage:<10} {metric:<14} {old:>10.3f} -> {new:>10.3f} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark a full trading session offline")
+    parser.add_argument('--sizes', default='50,500,5000', help="Comma-separated universe sizes")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="Where to write the results JSON")
+    parser.add_argument('--baseline', help="Results JSON to compare against (created if missing)")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Relative slowdown counted as a regression")
+    parser.add_argument('--llm-latency', default='fixed:0.02', help="Mock LLM time to first token (see mock_ollama.py)")
+    parser.add_argument('--llm-tokens-per-sec', type=float, default=0.0, help="Mock LLM generation speed (0 = instant)")
+    parser.add_argument('--throttled', action='store_true',
+                        help="Keep the download rate limits (wall time includes throttling)")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--verbose', action='store_true', help="Show the sessions' log output")
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        run = run_session(args.child, parse_latency(args.llm_latency), args.llm_tokens_per_sec,
+                          args.seed, args.throttled)
+        with open(args.result, 'w') as f:
+            json.dump(run, f)
+        return
+
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'settings': {'llm_latency': args.llm_latency, 'llm_tokens_per_sec': args.llm_tokens_per_sec,
+                     'throttled': args.throttled, 'seed': args.seed},
+        'runs': {},
+    }
+    for size in [int(s) for s in args.sizes.split(',')]:
+        print(f"Benchmarking universe of {size} tickers...")
+        run = run_isolated(size, args)
+        results['runs'][str(size)] = run
+        print_run(run)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        if not os.path.exists(args.baseline):
+            shutil.copyfile(args.output, args.baseline)
+            print(f"No baseline yet - saved this run as {args.baseline}")
+            return
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        settings = baseline.get('settings', {})
+        if settings.get('throttled', not settings.get('unthrottled', False)) != args.throttled:
+            print("Warning: baseline and run differ in --throttled, wall times are not comparable")
+        if print_diff(diff_results(baseline, results, args.threshold)):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
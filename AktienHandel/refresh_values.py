@@ -1,5 +1,6 @@
 
 from agents.execution import ExecutionAgent
+import sys
 import time
 
 def refresh():
@@ -13,5 +14,23 @@ def refresh():
     print(f"Holdings Value: EUR {state['total_value'] - state['cash']:.2f}")
     print("Done.")
 
+def publish_panel():
+    """Download the scan universe once and publish it as a memory-mapped price panel."""
+    import config
+    from utils.data_loader import fetch_price_panel, publish_price_panel
+    from utils.universe_manager import UniverseManager
+
+    universe = UniverseManager().get_universe(config.UNIVERSE_MODE, config.ENABLE_CRYPTO, config.CUSTOM_UNIVERSE)
+    tickers = universe['stocks'] + universe['crypto']
+    print(f"Downloading {config.SCAN_PERIOD} of history for {len(tickers)} tickers...")
+    start = time.time()
+    panel = fetch_price_panel(tickers, period=config.SCAN_PERIOD)
+    publish_price_panel(panel, period=config.SCAN_PERIOD)
+    print(panel.memory_report())
+    print(f"Published to {config.PRICE_PANEL_DIR} in {time.time() - start:.1f}s")
+
 if __name__ == "__main__":
-    refresh()
+    if "--publish-panel" in sys.argv:
+        publish_panel()
+    else:
+        refresh()
@@ -0,0 +1,114 @@
+"""
+Load test for the trading loop.
+
+Streams synthetic (GBM / jump-diffusion) or stored bars through the
+event-driven TradingSession (RiskManager + ExecutionAgent) at increasing
+message rates, using an isolated temporary portfolio, and reports throughput,
+latency and per-stage cost for each rate. The saturation point is the highest
+rate the loop keeps up with.
+
+    python simulate_load.py --tickers 2000 --bars 260 --rates 2000,10000,50000,0
+    python simulate_load.py --source panel --rates 5000,0   # published price panel
+"""
+
+import argparse
+import tempfile
+import config
+from agents.execution import ExecutionAgent
+from agents.risk_manager import RiskManager
+from agents.session import TradingSession
+from utils.feeds import PanelFeed
+from utils.price_panel import PricePanel
+from utils.simulator import synthetic_panel
+
+
+def run_load(panel, rate, interval='1d', max_trades=1000):
+    """
+    Stream a panel through a fresh session at one target rate.
+
+    Args:
+        panel (PricePanel): Bars to stream
+        rate (float): Target bar messages per second (0 = unthrottled)
+        interval (str): Bar interval of the panel
+        max_trades (int): Order limit for the session (high so execution is exercised)
+
+    Returns:
+        dict: Session report plus 'target_rate' and 'keeps_up'
+    """
+    daily_limit = config.MAX_TRADES_PER_DAY
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            config.MAX_TRADES_PER_DAY = max_trades  # The risk manager's daily limit would stop orders early
+            executor = ExecutionAgent(data_dir=tmp)
+            risk_mgr = RiskManager()
+            risk_mgr.portfolio_risk = None  # No return history for synthetic tickers
+            risk_mgr.equity_curve = executor.equity_curve
+            session = TradingSession(risk_mgr, executor, interval=interval, max_trades=max_trades)
+            report = session.run(PanelFeed(panel, rate=rate))
+        finally:
+            config.MAX_TRADES_PER_DAY = daily_limit
+
+    report['target_rate'] = rate
+    # Keeping up: at least 95% of the target rate and no lag building up
+    report['keeps_up'] = bool(rate) and report['bars_per_sec'] >= 0.95 * rate and report['lag_ms']['p99'] < 100
+    return report
+
+
+def find_saturation(panel, rates, interval='1d', max_trades=1000):
+    """
+    Run every rate and return (reports, highest rate the loop kept up with or None).
+    """
+    reports = [run_load(panel, rate, interval, max_trades) for rate in rates]
+    sustained = [r['target_rate'] for r in reports if r['keeps_up']]
+    return reports, max(sustained) if sustained else None
+
+
+def print_report(reports, saturation):
+    print(f"\n{'target/s':>10} {'achieved/s':>11} {'bar p50':>9} {'bar p99':>9} {'lag p99':>9} "
+          f"{'fill p50':>9} {'fills':>6}")
+    for r in reports:
+        target = f"{r['target_rate']:.0f}" if r['target_rate'] else 'max'
+        print(f"{target:>10} {r['bars_per_sec']:>11.0f} {r['latency_ms']['p50']:>8.3f}ms "
+              f"{r['latency_ms']['p99']:>7.3f}ms {r['lag_ms']['p99']:>7.1f}ms "
+              f"{r['signal_to_fill_ms']['p50']:>7.2f}ms {r['fills']:>6}")
+
+    print("\nPer-stage cost (last run):")
+    for stage, s in reports[-1]['stages'].items():
+        capacity = f"{s['max_per_sec']:.0f}/s" if s['max_per_sec'] else '-'
+        print(f"  {stage:<11} {s['calls']:>8} calls  {s['mean_ms']:>8.3f} ms mean  capacity {capacity}")
+
+    if saturation:
+        print(f"\nSaturation: keeps up with {saturation:.0f} bars/s")
+    else:
+        print("\nSaturation: did not keep up with any throttled rate")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the trading loop with simulated quotes")
+    parser.add_argument('--source', choices=['gbm', 'jump', 'panel'], default='gbm',
+                        help="Synthetic price model or the published price panel")
+    parser.add_argument('--tickers', type=int, default=1000)
+    parser.add_argument('--bars', type=int, default=260)
+    parser.add_argument('--interval', default='1d', help="Bar interval (windows are in time: 1d needs 200+ bars for trend signals)")
+    parser.add_argument('--rates', default='1000,5000,20000,0', help="Comma-separated bars/sec (0 = unthrottled)")
+    parser.add_argument('--max-trades', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    if args.source == 'panel':
+        panel = PricePanel.attach(config.PRICE_PANEL_DIR)
+        if panel is None:
+            raise SystemExit("No published price panel (run: python refresh_values.py --publish-panel)")
+        interval = panel.manifest['meta'].get('interval', '1d')
+    else:
+        panel = synthetic_panel(args.tickers, args.bars, args.interval, model=args.source, seed=args.seed)
+        interval = args.interval
+
+    rates = [float(r) for r in args.rates.split(',')]
+    print(f"Streaming {len(panel)} tickers x {len(panel.dates)} bars ({args.source}, {interval}) at {args.rates} bars/s")
+    reports, saturation = find_saturation(panel, rates, interval, args.max_trades)
+    print_report(reports, saturation)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,28 @@
 Quick test script to verify the new components work correctly.
 """
 
+import contextlib
 import sys
 import os
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+
+@contextlib.contextmanager
+def config_overrides(**values):
+    """Temporarily set config attributes; the previous values are restored on exit."""
+    import config
+    saved = {name: getattr(config, name) for name in values}
+    try:
+        for name, value in values.items():
+            setattr(config, name, value)
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(config, name, value)
+
+
 def test_universe_manager():
     """Test universe manager."""
     print("\n=== Testing Universe Manager ===")
@@ -33,6 +49,163 @@ def test_universe_manager():
     print(f"[OK] Universe Manager: {um.get_total_count('us_stocks', True)} total tickers")
 
 
+def test_universe_files():
+    """Test universes are loaded from symbol files and unions are cached."""
+    print("\n=== Testing Universe Files ===")
+    import csv
+    import tempfile
+    from utils.universe_manager import UniverseManager
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, 'broad.csv'), 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['symbol', 'exchange', 'asset_class', 'sector'])
+            writer.writerows([f'S{i:04d}', 'US', 'stock', 'Industrials'] for i in range(5000))
+        with open(os.path.join(tmp, 'crypto.csv'), 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['symbol', 'exchange', 'asset_class', 'sector'])
+            writer.writerow(['BTC-USD', 'CRYPTO', 'crypto', 'Crypto'])
+
+        um = UniverseManager(tmp)
+        universe = um.get_universe('broad', enable_crypto=True)
+        assert len(universe['stocks']) == 5000 and universe['crypto'] == ['BTC-USD']
+        assert um.get_universe('all', enable_crypto=False)['stocks'] == universe['stocks']
+        assert um.index.union(['broad']) is um.index.union(['broad'])  # cached, not rebuilt
+        assert UniverseManager(tmp).index is um.index  # loaded once per process
+        assert um.get_sector('S0042') == 'Industrials' and um.get_sector('XYZ') == 'Unknown'
+        assert um.get_info('S0042')['exchange'] == 'US'
+        print("[OK] 5,000-symbol universe loaded once with cached unions")
+
+
+def test_symbol_index():
+    """Test symbol metadata lookups and the vectorized crypto mask."""
+    print("\n=== Testing Symbol Index ===")
+    import numpy as np
+    from utils.universe_manager import UniverseManager
+
+    um = UniverseManager()
+    info = um.get_info('SIE.DE')
+    assert (info['exchange'], info['currency'], info['calendar']) == ('XETRA', 'EUR', 'XETR')
+    assert um.get_currency('HSBA.L') == 'GBp' and um.get_calendar('BTC-USD') == '24/7'
+    assert um.get_info('NEWCOIN-USD')['asset_class'] == 'crypto'  # unlisted, inferred
+    assert um.get_sector('NOTLISTED') == 'Unknown'
+    print("[OK] Exchange, currency, calendar and sector metadata")
+
+    tickers = ['AAPL', 'BTC-USD', 'SIE.DE', 'ETH-USD', 'NEWCOIN-USD', 'ZZZZ']
+    mask = um.crypto_mask(tickers)
+    assert mask.tolist() == [um.is_crypto(t) for t in tickers] == [False, True, False, True, True, False]
+    assert um.crypto_mask(np.array(tickers * 1000)).sum() == 3000
+    print("[OK] Vectorized crypto mask matches scalar lookups")
+
+
+def test_sharded_scan():
+    """Test sharded screening merges shard results into one top-k."""
+    print("\n=== Testing Sharded Scan ===")
+    from concurrent.futures import ThreadPoolExecutor
+    import numpy as np
+    import pandas as pd
+    import config
+    import agents.market_scanner as scanner_module
+    from agents.market_scanner import MarketScanner, screen_shard
+    from utils.data_loader import split_rate_limits
+
+    def fake_batch(tickers, period="6mo", **kwargs):
+        data = {}
+        for ticker in tickers:
+            trend = int(ticker[1:]) / 10000.0  # higher number = stronger uptrend
+            closes = 100 * np.cumprod(np.full(120, 1 + trend))
+            data[ticker] = pd.DataFrame({'Close': closes, 'Volume': np.full(120, 1e6)},
+                                        index=pd.date_range('2025-01-01', periods=120))
+        return data
+
+    tickers = [f'T{i}' for i in range(1, 101)]
+    original = (scanner_module.fetch_batch_data, scanner_module.ProcessPoolExecutor,
+                config.SCAN_SHARD_SIZE, config.TOP_CANDIDATES_COUNT)
+    scanner_module.fetch_batch_data = fake_batch
+    scanner_module.ProcessPoolExecutor = ThreadPoolExecutor  # same interface, shares the patched fetch
+    config.SCAN_SHARD_SIZE, config.TOP_CANDIDATES_COUNT = 7, 5
+    try:
+        shard, stats, closes = screen_shard(tickers[:10], ['stock'] * 10, top_k=3, history_days=30)
+        assert sorted(c['ticker'] for c in shard) == ['T10', 'T8', 'T9'] and stats['accepted'] == 10
+        assert set(closes) == {'T8', 'T9', 'T10'} and len(closes['T10']) == 30
+        print("[OK] Shard keeps only its top-k candidates and their history")
+
+        scanner = MarketScanner()
+        entered = []
+        scanner.held, scanner.on_candidate = {'T3'}, lambda candidate, leaders: entered.append(candidate['ticker'])
+        top = scanner._rank_candidates(scanner._sharded_screen(tickers))
+        assert [c['ticker'] for c in top] == ['T100', 'T99', 'T98', 'T97', 'T96']
+        assert set(scanner.history) == {'T100', 'T99', 'T98', 'T97', 'T96', 'T3'}  # Held position kept
+        assert {'T100', 'T96'} <= set(entered)  # Leaders reported while shards are merged
+        print("[OK] 15 shards merged into the global top 5")
+        scanner.held, scanner.on_candidate = set(), None
+
+        requested = []
+
+        def failing_batch(tickers, period="6mo", **kwargs):
+            requested.extend(tickers)
+            if 'T50' in tickers:
+                raise ConnectionError("upstream reset")
+            return fake_batch(tickers, period)
+
+        scanner_module.fetch_batch_data = failing_batch
+        top = scanner._rank_candidates(scanner._sharded_screen(tickers))
+        assert len(requested) == len(tickers)  # No sequential re-download of merged shards
+        assert [c['ticker'] for c in top] == ['T100', 'T99', 'T98', 'T97', 'T96']
+        print("[OK] A failing shard is skipped without re-screening the others")
+    finally:
+        (scanner_module.fetch_batch_data, scanner_module.ProcessPoolExecutor,
+         config.SCAN_SHARD_SIZE, config.TOP_CANDIDATES_COUNT) = original
+        split_rate_limits(1)  # The thread pool ran the workers' initializer in this process
+
+
+def test_streaming_top_k():
+    """Test the screening generator ranks with a bounded heap as chunks arrive."""
+    print("\n=== Testing Streaming Top-K Screening ===")
+    import numpy as np
+    import pandas as pd
+    import config
+    import agents.market_scanner as scanner_module
+    from agents.market_scanner import MarketScanner
+    from utils.top_k import TopK
+
+    top = TopK(3).extend({'score': s} for s in [5, 1, 9, 3, 7, 2])
+    assert [item['score'] for item in top.items()] == [9, 7, 5] and top.threshold() == 5
+    assert not top.push({'score': 4}) and top.push({'score': 6})
+    print("[OK] TopK keeps the k best items")
+
+    requested = []
+
+    def fake_batch(tickers, period="6mo", **kwargs):
+        requested.append(len(tickers))
+        index = pd.date_range('2025-01-01', periods=80)
+        return {t: pd.DataFrame({'Close': 100 * np.cumprod(np.full(80, 1 + int(t[1:]) / 10000.0)),
+                                 'Volume': np.full(80, 1e6)}, index=index) for t in tickers}
+
+    original = (scanner_module.fetch_batch_data, config.SCAN_CHUNK_SIZE, config.TOP_CANDIDATES_COUNT)
+    scanner_module.fetch_batch_data = fake_batch
+    config.SCAN_CHUNK_SIZE, config.TOP_CANDIDATES_COUNT = 100, 5
+    try:
+        scanner = MarketScanner()
+        leaders = TopK(5, key=lambda entry: entry[0]['score'])
+        stream = scanner.stream([f'T{i}' for i in range(250, 0, -1)], leaders)
+        first = next(stream)
+        assert first['ticker'] == 'T250' and requested == [100]  # yielded before later chunks are fetched
+        yielded = [first] + list(stream)
+        assert requested == [100, 100, 50] and len(yielded) == 5  # weaker tickers never enter the heap
+        assert [c['ticker'] for c, _ in leaders.items()] == ['T250', 'T249', 'T248', 'T247', 'T246']
+
+        entered = []
+        scanner.held = {'T1'}
+        scanner.on_candidate = lambda candidate, leaders: entered.append((candidate['ticker'], leaders))
+        candidates = scanner._technical_screen([f'T{i}' for i in range(1, 251)])
+        assert len(candidates) == 5 and set(scanner.history) == {c['ticker'] for c in candidates} | {'T1'}
+        assert entered[-1] == ('T250', ['T250', 'T249', 'T248', 'T247', 'T246'])  # Leaders reported as they change
+        print("[OK] Leaders streamed per chunk, only top-K kept in memory")
+    finally:
+        scanner_module.fetch_batch_data, config.SCAN_CHUNK_SIZE, config.TOP_CANDIDATES_COUNT = original
+
+
 def test_news_fetcher():
     """Test news fetcher."""
     print("\n=== Testing News Fetcher ===")
@@ -75,6 +248,534 @@ def test_data_loader():
     print(f"[OK] Batch fetch: {len(results)}/{len(tickers)} successful")
 
 
+def test_bulk_downloader():
+    """Test chunked downloads with retries, partial results and quarantine."""
+    print("\n=== Testing Bulk Downloader ===")
+    import tempfile
+    import pandas as pd
+    from utils.data_loader import BulkDownloader
+
+    calls = []
+
+    def fake_download(tickers, period, interval):
+        calls.append(list(tickers))
+        if len(tickers) > 1 and 'BAD1' in tickers:
+            raise RuntimeError("batch rejected")
+        return {t: pd.DataFrame({'Close': [1.0, 2.0]}) for t in tickers if not t.startswith('BAD')}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sleeps = []
+        loader = BulkDownloader(chunk_size=3, max_workers=2, max_retries=2, backoff_base=1.0, backoff_max=10.0,
+                                quarantine_after=2, quarantine_days=1, download=fake_download,
+                                health_file=os.path.join(tmp, 'health.json'), sleep=sleeps.append)
+        tickers = ['A', 'B', 'C', 'BAD1', 'D', 'E', 'F', 'BAD2']
+        results = loader.download(tickers)
+
+        assert sorted(results) == ['A', 'B', 'C', 'D', 'E', 'F']  # failed chunk recovered ticker by ticker
+        assert sum(len(c) > 1 for c in calls) == 3  # 8 tickers in chunks of 3
+        assert len(sleeps) == 2 and 0.5 <= sleeps[0] <= 1.5 and 1.0 <= sleeps[1] <= 3.0
+        assert loader.metrics['failed'] == 2 and loader.metrics['downloaded'] == 6
+        assert loader.metrics['tickers_per_sec'] > 0 and loader.metrics['bytes'] > 0
+        print("[OK] Partial results with per-ticker retries and exponential backoff")
+
+        loader.download(tickers)
+        assert loader.is_quarantined('BAD1') and loader.failure_rate('BAD1') == 1.0
+        assert not loader.is_quarantined('A') and loader.failure_rate('A') == 0.0
+        calls.clear()
+        reloaded = BulkDownloader(download=fake_download, health_file=os.path.join(tmp, 'health.json'),
+                                  sleep=lambda s: None)
+        assert sorted(reloaded.download(tickers)) == ['A', 'B', 'C', 'D', 'E', 'F']
+        assert not any('BAD1' in c or 'BAD2' in c for c in calls)
+        print("[OK] Chronically failing tickers quarantined across sessions")
+
+        offline = BulkDownloader(download=lambda *a: {}, health_file=os.path.join(tmp, 'offline.json'),
+                                 sleep=lambda s: None)
+        assert offline.download(['X', 'Y']) == {} and offline.failure_rate('X') == 0.0
+        print("[OK] Total outage is not held against individual tickers")
+
+        # Scan workers share one health file: each save merges instead of overwriting
+        shared = os.path.join(tmp, 'shared.json')
+        workers = [BulkDownloader(download=fake_download, health_file=shared, max_retries=0, sleep=lambda s: None)
+                   for _ in range(2)]
+        workers[0].download(['A', 'BAD2'])
+        workers[1].download(['B', 'BAD3'])
+        workers[0].download(['A', 'BAD2'])
+        merged = BulkDownloader(download=fake_download, health_file=shared).health
+        assert sorted(merged) == ['A', 'B', 'BAD2', 'BAD3'] and merged['BAD2']['failures'] == 2
+        assert merged['A']['attempts'] == 2 and 'BAD3' in workers[0].health
+        assert not [f for f in os.listdir(tmp) if f.endswith('.tmp')]
+        print("[OK] Health of concurrent downloaders merged into one file")
+
+
+def test_rate_limit():
+    """Test the token bucket and coalescing of identical in-flight requests."""
+    print("\n=== Testing Rate Limit ===")
+    import threading
+    import time
+    from utils.rate_limit import TokenBucket, SingleFlight
+
+    now = [0.0]
+
+    def fake_sleep(seconds):
+        now[0] += seconds
+
+    bucket = TokenBucket(rate=2.0, burst=3, clock=lambda: now[0], sleep=fake_sleep)
+    waits = [bucket.acquire() for _ in range(5)]
+    assert waits[:3] == [0.0, 0.0, 0.0] and abs(waits[3] - 0.5) < 1e-9 and abs(waits[4] - 0.5) < 1e-9
+    assert not bucket.try_acquire()
+    assert bucket.stats() == {'requests': 5, 'throttled_seconds': 1.0}
+    print("[OK] Bursts pass, sustained requests are spaced at the configured rate")
+
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    executed = []
+
+    def slow_fetch():
+        executed.append(1)
+        started.set()
+        release.wait(5)
+        return {'AAPL': 1}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do('AAPL', slow_fetch)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flights.do('AAPL', slow_fetch))) for _ in range(4)]
+    for t in followers:
+        t.start()
+    while flights.stats()['deduplicated'] < 4:
+        time.sleep(0.01)
+    release.set()
+    for t in [leader] + followers:
+        t.join(5)
+
+    assert len(executed) == 1 and len(results) == 5
+    assert all(shared for _, shared in results) and all(r == {'AAPL': 1} for r, _ in results)
+    assert flights.stats() == {'calls': 5, 'executed': 1, 'deduplicated': 4}
+    assert flights.do('AAPL', lambda: 2) == (2, False)  # a lone caller keeps its result
+    assert flights.stats()['executed'] == 2  # completed calls are not cached
+    print("[OK] Concurrent identical requests share one upstream call")
+
+    from utils.data_loader import get_rate_limiter, split_rate_limits
+    with config_overrides(RATE_LIMITS={'yahoo': (4.0, 10), 'default': (5.0, 10)}):
+        try:
+            split_rate_limits(4)  # e.g. in each of 4 scan workers
+            assert get_rate_limiter('yahoo').rate == 1.0 and get_rate_limiter('yahoo').burst == 2.5
+            split_rate_limits(1)
+            assert get_rate_limiter('yahoo').rate == 4.0 and get_rate_limiter('yahoo').burst == 10
+        finally:
+            split_rate_limits(1)  # Drop the buckets built from the overridden limits
+    print("[OK] Worker processes split the upstream rate limits")
+
+
+def test_price_panel():
+    """Test the compact columnar price panel."""
+    print("\n=== Testing Price Panel ===")
+    import numpy as np
+    import pandas as pd
+    from utils.price_panel import PricePanel
+    from utils.portfolio_risk import PortfolioRiskEngine
+
+    dates = pd.date_range('2024-01-01', periods=300, freq='B')
+    rng = np.random.default_rng(3)
+    frames = {}
+    for i, ticker in enumerate(['AAA', 'BBB', 'CCC']):
+        idx = dates[i * 10:]  # later listings start later
+        close = 100 * np.cumprod(1 + rng.normal(0, 0.01, len(idx)))
+        frames[ticker] = pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99,
+                                       'Close': close, 'Volume': rng.integers(1e5, 1e6, len(idx)).astype(float)},
+                                      index=idx)
+
+    panel = PricePanel.from_frames(frames)
+    assert len(panel) == 3 and len(panel.dates) == 300
+    assert panel.field('Close').dtype == np.float32 and panel.field('Volume').dtype == np.int64
+    assert panel.field('Close').flags['F_CONTIGUOUS']
+    view = panel.series('BBB')
+    assert np.shares_memory(view, panel.field('Close')) and view.flags['C_CONTIGUOUS']
+    assert np.isnan(view[:10]).all() and panel.field('Volume')[:10, 1].sum() == 0
+    print("[OK] Shared date index, float32 prices, int64 volume, zero-copy ticker views")
+
+    np.testing.assert_allclose(panel.latest(), [frames[t]['Close'].iloc[-1] for t in panel.tickers], rtol=1e-6)
+    restored = panel.frame('CCC')
+    assert restored.index.equals(frames['CCC'].index)
+    np.testing.assert_allclose(restored['Close'], frames['CCC']['Close'], rtol=1e-6)
+    usage = panel.memory_usage()
+    assert usage['total'] == 300 * 3 * (4 * 4 + 8) + panel.dates.nbytes
+    assert "DataFrames" in panel.memory_report(frames)
+    print("[OK] Round trip to DataFrames and memory report")
+
+    import utils.data_loader as data_loader
+    requested = []
+
+    def fake_batch(tickers, period="1y", interval="1d", max_workers=None):
+        requested.append(list(tickers))
+        return {t: frames[t] for t in tickers if t in frames}
+
+    original = data_loader.fetch_batch_data
+    data_loader.fetch_batch_data = fake_batch
+    try:
+        chunked = data_loader.fetch_price_panel(['AAA', 'BBB', 'XXX', 'CCC'], chunk_size=2)
+    finally:
+        data_loader.fetch_batch_data = original
+    assert requested == [['AAA', 'BBB'], ['XXX', 'CCC']] and chunked.tickers == ['AAA', 'BBB', 'CCC']
+    assert chunked.dates.equals(panel.dates)
+    np.testing.assert_array_equal(chunked.field('Close'), panel.field('Close'))
+    assert chunked.to_series('CCC').index.equals(frames['CCC'].index)
+    print("[OK] Panel filled chunk by chunk")
+
+    engine = PortfolioRiskEngine()
+    engine.add_panel(panel)
+    assert set(engine.closes) == {'AAA', 'BBB', 'CCC'}
+    print("[OK] Risk engine reads closes from a panel")
+
+
+def test_price_panel_mmap():
+    """Test exporting a price panel and attaching it as read-only memory maps."""
+    print("\n=== Testing Memory-Mapped Price Panel ===")
+    import tempfile
+    import numpy as np
+    import pandas as pd
+    from utils.price_panel import PricePanel
+    from utils.data_loader import publish_price_panel, get_shared_panel
+
+    dates = pd.date_range('2024-01-01', periods=50, freq='B')
+    frames = {t: pd.DataFrame({'Close': np.arange(50, dtype=float) + i, 'Volume': np.full(50, 1000.0)}, index=dates)
+              for i, t in enumerate(['AAA', 'BBB'])}
+    panel = PricePanel.from_frames(frames)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest = publish_price_panel(panel, period='6mo', directory=tmp)
+        attached = PricePanel.attach(tmp)
+        close = attached.field('Close')
+        assert isinstance(close.base, np.memmap) and not close.flags.writeable
+        assert np.shares_memory(attached.series('BBB'), close)
+        assert attached.tickers == ['AAA', 'BBB'] and attached.dates.equals(panel.dates)
+        np.testing.assert_array_equal(close, panel.field('Close'))
+        assert attached.manifest['generation'] == manifest['generation']
+        print("[OK] Export and zero-copy read-only attach")
+
+        shared = get_shared_panel('6mo', directory=tmp)
+        assert shared is get_shared_panel('6mo', directory=tmp)  # attached once per export
+        assert get_shared_panel('1y', directory=tmp) is None
+        assert get_shared_panel('6mo', max_age=-1, directory=tmp) is None
+
+        frames['AAA']['Close'] += 100
+        publish_price_panel(PricePanel.from_frames(frames), period='6mo', directory=tmp)
+        assert get_shared_panel('6mo', directory=tmp).latest()[0] == 149.0
+        assert shared.latest()[0] == 49.0  # old mapping stays consistent
+        print("[OK] New exports replace the shared panel atomically")
+
+
+def test_intraday_bars():
+    """Test the interval/day partitioned bar cache, resampling and time windows."""
+    print("\n=== Testing Intraday Bars ===")
+    import tempfile
+    from datetime import date, datetime
+    import numpy as np
+    import pandas as pd
+    from utils.bars import BarStore, resample_bars
+    from utils import indicators
+
+    stamps = pd.DatetimeIndex([t for d in ['2025-03-03', '2025-03-04', '2025-03-05']
+                               for t in pd.date_range(f'{d} 09:30', f'{d} 15:55', freq='5min')])
+    n = len(stamps)
+    bars = pd.DataFrame({'Open': np.arange(n, dtype=float), 'High': np.arange(n) + 1.0,
+                         'Low': np.arange(n) - 1.0, 'Close': np.arange(n) + 0.5,
+                         'Volume': np.full(n, 10.0)}, index=stamps.tz_localize('America/New_York'))
+
+    hourly = resample_bars(bars, '1h')
+    assert len(hourly) == 3 * 7 and str(hourly.index[1].time()) == '10:30:00'
+    first = hourly.iloc[0]
+    assert first['Open'] == 0 and first['High'] == 12 and first['Low'] == -1
+    assert first['Close'] == 11.5 and first['Volume'] == 120
+    daily = resample_bars(bars, '1d')
+    assert len(daily) == 3 and daily['Volume'].iloc[0] == 78 * 10
+    print("[OK] Vectorized resampling aligned to the session open")
+
+    calls = []
+
+    def fake_download(ticker, period, interval):
+        calls.append((ticker, period, interval))
+        return bars
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = BarStore(directory=tmp, today_ttl=3600, download=fake_download, today=lambda: date(2025, 3, 5))
+        first_get = store.get('AAPL', '5m', days=5)
+        assert len(first_get) == n and calls == [('AAPL', '5d', '5m')]
+        assert os.path.exists(os.path.join(tmp, '5m', '2025-03-04', 'AAPL.csv'))
+        assert os.path.exists(os.path.join(tmp, '5m', '2025-03-01', 'AAPL.csv'))  # weekend cached as empty
+        assert len(store.get('AAPL', '5m', days=5)) == n and len(calls) == 1
+        print("[OK] Days cached per interval/day, no repeat downloads")
+
+        from_cache = store.get('AAPL', '1h', days=3)
+        assert len(calls) == 1 and len(from_cache) == 21
+        np.testing.assert_allclose(from_cache['Close'].to_numpy(), hourly['Close'].to_numpy())
+        print("[OK] Coarser bars built from cached finer bars")
+
+        store.today_ttl = -1  # today's partition is always stale now
+        store.get('AAPL', '5m', days=5)
+        assert calls[-1] == ('AAPL', '1d', '5m')
+        print("[OK] Only today's partition is refreshed")
+
+        # A past day written while it was still trading is downloaded again, then trusted
+        store.today_ttl = 3600
+        partial = os.path.join(tmp, '5m', '2025-03-03', 'AAPL.csv')
+        during = datetime(2025, 3, 3, 15, 0).timestamp()
+        os.utime(partial, (during, during))
+        store.get('AAPL', '5m', days=5)
+        assert calls[-1] == ('AAPL', '3d', '5m') and os.path.getmtime(partial) > during
+        store.get('AAPL', '5m', days=5)
+        assert calls[-1] == ('AAPL', '3d', '5m') and len(calls) == 3
+        print("[OK] Past partitions written before the day ended are refreshed")
+
+    assert indicators.window_bars('50d', '1d') == 50
+    assert indicators.window_bars('20d', '1h') == 20 * 7
+    assert indicators.window_bars('4h', '15m') == 16
+    assert indicators.window_bars('1d', '1h', 'crypto') == 24
+    assert indicators.periods_per_year('1d') == 252
+    assert indicators.calendar_days('200d') == 284 and indicators.calendar_days('200d', 'crypto') == 200
+    print("[OK] Indicator windows expressed in time")
+
+    import config
+    import agents.analyst as analyst_module
+    requested = []
+
+    def fake_bars(ticker, interval='1d', days=None):
+        requested.append(days)
+        return hourly  # 3 days of 1h bars: too short for the 50/200-day averages
+
+    original = (analyst_module.fetch_bars, config.USE_AI)
+    analyst_module.fetch_bars, config.USE_AI = fake_bars, False
+    try:
+        analysis = analyst_module.Analyst().run('AAPL', '1h')
+    finally:
+        analyst_module.fetch_bars, config.USE_AI = original
+    assert requested == [max(config.INTRADAY_LOOKBACK_DAYS, 284)]
+    assert analysis['sma50'] is None and analysis['sma200'] is None and analysis['current_price'] == 233.5
+    print("[OK] Intraday analysis sized for the 200-day average, unavailable averages reported as None")
+
+
+def test_event_session():
+    """Test incremental indicators, the replay feed and the event-driven session."""
+    print("\n=== Testing Event-Driven Session ===")
+    import tempfile
+    import numpy as np
+    import pandas as pd
+    from utils import indicators
+    from utils.incremental import IndicatorState
+    from utils.feeds import ReplayFeed
+
+    rng = np.random.default_rng(11)
+    dates = pd.date_range('2023-01-02', periods=400, freq='B')
+    up = 50 * np.cumprod(1 + 0.004 + rng.normal(0, 0.01, 400))
+    flat = 80 * np.cumprod(1 + rng.normal(0, 0.01, 400))
+    volume = rng.integers(1e5, 2e5, 400).astype(float)
+
+    state = IndicatorState('1d')
+    for close, vol in zip(up, volume):
+        state.update(close, vol)
+    snap = state.snapshot()
+    assert np.isclose(snap['sma50'], indicators.sma(up, 50)[-1])
+    assert np.isclose(snap['sma200'], indicators.sma(up, 200)[-1])
+    assert np.isclose(snap['momentum'], indicators.momentum(up, 20))
+    assert np.isclose(snap['rsi'], indicators.rsi(up)[-1])
+    assert np.isclose(snap['volatility'], indicators.volatility(up[-51:]))
+    assert np.isclose(snap['volume_ratio'], volume[-5:].mean() / volume[-20:].mean())
+    print("[OK] Incremental indicators match the batch implementation")
+
+    frames = {t: pd.DataFrame({'Open': c, 'High': c, 'Low': c, 'Close': c, 'Volume': volume}, index=dates)
+              for t, c in (('UPUP', up), ('FLAT', flat))}
+    feed = ReplayFeed(frames)
+    events = list(feed)
+    assert len(events) == len(feed) == 800
+    assert all(a['time'] <= b['time'] for a, b in zip(events, events[1:]))
+    assert len(list(ReplayFeed(frames).subscribe(['UPUP']))) == 400
+    print("[OK] Replay feed merges tickers in time order")
+
+    from agents.execution import ExecutionAgent
+    from agents.risk_manager import RiskManager
+    from agents.session import TradingSession
+
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = ExecutionAgent(data_dir=tmp)
+        risk_mgr = RiskManager()
+        risk_mgr.portfolio_risk = None
+        risk_mgr.equity_curve = executor.equity_curve
+        validate_many, rejected = risk_mgr.validate_many, []
+
+        def reject_first(signals, *args, **kwargs):
+            if not rejected:
+                rejected.append(signals[0]['ticker'])
+                return [False], [0], ["Rejected once"]
+            return validate_many(signals, *args, **kwargs)
+
+        risk_mgr.validate_many = reject_first
+        session = TradingSession(risk_mgr, executor, interval='1d')
+        report = session.run(ReplayFeed(frames))
+
+        assert report['bars'] == 800 and report['tickers'] == 2
+        assert rejected == ['UPUP']  # The rejected BUY is retried on later bars
+        assert report['fills'] >= 1 and session.portfolio['holdings'].get('UPUP', 0) > 0
+        assert report['evaluated'] < report['bars']  # only screened/held tickers reach the strategy
+        assert report['signals'] < report['evaluated']  # risk runs only when a signal changes
+        assert report['latency_ms']['p50'] > 0
+        print(f"[OK] Session traded on replayed bars ({report['fills']} fills, "
+              f"p50 {report['latency_ms']['p50']:.3f} ms/bar)")
+
+        # The daily trade limit counts today's logged fills and starts over on every new day
+        from datetime import date
+        assert executor.count_trades(date.today()) == report['fills'] and session.trades == 0
+        live = TradingSession(risk_mgr, executor, interval='1d', max_trades=report['fills'])
+        live.portfolio = executor.get_portfolio_state({})
+        live.on_bar({'ticker': 'FLAT', 'time': pd.Timestamp(date.today()), 'Close': 80.0, 'Volume': 1e6})
+        assert live.trades == report['fills']  # Limit already reached by the earlier session
+        live.on_bar({'ticker': 'FLAT', 'time': pd.Timestamp(date.today()) + pd.Timedelta(days=1), 'Close': 80.0,
+                     'Volume': 1e6})
+        assert live.trades == 0
+        print("[OK] Daily trade limit seeded from the trade log and reset per day")
+
+
+def test_quote_simulator():
+    """Test synthetic price generation, rate-paced feeds and the load-test driver."""
+    print("\n=== Testing Quote Simulator ===")
+    import numpy as np
+    import utils.data_loader as data_loader
+    from utils.simulator import synthetic_panel
+    from utils.feeds import PanelFeed
+    from simulate_load import run_load
+
+    gbm = synthetic_panel(200, 260, '1d', model='gbm', seed=1)
+    jump = synthetic_panel(200, 260, '1d', model='jump', jump_intensity=50, seed=1)
+    close, high, low = gbm.field('Close'), gbm.field('High'), gbm.field('Low')
+    assert close.shape == (260, 200) and close.dtype == np.float32 and (close > 0).all()
+    assert (high >= close).all() and (low <= close).all()
+    kurtosis = lambda p: (lambda r: ((r - r.mean()) ** 4).mean() / r.var() ** 2)(np.diff(np.log(p.field('Close').astype(float)), axis=0))
+    assert kurtosis(jump) > kurtosis(gbm) + 1  # jumps fatten the tails
+    print("[OK] Vectorized GBM and jump-diffusion panels")
+
+    now = [0.0]
+    sleeps = []
+
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    small = synthetic_panel(10, 5, '1d', seed=2)
+    events = list(PanelFeed(small, rate=100, clock=lambda: now[0], sleep=fake_sleep))
+    assert len(events) == 50 and abs(events[-1]['due'] - 0.49) < 1e-9 and abs(now[0] - 0.49) < 1e-9
+    assert [e['ticker'] for e in events[:10]] == small.tickers
+    print("[OK] Feed paces messages to the target rate")
+
+    original = data_loader.fetch_data
+    data_loader.fetch_data = lambda *args, **kwargs: (_ for _ in ()).throw(AssertionError("network call"))
+    try:
+        report = run_load(synthetic_panel(40, 230, '1d', seed=3), rate=0, max_trades=100)
+    finally:
+        data_loader.fetch_data = original
+    assert report['bars'] == 40 * 230 and report['fills'] > 0
+    assert report['signal_to_fill_ms']['p50'] > 0 and report['stages']['risk']['calls'] > 0
+    assert all(s['mean_ms'] >= 0 for s in report['stages'].values())
+    print(f"[OK] Load test: {report['bars_per_sec']:.0f} bars/s, {report['fills']} fills, no network calls")
+
+
+def test_mock_llm():
+    """Test the mock Ollama server against LLMClient and the agents' reply parsers."""
+    print("\n=== Testing Mock LLM Server ===")
+    import json
+    import threading
+    import time
+    import requests
+    import config
+    from utils.llm_client import LLMClient
+    from utils.mock_llm import MockOllamaServer
+    from agents.strategies.gemini_strategy import GeminiStrategy
+
+    provider, url = config.AI_PROVIDER, config.LOCAL_AI_URL
+    try:
+        with MockOllamaServer(latency=('fixed', 0.0), tokens_per_sec=0, seed=3) as server:
+            config.AI_PROVIDER, config.LOCAL_AI_URL = 'local', server.url
+            client = LLMClient()
+            assert client.enabled
+            decision_prompt = "Stock: AAPL\nRespond with:\nDECISION: BUY or SELL or HOLD\nCONFIDENCE: number\nREASON: text"
+            reply = client.generate(decision_prompt, max_tokens=100)
+            signal = GeminiStrategy._parse_decision(None, reply)
+            assert signal['signal'] in ('BUY', 'SELL', 'HOLD') and 0.4 <= signal['confidence'] <= 0.9
+            assert client.generate(decision_prompt) == reply  # Deterministic per prompt
+            assert client.generate("Recommend:\nSTRATEGY: AGGRESSIVE or HOLD").startswith('STRATEGY:')
+            assert client.generate("Summarize the trading activity")
+            stats = server.stats()
+            assert stats['completed'] == 4 and stats['kinds'] == {'decision': 2, 'strategy': 1, 'text': 1}
+
+            chunks = requests.post(f"{server.url}/api/generate", json={'model': config.LOCAL_AI_MODEL,
+                                   'prompt': decision_prompt}, timeout=5).text.strip().split('\n')
+            assert ''.join(json.loads(c)['response'] for c in chunks) == reply  # Streamed by default
+        print("[OK] Ollama API contract with canned DECISION/STRATEGY replies")
+
+        with MockOllamaServer(latency=('fixed', 0.05), tokens_per_sec=1000, parallel=2) as server:
+            config.LOCAL_AI_URL = server.url
+            client = LLMClient()
+            threads = [threading.Thread(target=client.generate, args=(f"Summarize {i}",)) for i in range(6)]
+            start = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - start
+            stats = server.stats()
+            assert stats['max_active'] == 2 and stats['queue_seconds'] > 0 and elapsed >= 0.15
+        print(f"[OK] Simulated latency with a 2-request parallel limit ({elapsed:.2f}s for 6 calls)")
+
+        with MockOllamaServer(latency=('fixed', 0.0), error_rate=1.0) as server:
+            config.LOCAL_AI_URL = server.url
+            assert LLMClient().generate("DECISION: BUY or SELL") is None
+            assert server.stats()['errors'] == 1
+        with MockOllamaServer(latency=('fixed', 0.0), timeout_rate=1.0, hang=5.0) as server:
+            try:
+                requests.post(f"{server.url}/api/generate", json={'model': config.LOCAL_AI_MODEL, 'prompt': 'x'},
+                              timeout=0.2)
+                assert False, "expected a timeout"
+            except requests.exceptions.Timeout:
+                pass
+            assert server.stats()['timeouts'] == 1
+        print("[OK] Injected errors and timeouts")
+    finally:
+        config.AI_PROVIDER, config.LOCAL_AI_URL = provider, url
+
+
+def test_perf_benchmark():
+    """Test the offline end-to-end session benchmark and the baseline comparison."""
+    print("\n=== Testing Performance Benchmark ===")
+    import copy
+    import yfinance
+    import config
+    from perf_benchmark import run_session
+    from utils.perf import diff_results
+
+    portfolio_file, download = config.PORTFOLIO_FILE, yfinance.download
+    run = run_session(30, llm_latency=('fixed', 0.0))
+    assert config.PORTFOLIO_FILE == portfolio_file and yfinance.download is download  # Environment restored
+    stages = run['stages']
+    assert run['network']['socket'] == 0 and run['network']['history'] > 0 and run['analyzed'] > 0
+    assert run['llm_calls'] == stages['analyze']['llm_calls'] + stages['strategy']['llm_calls'] \
+        + stages['guidance']['llm_calls'] + stages['report']['llm_calls']
+    assert stages['scan']['network']['batch'] > 0 and stages['analyze']['calls'] == run['analyzed']
+    assert sum(s['wall_s'] for s in stages.values()) <= run['wall_s'] + 1e-6
+    if run['peak_rss_mb'] is not None:  # Stages report their own growth, not the process peak so far
+        assert sum(s['rss_growth_mb'] or 0.0 for s in stages.values()) <= run['peak_rss_mb']
+    print(f"[OK] Offline session: {run['wall_s']:.2f}s, {run['network_calls']} network / {run['llm_calls']} LLM calls, "
+          f"{run['fills']} fills")
+
+    results = {'runs': {'30': run}}
+    assert not any(row[-1] for row in diff_results(results, copy.deepcopy(results)))
+    slower = copy.deepcopy(results)
+    slower['runs']['30']['stages']['scan']['wall_s'] += 1.0
+    slower['runs']['30']['stages']['analyze']['network']['history'] += 1
+    regressions = {(row[1], row[2]) for row in diff_results(results, slower) if row[-1]}
+    assert regressions == {('scan', 'wall_s'), ('analyze', 'network_calls')}
+    print("[OK] Baseline diff flags slower stages and extra network calls")
+
+
 def test_config():
     """Test config has new settings."""
     print("\n=== Testing Configuration ===")
@@ -133,6 +834,497 @@ def test_risk_manager():
     print(f"[OK] Crypto position sizing: {qty} shares (smaller due to crypto limits)")
 
 
+def test_indicators():
+    """Test shared indicator library against pandas reference values."""
+    print("\n=== Testing Indicators ===")
+    import numpy as np
+    import pandas as pd
+    from utils import indicators
+
+    rng = np.random.default_rng(42)
+    prices = pd.Series(100 * np.cumprod(1 + rng.normal(0, 0.01, 260)))
+
+    assert np.allclose(indicators.sma(prices, 50)[49:], prices.rolling(50).mean().values[49:])
+    assert np.allclose(indicators.ema(prices, 20), prices.ewm(span=20, adjust=False).mean().values)
+    assert abs(indicators.volatility(prices) - prices.pct_change().std() * np.sqrt(252)) < 1e-12
+    rolling_max = prices.cummax()
+    assert abs(indicators.max_drawdown(prices) - ((prices - rolling_max) / rolling_max).min()) < 1e-12
+    print("[OK] SMA/EMA/volatility/drawdown match pandas")
+
+    # 2-D input: one column per ticker, identical results per column
+    panel = np.column_stack([prices.values, prices.values * 2])
+    assert np.allclose(indicators.momentum(panel, 20), indicators.momentum(prices, 20))
+    rsi = indicators.rsi(panel)[-1]
+    assert 0 <= rsi[0] <= 100 and abs(rsi[0] - rsi[1]) < 1e-9
+    atr = indicators.atr(panel * 1.01, panel * 0.99, panel)[-1]
+    assert atr[1] > atr[0] > 0
+    print("[OK] Indicators vectorize across tickers")
+
+
+def test_exposure_book():
+    """Test real-price exposure tracking and crypto allocation checks."""
+    print("\n=== Testing Exposure Book ===")
+    from utils.exposure import ExposureBook, get_allocations
+    from agents.risk_manager import RiskManager
+
+    book = ExposureBook()
+    book.rebuild({'AAPL': 10, 'BTC-USD': 1}, {'AAPL': 200.0, 'BTC-USD': 1500.0})
+    assert book.class_value('stock') == 2000.0
+    assert book.class_value('crypto') == 1500.0
+
+    book.apply_fill('ETH-USD', 'BUY', 2, 250.0)
+    book.apply_fill('AAPL', 'SELL', 10, 210.0)
+    assert book.class_value('crypto') == 2000.0
+    assert book.class_value('stock') == 0.0
+    assert book.position_value('AAPL') == 0.0
+    print("[OK] Exposure updates incrementally on fills")
+
+    # Without an exposure snapshot, holdings are valued at current_prices
+    portfolio = {
+        'cash': 6000, 'total_value': 10000,
+        'holdings': {'AAPL': 10, 'BTC-USD': 1},
+        'current_prices': {'AAPL': 200.0, 'BTC-USD': 2000.0}
+    }
+    assert get_allocations(portfolio)['crypto'] == 2000.0
+    signal = {'ticker': 'ETH-USD', 'signal': 'BUY', 'price': 100.0}
+    is_safe, reason = RiskManager().validate_trade(signal, portfolio, 0)
+    assert not is_safe and 'Crypto allocation' in reason
+    print("[OK] Crypto allocation limit uses real prices")
+
+
+def test_portfolio_risk():
+    """Test vectorized VaR, beta and sector concentration for proposed trades."""
+    print("\n=== Testing Portfolio Risk Engine ===")
+    import numpy as np
+    import pandas as pd
+    import config
+    from utils.portfolio_risk import PortfolioRiskEngine
+
+    rng = np.random.default_rng(7)
+    dates = pd.bdate_range('2025-01-01', periods=150)
+    market = rng.normal(0, 0.01, len(dates))
+    engine = PortfolioRiskEngine()
+    engine.add_series(config.BENCHMARK_TICKER, pd.Series(100 * np.cumprod(1 + market), index=dates))
+    engine.add_series('AAPL', pd.Series(100 * np.cumprod(1 + 2 * market), index=dates))
+    engine.add_series('KO', pd.Series(50 * np.cumprod(1 + rng.normal(0, 0.005, len(dates))), index=dates))
+
+    portfolio = {
+        'cash': 8000, 'total_value': 10000,
+        'holdings': {'KO': 40}, 'current_prices': {'KO': 50.0}
+    }
+    aapl, ko = engine.evaluate_trades(portfolio, ['AAPL', 'KO'], [1000.0, 1000.0])
+
+    assert aapl['sector'] == 'Technology' and abs(aapl['sector_pct'] - 0.10) < 1e-9
+    assert abs(ko['sector_pct'] - 0.30) < 1e-9
+    assert abs(aapl['marginal_beta'] - 0.2) < 1e-6  # 10% position with beta 2
+    assert aapl['marginal_var_pct'] > ko['marginal_var_pct'] > 0
+    assert aapl['cvar_pct'] >= aapl['var_pct'] > 0
+    print(f"[OK] VaR {aapl['var_pct']*100:.2f}%, beta {aapl['beta']:.2f} computed for 2 candidates in one pass")
+
+    # A recent listing does not shrink the window of the others to its own history
+    engine.add_series('IPO', pd.Series(np.linspace(10, 12, 25), index=dates[-25:]))
+    names, returns = engine.return_matrix([config.BENCHMARK_TICKER, 'AAPL', 'IPO'])
+    assert names == [config.BENCHMARK_TICKER, 'AAPL'] and len(returns) == config.RISK_LOOKBACK_DAYS
+    print("[OK] Short histories are left out of the aligned return window")
+
+    import utils.portfolio_risk as portfolio_risk
+    requests = []
+    original = portfolio_risk.fetch_batch_data
+    portfolio_risk.fetch_batch_data = lambda tickers, **kwargs: requests.append(list(tickers)) or {}
+    try:
+        engine.ensure(['AAPL', 'DELISTED'])
+        engine.ensure(['DELISTED'])
+    finally:
+        portfolio_risk.fetch_batch_data = original
+    assert requests == [['DELISTED']] and 'DELISTED' in engine.failed
+    print("[OK] Failed history downloads are not retried per signal")
+
+
+def test_equity_curve():
+    """Test persisted equity curve and drawdown enforcement."""
+    print("\n=== Testing Equity Curve ===")
+    import tempfile
+    import config
+    from utils.equity_curve import EquityCurve
+    from agents.risk_manager import RiskManager
+
+    with tempfile.TemporaryDirectory() as tmp:
+        curve = EquityCurve(os.path.join(tmp, 'equity_curve.bin'))
+        assert curve.current_drawdown() == 0.0
+        for value in [10000, 11000, 10500, 9800]:
+            curve.append(value)
+
+        assert len(curve.history()) == 4
+        assert curve.peak() == 11000
+        assert abs(curve.current_drawdown() - (11000 - 9800) / 11000) < 1e-12
+        assert curve.is_breached()
+        print(f"[OK] Drawdown {curve.current_drawdown()*100:.1f}% from persisted peak")
+
+        # Reopening the file keeps the running peak
+        assert EquityCurve(curve.store.path).peak() == 11000
+
+        risk_mgr = RiskManager()
+        risk_mgr.equity_curve = curve
+        signal = {'ticker': 'AAPL', 'signal': 'BUY', 'price': 100.0}
+        portfolio = {'cash': 9800, 'total_value': 9800, 'holdings': {}}
+        is_safe, reason = risk_mgr.validate_trade(signal, portfolio, 0)
+        assert not is_safe and 'drawdown' in reason
+        print("[OK] Risk manager halts buying past MAX_DRAWDOWN_PCT")
+
+
+def test_benchmark_history_store():
+    """Test binary benchmark history with range reads and the JSON dashboard view."""
+    print("\n=== Testing Benchmark History Store ===")
+    import json
+    import tempfile
+    from datetime import datetime
+    import config
+    from utils.benchmark import BenchmarkTracker
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            config_overrides(BENCHMARK_FILE=os.path.join(tmp, 'benchmark.json'),
+                             BENCHMARK_HISTORY_FILE=os.path.join(tmp, 'benchmark_history.bin'),
+                             BENCHMARK_VIEW_POINTS=3):
+        legacy = {
+            'ticker': 'URTH', 'start_date': '2025-12-05', 'start_price': 100.0,
+            'initial_investment': 10000.0,
+            'history': [
+                {'date': f'2025-12-0{day} 12:00:00', 'portfolio_value': 10000.0 + day,
+                 'portfolio_return': 0.0, 'benchmark_value': 10000.0,
+                 'benchmark_return': 0.0, 'alpha': 0.0}
+                for day in range(1, 6)
+            ]
+        }
+        with open(config.BENCHMARK_FILE, 'w') as f:
+            json.dump(legacy, f)
+
+        tracker = BenchmarkTracker()
+        assert len(tracker.history_store) == 5
+        print("[OK] Legacy JSON history migrated to binary store")
+
+        window = tracker.get_history(datetime(2025, 12, 2), datetime(2025, 12, 4, 23))
+        assert window['portfolio_value'].tolist() == [10002.0, 10003.0, 10004.0]
+        del window  # release the memory map before the temp dir is removed
+
+        tracker._write_dashboard_view(tracker.get_benchmark_data())
+        view = tracker.get_benchmark_data()
+        assert [h['portfolio_value'] for h in view['history']] == [10003.0, 10004.0, 10005.0]
+        assert view['start_price'] == 100.0
+        print("[OK] Range reads and dashboard view work")
+
+
+def test_benchmark_service():
+    """Test cached benchmark prices and time-weighted comparison."""
+    print("\n=== Testing Benchmark Service ===")
+    import tempfile
+    import time
+    from datetime import datetime
+    import pandas as pd
+    from utils import benchmark
+    from utils.equity_curve import EquityCurve
+
+    dates = pd.date_range('2025-12-01', periods=10)
+    benchmark._price_cache['TEST-IDX'] = (time.time(), pd.Series(range(100, 110), index=dates, dtype=float))
+    service = benchmark.BenchmarkService({'Test Index': 'TEST-IDX'}, ttl=3600)
+    assert service.latest_price('TEST-IDX') == 109.0
+    print("[OK] Fresh prices served from the shared cache")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        curve = EquityCurve(os.path.join(tmp, 'equity_curve.bin'))
+        start = datetime(2025, 12, 1, 18).timestamp()
+        for step, value in enumerate([10000, 10500, 10290]):
+            curve.append(value, timestamp=start + step * 86400)
+
+        twr, _ = service.time_weighted_return(curve)
+        assert abs(twr - 0.029) < 1e-9
+        result = service.compare_all(curve)
+        assert abs(result['benchmarks']['Test Index']['return_pct'] - 9.0) < 1e-9
+        assert abs(result['benchmarks']['Test Index']['alpha'] - (2.9 - 9.0)) < 1e-9
+        print("[OK] Time-weighted return compared with benchmark over the same window")
+    del benchmark._price_cache['TEST-IDX']
+
+    requests = []
+    original = benchmark.fetch_batch_data
+    benchmark.fetch_batch_data = lambda tickers, **kwargs: requests.append(list(tickers)) or {
+        t: pd.DataFrame({'Close': [1.0, 2.0]}, index=dates[:2]) for t in tickers}
+    try:
+        service = benchmark.BenchmarkService({'A': 'TEST-A', 'B': 'TEST-B'}, ttl=3600)
+        assert service.latest_price('TEST-A') == 2.0
+        assert set(service.get_prices()) == {'TEST-A', 'TEST-B'}
+    finally:
+        benchmark.fetch_batch_data = original
+        for ticker in ('TEST-A', 'TEST-B'):
+            benchmark._price_cache.pop(ticker, None)
+    assert requests == [['TEST-A', 'TEST-B']]
+    print("[OK] Latest price and comparison share one batched benchmark download")
+
+    # Equity curve older than the cached window: full history is fetched, a younger benchmark is skipped
+    requests.clear()
+    full = pd.Series([50.0] * 40 + [100.0], index=pd.date_range('2025-10-01', periods=41))
+
+    def fetch_full(tickers, period=None, **kwargs):
+        requests.append((list(tickers), period))
+        return {t: pd.DataFrame({'Close': full}) for t in tickers if t == 'TEST-OLD'}
+
+    benchmark.fetch_batch_data = fetch_full
+    for ticker in ('TEST-OLD', 'TEST-NEW'):
+        benchmark._price_cache[ticker] = (time.time(), pd.Series([75.0, 100.0], index=full.index[-2:]))
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            curve = EquityCurve(os.path.join(tmp, 'equity_curve.bin'))
+            curve.append(10000, timestamp=datetime(2025, 10, 2, 18).timestamp())
+            curve.append(10100, timestamp=datetime(2025, 11, 10, 18).timestamp())
+            service = benchmark.BenchmarkService({'Old': 'TEST-OLD', 'New': 'TEST-NEW'}, ttl=3600)
+            result = service.compare_all(curve)
+    finally:
+        benchmark.fetch_batch_data = original
+        for ticker in ('TEST-OLD', 'TEST-NEW'):
+            benchmark._price_cache.pop(ticker, None)
+            benchmark._price_periods.pop(ticker, None)
+    assert requests == [(['TEST-OLD', 'TEST-NEW'], 'max')]
+    assert abs(result['benchmarks']['Old']['return_pct'] - 100.0) < 1e-9 and 'New' not in result['benchmarks']
+    print("[OK] Benchmarks compared over the equity curve's window, never a shorter one")
+
+    requests.clear()
+    benchmark.fetch_batch_data = lambda tickers, **kwargs: requests.append(list(tickers)) or {}
+    try:
+        service = benchmark.BenchmarkService({'A': 'TEST-A'}, ttl=3600)
+        assert service.latest_price('TEST-A') is None and service.get_prices() == {}
+        service.compare_all(curve)
+    finally:
+        benchmark.fetch_batch_data = original
+        benchmark._price_cache.pop('TEST-A', None)
+        benchmark._price_periods.pop('TEST-A', None)
+    assert requests == [['TEST-A']]
+    print("[OK] Failed benchmark downloads are not retried before the TTL")
+
+
+def test_portfolio_journal():
+    """Test WAL replay keeps portfolio and trade log consistent after a crash."""
+    print("\n=== Testing Portfolio Journal ===")
+    import csv
+    import json
+    import tempfile
+    from utils.journal import PortfolioJournal, apply_fill
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(tmp, name) for name in ['portfolio.json', 'trade_log.csv', 'portfolio.wal', 'portfolio.lock']]
+        with open(paths[0], 'w') as f:
+            json.dump({'cash': 1000.0, 'holdings': {}, 'trade_count': 0}, f)
+        with open(paths[1], 'w', newline='') as f:
+            csv.writer(f).writerow(['Date', 'Ticker', 'Action', 'Quantity', 'Price', 'Total', 'Reason'])
+
+        journal = PortfolioJournal(*paths)
+        fill = {'date': '2025-12-10 10:00:00', 'ticker': 'AAPL', 'action': 'BUY',
+                'quantity': 2, 'price': 100.0, 'total': 200.0, 'reason': 'Test, with comma'}
+        state = journal.load()
+        apply_fill(state, fill)
+        journal.commit(state, [fill])
+        assert journal.load()['holdings'] == {'AAPL': 2} and os.path.getsize(paths[2]) == 0
+        print("[OK] Committed fill persisted and WAL cleared")
+
+        # Crash after WAL + trade log, before the snapshot was written
+        sell = dict(fill, action='SELL', quantity=1, total=110.0, price=110.0, date='2025-12-10 11:00:00')
+        with open(paths[2], 'w') as f:
+            f.write(json.dumps({'seq': 2, 'fills': [sell]}) + '\n')
+        journal._append_trade_rows([sell])
+
+        recovered = journal.load()
+        assert recovered['holdings'] == {'AAPL': 1} and recovered['cash'] == 910.0
+        assert journal.load()['trade_count'] == 2
+        with open(paths[1], newline='') as f:
+            assert len(list(csv.reader(f))) == 3  # header + 2 trades, no duplicate
+        print("[OK] WAL replay recovered the interrupted fill without duplicate log rows")
+
+    import config
+    from agents.execution import ExecutionAgent
+    fill_simulation = config.ENABLE_FILL_SIMULATION
+    try:
+        config.ENABLE_FILL_SIMULATION = False
+        with tempfile.TemporaryDirectory() as tmp:
+            executor = ExecutionAgent(data_dir=tmp)
+            order = lambda action, price: ({'ticker': 'AAPL', 'signal': action, 'price': price, 'reason': 'test'}, 10)
+            executor.execute_batch([order('BUY', 100.0)], prices={})
+            executor.execute_batch([order('SELL', 120.0)], prices={})
+            assert 'AAPL' not in executor.journal.load()['current_prices']
+            executor.execute_batch([order('BUY', 150.0)], prices={})
+            state = executor.journal.load()  # As valued by the batch
+            assert state['current_prices']['AAPL'] == 150.0
+            assert abs(state['total_value'] - config.INITIAL_CASH - 200.0) < 1e-6
+            executor.execute_batch([order('BUY', 150.0)], prices={'AAPL': 155.0})
+            assert executor.journal.load()['current_prices']['AAPL'] == 155.0
+    finally:
+        config.ENABLE_FILL_SIMULATION = fill_simulation
+    print("[OK] Closed positions drop their price; re-buys are valued at the fill or feed price")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = ExecutionAgent(data_dir=tmp)
+        signal = {'ticker': 'AAPL', 'price': 123.456789, 'reason': 'test', 'avg_volume': 1e6, 'volatility': 0.3}
+        bought, = executor.execute_batch([(dict(signal, signal='BUY'), 7)], prices={})
+        sold, = executor.execute_batch([(dict(signal, signal='SELL'), 7)], prices={})
+    assert abs(bought['quantity'] * bought['price'] + bought['fees'] - bought['total']) < 1e-9
+    assert abs(sold['quantity'] * sold['price'] - sold['fees'] - sold['total']) < 1e-9
+    print("[OK] Simulated fills: quantity * price +/- fees reconciles with the total")
+
+
+def test_trade_log_tail():
+    """Test recent-trade lookups read only the end of the trade log."""
+    print("\n=== Testing Trade Log Tail Reader ===")
+    import csv
+    import tempfile
+    from utils.trade_log import TradeLog
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'trade_log.csv')
+        log = TradeLog(path, buffer_size=5, block_size=64)
+        log.ensure_header()
+        log.append([[f'2025-12-{day:02d} 10:00:00', f'T{day}', 'BUY', day, 10.0, 10.0 * day, 'Reason, quoted']
+                    for day in range(1, 21)])
+
+        recent = log.tail(3)
+        assert [t['Ticker'] for t in recent] == ['T18', 'T19', 'T20']
+        assert recent[-1]['Reason'] == 'Reason, quoted'
+        assert [row[1] for row in log.tail_rows(8)] == [f'T{day}' for day in range(13, 21)]
+
+        # Another writer appends behind our back: the buffer notices the size change
+        with open(path, 'a', newline='') as f:
+            csv.writer(f).writerow(['2025-12-21 10:00:00', 'EXT', 'SELL', 1, 5.0, 5.0, 'External'])
+        assert log.tail(1)[0]['Ticker'] == 'EXT'
+        assert len(log.tail(50)) == 21
+        print("[OK] Tail reads, ring buffer and external appends")
+
+
+def test_fill_model():
+    """Test spread, impact, fees and partial fills in the fill simulator."""
+    print("\n=== Testing Fill Model ===")
+    import numpy as np
+    from utils.fill_model import FillModel
+
+    model = FillModel(spread_bps=10, crypto_spread_bps=40, impact_coef=1.0,
+                      commission_bps=0, min_commission=1.0, max_participation=0.01)
+
+    buy = model.fill(100.0, 10, 'BUY')
+    sell = model.fill(100.0, 10, 'SELL')
+    assert abs(buy['fill_price'] - 100.05) < 1e-9  # half of 10 bps, no volume -> no impact
+    assert abs(sell['fill_price'] - 99.95) < 1e-9
+    assert abs(buy['cash_flow'] + (1000.5 + 1.0)) < 1e-9
+    assert abs(sell['cash_flow'] - (999.5 - 1.0)) < 1e-9
+
+    # Order above 1% of ADV is partially filled and pays impact
+    partial = model.fill(100.0, 500, 'BUY', avg_volume=20_000, volatility=0.32)
+    assert partial['filled_qty'] == 200
+    impact = 0.32 / np.sqrt(252) * np.sqrt(200 / 20_000)
+    assert abs(partial['fill_price'] - 100.0 * (1 + 0.0005 + impact)) < 1e-9
+    assert model.fill(100.0, 10, 'BUY', is_crypto=True)['fill_price'] > buy['fill_price']
+    # Crypto volume is quoted in currency: 2M USD at 100 = 20,000 units
+    crypto = model.fill(100.0, 500, 'BUY', avg_volume=2_000_000, volatility=0.32, is_crypto=True)
+    assert crypto['filled_qty'] == 200
+
+    # Whole budget never overspent after slippage and fees
+    qty = model.max_affordable(1000.0, 100.0)
+    assert qty == 9 and -model.fill(100.0, qty, 'BUY')['cash_flow'] <= 1000.0
+
+    # Vectorized batch
+    n = 100_000
+    rng = np.random.default_rng(0)
+    result = model.simulate(rng.uniform(10, 500, n), rng.integers(1, 1000, n),
+                            np.where(rng.random(n) < 0.5, 1, -1), rng.uniform(1e4, 1e7, n), 0.25)
+    assert result['filled_qty'].shape == (n,) and (result['cost_bps'] > 0).all()
+    print("[OK] Spread, impact, fees, partial fills and batch simulation")
+
+
+def test_order_book():
+    """Test session orders are netted per ticker and projected onto the portfolio."""
+    print("\n=== Testing Order Book ===")
+    from utils.order_book import OrderBook
+
+    book = OrderBook()
+    book.add({'ticker': 'AAPL', 'signal': 'BUY', 'price': 100.0, 'reason': 'trend'}, 5)
+    book.add({'ticker': 'MSFT', 'signal': 'SELL', 'price': 50.0, 'reason': 'exit'}, 4)
+    book.add({'ticker': 'AAPL', 'signal': 'SELL', 'price': 101.0, 'reason': 'reversal'}, 2)
+    book.add({'ticker': 'NVDA', 'signal': 'BUY', 'price': 10.0, 'reason': 'a'}, 3)
+    book.add({'ticker': 'NVDA', 'signal': 'SELL', 'price': 10.0, 'reason': 'b'}, 3)
+    book.add({'ticker': 'BTC-USD', 'signal': 'BUY', 'price': 1000.0, 'reason': 'crypto'}, 0)
+    assert len(book) == 5
+
+    netted = {signal['ticker']: (signal['signal'], qty) for signal, qty in book.net()}
+    assert netted == {'AAPL': ('BUY', 3), 'MSFT': ('SELL', 4)}
+    print("[OK] Opposing orders netted, cancelled tickers dropped")
+
+    portfolio = {'cash': 1000.0, 'holdings': {'MSFT': 4}, 'current_prices': {'MSFT': 50.0}, 'total_value': 1200.0}
+    projected = book.project(portfolio)
+    assert projected['cash'] == 1000.0 - 500.0 + 200.0 + 202.0
+    assert projected['holdings'] == {'AAPL': 3}
+    assert projected['exposure']['positions']['AAPL'] == 300.0
+    assert portfolio['holdings'] == {'MSFT': 4}  # input untouched
+    print("[OK] Pending orders projected onto cash, holdings and exposure")
+
+
+def test_validate_many():
+    """Test batch risk validation ranks by confidence within the cash budget."""
+    print("\n=== Testing Batch Risk Validation ===")
+    import tempfile
+    from agents.risk_manager import RiskManager
+    from utils.equity_curve import EquityCurve
+
+    with tempfile.TemporaryDirectory() as tmp:
+        risk_mgr = RiskManager()
+        risk_mgr.portfolio_risk = None
+        risk_mgr.equity_curve = EquityCurve(os.path.join(tmp, 'equity_curve.bin'))
+
+        # 5% cap = 500 per stock position, only 1,200 cash to spend
+        portfolio = {'cash': 1200.0, 'total_value': 10000.0, 'holdings': {'MSFT': 3},
+                     'current_prices': {'MSFT': 100.0}}
+        signals = [
+            {'ticker': 'AAPL', 'signal': 'BUY', 'price': 100.0, 'confidence': 0.6},
+            {'ticker': 'NVDA', 'signal': 'BUY', 'price': 100.0, 'confidence': 0.9},
+            {'ticker': 'AMZN', 'signal': 'BUY', 'price': 100.0, 'confidence': 0.7},
+            {'ticker': 'MSFT', 'signal': 'BUY', 'price': 100.0, 'confidence': 0.95},
+            {'ticker': 'MSFT', 'signal': 'SELL', 'price': 100.0, 'confidence': 0.5},
+            {'ticker': 'GOOGL', 'signal': 'SELL', 'price': 100.0, 'confidence': 0.8},
+            {'ticker': 'TSLA', 'signal': 'BUY', 'price': 900.0, 'confidence': 0.99},
+            {'ticker': 'AAPL', 'signal': 'BUY', 'price': 100.0, 'confidence': 0.1},
+        ]
+        accepted, quantities, reasons = risk_mgr.validate_many(signals, portfolio)
+
+        assert accepted.tolist() == [True, True, True, False, True, False, False, False]
+        assert quantities.tolist() == [2, 5, 5, 0, 3, 0, 0, 0]  # lowest confidence gets the remainder
+        assert reasons[3].startswith("Already holding") and reasons[5].startswith("Not holding")
+        assert reasons[6].startswith("Price exceeds") and reasons[7].startswith("Duplicate")
+        print("[OK] Vectorized checks and confidence-ranked greedy allocation")
+
+        accepted, quantities, _ = risk_mgr.validate_many(signals, portfolio, max_trades=1)
+        assert accepted.sum() == 1 and quantities[1] == 5
+        print("[OK] Trade limit keeps only the most confident orders")
+
+
+def test_optimizer():
+    """Test optimizer weights respect caps and budget and account for correlation."""
+    print("\n=== Testing Portfolio Optimizer ===")
+    import numpy as np
+    from utils import optimizer
+
+    rng = np.random.default_rng(7)
+    returns = rng.normal(0.0, 0.02, (126, 4))
+    returns[:, 1] = returns[:, 0] + rng.normal(0.0, 0.002, 126)  # near-duplicate of candidate 0
+    confidence = np.array([0.8, 0.8, 0.8, 0.8])
+
+    for method in ['mean_variance', 'kelly', 'risk_parity']:
+        weights = optimizer.optimize(returns, 0.05, 0.12, method, confidence)
+        assert (weights >= 0).all() and (weights <= 0.05 + 1e-9).all()
+        assert weights.sum() <= 0.12 + 1e-9
+    print("[OK] Position caps and cash budget respected")
+
+    # Correlated pair shares one slot of risk instead of taking two
+    weights = optimizer.optimize(returns, 1.0, 1.0, 'mean_variance', confidence)
+    assert weights[0] + weights[1] < weights[2] + weights[3]
+    weights = optimizer.optimize(returns, 1.0, 1.0, 'risk_parity')
+    cov = np.cov(returns, rowvar=False)
+    contributions = weights * (cov @ weights)
+    assert contributions.max() / contributions.min() < 1.05
+    print("[OK] Correlation-aware mean-variance and equal risk contributions")
+
+
 if __name__ == "__main__":
     print("=" * 60)
     print("Testing Expanded Trading System")
@@ -140,12 +1332,37 @@ if __name__ == "__main__":
     
     try:
         test_config()
+        test_indicators()
         test_universe_manager()
+        test_universe_files()
+        test_symbol_index()
         test_news_fetcher()
         test_data_loader()
+        test_bulk_downloader()
+        test_rate_limit()
+        test_price_panel()
+        test_price_panel_mmap()
+        test_intraday_bars()
+        test_event_session()
+        test_quote_simulator()
+        test_mock_llm()
+        test_perf_benchmark()
         test_market_scanner()
+        test_sharded_scan()
+        test_streaming_top_k()
         test_ai_strategy()
         test_risk_manager()
+        test_exposure_book()
+        test_portfolio_risk()
+        test_equity_curve()
+        test_benchmark_history_store()
+        test_benchmark_service()
+        test_portfolio_journal()
+        test_trade_log_tail()
+        test_fill_model()
+        test_order_book()
+        test_validate_many()
+        test_optimizer()
         
         print("\n" + "=" * 60)
         print("[SUCCESS] ALL TESTS PASSED!")
@@ -0,0 +1,236 @@
+"""
+Bars - Intraday bar cache and resampling.
+
+Intraday bars (1m/5m/15m/1h) are stored per interval and trading day in
+config.BAR_CACHE_DIR/<interval>/<YYYY-MM-DD>/<ticker>.csv. Past days never
+change, so once a day is on disk after it ended it is not downloaded again;
+today's partition is refreshed after BAR_CACHE_TODAY_TTL seconds, and a past
+day's partition written while that day was still in progress (file time
+before the day's end) is downloaded again once. Repeated sessions during a
+day therefore re-download one day per ticker at most.
+
+Coarser bars are built from cached finer bars with resample_bars instead of
+a new download (e.g. 1h from 5m). Timestamps are exchange-local wall time,
+and each bar is labeled with its start.
+"""
+
+import os
+import time
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+from utils.indicators import INTERVAL_MINUTES
+import config
+
+
+INTRADAY_INTERVALS = ('1m', '2m', '5m', '15m', '30m', '60m', '90m', '1h')
+
+# Calendar days of history Yahoo Finance serves per intraday interval
+MAX_HISTORY_DAYS = {'1m': 7, '2m': 60, '5m': 60, '15m': 60, '30m': 60, '60m': 730, '90m': 60, '1h': 730}
+
+
+def _naive_index(index):
+    index = pd.DatetimeIndex(index)
+    return index.tz_localize(None) if index.tz is not None else index
+
+
+def resample_bars(df, interval):
+    """
+    Aggregate bars to a coarser interval in one vectorized pass.
+
+    Buckets are aligned to each day's first bar (the session open), so 1h bars
+    of a 9:30 open run 9:30-10:30 like the ones Yahoo serves. '1d' gives one
+    bar per day.
+
+    Args:
+        df (DataFrame): OHLCV bars with a DatetimeIndex
+        interval (str): Target interval (a multiple of the source interval)
+
+    Returns:
+        DataFrame: Open (first), High (max), Low (min), Close (last), Volume (sum)
+    """
+    if df.empty:
+        return df.copy()
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index()
+
+    index = _naive_index(df.index)
+    stamps = index.to_numpy(dtype='datetime64[ns]').view(np.int64)
+    days = index.normalize().to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+    day_starts = np.r_[0, np.flatnonzero(np.diff(days)) + 1]
+    session_open = np.repeat(stamps[day_starts], np.diff(np.r_[day_starts, len(stamps)]))
+    if INTERVAL_MINUTES[interval] >= 1440:
+        buckets = days
+    else:
+        step = INTERVAL_MINUTES[interval] * 60 * 10**9
+        buckets = session_open + (stamps - session_open) // step * step
+
+    starts = np.r_[0, np.flatnonzero(np.diff(buckets)) + 1]
+    ends = np.r_[starts[1:], len(buckets)] - 1
+
+    out = {}
+    if 'Open' in df:
+        out['Open'] = df['Open'].to_numpy(dtype=np.float64)[starts]
+    if 'High' in df:
+        out['High'] = np.fmax.reduceat(df['High'].to_numpy(dtype=np.float64), starts)
+    if 'Low' in df:
+        out['Low'] = np.fmin.reduceat(df['Low'].to_numpy(dtype=np.float64), starts)
+    if 'Close' in df:
+        out['Close'] = df['Close'].to_numpy(dtype=np.float64)[ends]
+    if 'Volume' in df:
+        out['Volume'] = np.add.reduceat(np.nan_to_num(df['Volume'].to_numpy(dtype=np.float64)), starts)
+    return pd.DataFrame(out, index=pd.DatetimeIndex(buckets[starts].view('datetime64[ns]')))
+
+
+def _download(ticker, period, interval):
+    from utils.data_loader import fetch_data
+    return fetch_data(ticker, period=period, interval=interval)
+
+
+class BarStore:
+    """
+    Intraday bars cached on disk, partitioned by interval and day.
+    """
+
+    def __init__(self, directory=None, today_ttl=None, download=None, today=None):
+        """
+        Args:
+            directory (str): Cache root (default config.BAR_CACHE_DIR)
+            today_ttl (float): Seconds before today's partition is refreshed
+            download (callable): (ticker, period, interval) -> DataFrame or None
+            today (callable): Returns the current date (for tests)
+        """
+        self.directory = directory or config.BAR_CACHE_DIR
+        self.today_ttl = config.BAR_CACHE_TODAY_TTL if today_ttl is None else today_ttl
+        self.download = download or _download
+        self.today = today or date.today
+        self.downloads = 0
+
+    def _path(self, ticker, interval, day):
+        return os.path.join(self.directory, interval, day.isoformat(), f"{ticker}.csv")
+
+    def _is_stale(self, path, day, today):
+        """A partition written before its day ended is incomplete: past days always, today after the TTL."""
+        written = os.path.getmtime(path)
+        if day >= today:
+            return time.time() - written > self.today_ttl
+        return written < datetime.combine(day + timedelta(days=1), datetime.min.time()).timestamp()
+
+    def _load(self, ticker, interval, days):
+        """Cached partitions for the given days; returns (day -> DataFrame, missing days)."""
+        today = self.today()
+        loaded, missing = {}, []
+        for day in days:
+            path = self._path(ticker, interval, day)
+            try:
+                if self._is_stale(path, day, today):
+                    missing.append(day)
+                    continue
+                df = pd.read_csv(path, index_col=0)
+            except (OSError, ValueError):
+                missing.append(day)
+                continue
+            df.index = pd.DatetimeIndex(pd.to_datetime(df.index))
+            loaded[day] = df
+        return loaded, missing
+
+    def _write(self, ticker, interval, day, df):
+        path = self._path(ticker, interval, day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        df.to_csv(path + '.tmp', index_label='Datetime')
+        os.replace(path + '.tmp', path)
+
+    def _from_finer(self, ticker, interval, days):
+        """Build the days from a finer cached interval, if one has all of them."""
+        target = INTERVAL_MINUTES[interval]
+        finer = sorted((i for i in INTRADAY_INTERVALS if INTERVAL_MINUTES[i] < target
+                        and target % INTERVAL_MINUTES[i] == 0), key=INTERVAL_MINUTES.get, reverse=True)
+        for source in finer:
+            loaded, missing = self._load(ticker, source, days)
+            if not missing:
+                return {day: resample_bars(df, interval) for day, df in loaded.items()}
+        return None
+
+    def _download_days(self, ticker, interval, days):
+        """Download the span from the oldest missing day to today and store every day of it."""
+        today = self.today()
+        first = min(days)
+        span = (today - first).days + 1
+        self.downloads += 1
+        df = self.download(ticker, f"{span}d", interval)
+        if df is None or df.empty:
+            return {}  # Failed or no data at all: leave the days uncached and retry next time
+
+        df = df.copy()
+        df.index = _naive_index(df.index)
+        bar_days = df.index.date
+        fetched = {}
+        for offset in range(span):
+            day = first + timedelta(days=offset)
+            part = df[bar_days == day]
+            self._write(ticker, interval, day, part)  # Empty days (weekends, holidays) are cached too
+            fetched[day] = part
+        return fetched
+
+    def get(self, ticker, interval='1h', days=30):
+        """
+        Intraday bars for the last `days` calendar days (including today).
+
+        Cached days are read from disk; missing days are resampled from a finer
+        cached interval if possible and downloaded otherwise.
+
+        Args:
+            ticker (str): Ticker symbol
+            interval (str): Intraday interval ('1m', '5m', '15m', '1h', ...)
+            days (int): Calendar days of history (capped by what Yahoo serves)
+
+        Returns:
+            DataFrame: OHLCV bars (empty if nothing is available)
+        """
+        if interval not in INTRADAY_INTERVALS:
+            raise ValueError(f"Not an intraday interval: {interval}")
+        today = self.today()
+        days = max(1, min(days, MAX_HISTORY_DAYS[interval]))
+        wanted = [today - timedelta(days=offset) for offset in range(days - 1, -1, -1)]
+
+        frames, missing = self._load(ticker, interval, wanted)
+        if missing:
+            resampled = self._from_finer(ticker, interval, missing)
+            if resampled is None:
+                resampled = self._download_days(ticker, interval, missing)
+            frames.update({day: df for day, df in resampled.items() if day in missing})
+
+        parts = [frames[day] for day in wanted if day in frames and not frames[day].empty]
+        if not parts:
+            return pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+        return pd.concat(parts)
+
+
+_bar_store = None
+
+
+def get_bar_store():
+    """Shared BarStore for the process."""
+    global _bar_store
+    if _bar_store is None:
+        _bar_store = BarStore()
+    return _bar_store
+
+
+def fetch_bars(ticker, interval='1d', days=None):
+    """
+    Bars of any interval: daily bars come from fetch_data, intraday bars from the bar cache.
+
+    Args:
+        ticker (str): Ticker symbol
+        interval (str): '1d' or an intraday interval
+        days (int): Calendar days of intraday history (default config.INTRADAY_LOOKBACK_DAYS)
+
+    Returns:
+        DataFrame: OHLCV bars, or None/empty if unavailable
+    """
+    if interval == '1d':
+        from utils.data_loader import fetch_data
+        return fetch_data(ticker, period="1y")
+    return get_bar_store().get(ticker, interval, days or config.INTRADAY_LOOKBACK_DAYS)
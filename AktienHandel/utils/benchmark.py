@@ -1,35 +1,185 @@
 """
 Benchmark tracking utility for comparing portfolio performance
-against MSCI World index.
+against MSCI World index and the other benchmarks in config.BENCHMARKS.
+
+Benchmark prices are downloaded in one batched request and cached at module
+level for config.BENCHMARK_CACHE_TTL seconds, so every tracker instance in a
+session shares a single download per benchmark. Failed downloads are cached
+for the TTL as well, so being offline does not trigger a download per call.
+
+Snapshot history lives in an append-only binary time series
+(config.BENCHMARK_HISTORY_FILE) with unlimited retention; benchmark.json only
+carries the tracking metadata plus a short history view for the dashboard.
 """
 
 import json
 import os
+import time
 from datetime import datetime
-from utils.data_loader import fetch_data
+import numpy as np
+from utils.data_loader import fetch_batch_data
+from utils.equity_curve import EquityCurve
+from utils.timeseries_store import TimeSeriesStore
 import config
 import pandas as pd
 
 
+HISTORY_FIELDS = ['portfolio_value', 'portfolio_return', 'benchmark_value', 'benchmark_return', 'alpha']
+
+# ticker -> (fetched_at, close Series or None after a failed download); shared by all BenchmarkService instances
+_price_cache = {}
+_price_periods = {}  # ticker -> period its cached series was downloaded with
+
+
+def _close_series(df, ticker):
+    """Extract a tz-naive close Series from a (possibly MultiIndex) download."""
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df[ticker] if ticker in df.columns.get_level_values(0) else df.droplevel(1, axis=1)
+    closes = df['Close'].dropna()
+    index = pd.DatetimeIndex(closes.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return pd.Series(closes.to_numpy(dtype=np.float64), index=index)
+
+
+class BenchmarkService:
+    """
+    Cached benchmark prices and time-weighted comparisons against the equity curve.
+    """
+
+    def __init__(self, benchmarks=None, ttl=None):
+        """
+        Args:
+            benchmarks (dict): Display name -> ticker (default config.BENCHMARKS)
+            ttl (int): Seconds a download stays fresh (default config.BENCHMARK_CACHE_TTL)
+        """
+        self.benchmarks = benchmarks or config.BENCHMARKS
+        self.ttl = config.BENCHMARK_CACHE_TTL if ttl is None else ttl
+
+    def get_prices(self, tickers=None, period=None):
+        """
+        Daily close series for the requested benchmarks.
+        Stale or missing tickers are refreshed together in one batch download.
+
+        Args:
+            tickers (list): Tickers to return (default: all configured benchmarks)
+            period (str): History to download (default config.BENCHMARK_PERIOD; 'max'
+                          also refreshes cached series downloaded with a shorter period)
+
+        Returns:
+            dict: ticker -> pd.Series of closes (tickers that failed are omitted)
+        """
+        tickers = list(tickers or self.benchmarks.values())
+        period = period or config.BENCHMARK_PERIOD
+        now = time.time()
+        stale = [t for t in tickers if t not in _price_cache or now - _price_cache[t][0] >= self.ttl
+                 or (period == 'max' and _price_periods.get(t) != 'max')]
+
+        if stale:
+            data = fetch_batch_data(stale, period=period)
+            for ticker in stale:
+                try:
+                    closes = _close_series(data[ticker], ticker) if ticker in data else None
+                except KeyError:
+                    closes = None
+                if closes is None or closes.empty:
+                    # Not retried before the TTL; an earlier series (if any) stays in use until then
+                    previous = _price_cache.get(ticker, (now, None))[1]
+                    _price_cache[ticker] = (now, previous)
+                else:
+                    _price_cache[ticker] = (now, closes)
+                _price_periods[ticker] = period
+
+        return {t: _price_cache[t][1] for t in tickers if _price_cache.get(t, (0, None))[1] is not None}
+
+    def latest_price(self, ticker):
+        """
+        Most recent close for a benchmark ticker, or None if unavailable.
+        Refreshes all configured benchmarks together, so a later compare_all
+        needs no second download.
+        """
+        tickers = list(dict.fromkeys(list(self.benchmarks.values()) + [ticker]))
+        closes = self.get_prices(tickers).get(ticker)
+        if closes is None or closes.empty:
+            return None
+        return float(closes.iloc[-1])
+
+    def time_weighted_return(self, equity_curve=None):
+        """
+        Time-weighted portfolio return from the stored equity curve.
+
+        The paper portfolio has no external deposits or withdrawals, so the
+        sub-period returns between valuations chain-link directly.
+
+        Returns:
+            tuple: (return as a fraction, start timestamp) or (None, None) with < 2 points
+        """
+        history = (equity_curve or EquityCurve()).history()
+        values = history['value']
+        if len(values) < 2 or values[0] <= 0:
+            return None, None
+        period_returns = values[1:] / values[:-1]
+        return float(np.prod(period_returns) - 1.0), float(history['timestamp'][0])
+
+    def compare_all(self, equity_curve=None):
+        """
+        Compare the portfolio's time-weighted return with every configured benchmark
+        over the same window (first equity curve point until now).
+
+        Returns:
+            dict: {'portfolio_return': pct, 'start_date': str, 'benchmarks':
+                   {name: {'ticker', 'return_pct', 'alpha'}}} or None without history
+        """
+        portfolio_twr, start = self.time_weighted_return(equity_curve)
+        if portfolio_twr is None:
+            return None
+
+        start_ts = pd.Timestamp(datetime.fromtimestamp(start)).normalize()
+        results = {}
+        prices = self.get_prices()
+        # The equity curve is older than the downloaded window: fetch the full history of those
+        short = [t for t, closes in prices.items() if closes.index[0] > start_ts]
+        if short:
+            prices.update(self.get_prices(short, period='max'))
+        for name, ticker in self.benchmarks.items():
+            closes = prices.get(ticker)
+            if closes is None or closes.empty:
+                continue
+            start_price = closes.asof(start_ts)
+            if pd.isna(start_price):
+                # Benchmark younger than the portfolio: no return over the same window
+                print(f"[Benchmark] {name} history starts {closes.index[0]:%Y-%m-%d}, after the portfolio's start - skipped")
+                continue
+            return_pct = (float(closes.iloc[-1]) / float(start_price) - 1.0) * 100
+            results[name] = {
+                'ticker': ticker,
+                'return_pct': return_pct,
+                'alpha': portfolio_twr * 100 - return_pct
+            }
+
+        return {
+            'portfolio_return': portfolio_twr * 100,
+            'start_date': datetime.fromtimestamp(start).strftime("%Y-%m-%d"),
+            'benchmarks': results
+        }
+
+
 class BenchmarkTracker:
     """Tracks and compares portfolio performance against MSCI World."""
     
     def __init__(self):
         self.benchmark_file = config.BENCHMARK_FILE
         self.benchmark_ticker = config.BENCHMARK_TICKER
+        self.history_store = TimeSeriesStore(config.BENCHMARK_HISTORY_FILE, HISTORY_FIELDS)
+        self.service = BenchmarkService()
         self._ensure_initialized()
     
     def _ensure_initialized(self):
         """Initialize benchmark tracking if not exists."""
         if not os.path.exists(self.benchmark_file):
             # Fetch initial benchmark price
-            df = fetch_data(self.benchmark_ticker, period="1d")
-            if df is not None and not df.empty:
-                close_val = df['Close'].iloc[-1]
-                if isinstance(close_val, pd.Series):
-                    close_val = close_val.iloc[0]
-                initial_price = float(close_val)
-            else:
+            initial_price = self.service.latest_price(self.benchmark_ticker)
+            if initial_price is None:
                 initial_price = 100.0  # Fallback
             
             initial_data = {
@@ -42,6 +192,33 @@ class BenchmarkTracker:
             
             with open(self.benchmark_file, 'w') as f:
                 json.dump(initial_data, f, indent=4)
+        elif len(self.history_store) == 0:
+            self._import_json_history()
+    
+    def _import_json_history(self):
+        """One-time migration of snapshots kept in benchmark.json into the binary store."""
+        data = self.get_benchmark_data()
+        if not data:
+            return
+        for snapshot in data.get('history', []):
+            try:
+                timestamp = datetime.strptime(snapshot['date'], "%Y-%m-%d %H:%M:%S").timestamp()
+            except (KeyError, ValueError):
+                continue
+            self.history_store.append(timestamp=timestamp, **{k: snapshot.get(k, float('nan')) for k in HISTORY_FIELDS})
+    
+    def get_history(self, start=None, end=None):
+        """
+        Snapshot history between two points in time (memory-mapped, no copy).
+        
+        Args:
+            start (float or datetime): Inclusive start (None = first snapshot)
+            end (float or datetime): Inclusive end (None = latest snapshot)
+            
+        Returns:
+            np.ndarray: Structured array with 'timestamp' and HISTORY_FIELDS columns
+        """
+        return self.history_store.read_range(start, end)
     
     def get_benchmark_data(self):
         """Get benchmark tracking data."""
@@ -63,16 +240,11 @@ class BenchmarkTracker:
         if not data:
             return None
         
-        # Fetch current benchmark price
-        df = fetch_data(self.benchmark_ticker, period="1d")
-        if df is None or df.empty:
+        # Current benchmark price (cached, shared with the other benchmarks)
+        current_price = self.service.latest_price(self.benchmark_ticker)
+        if current_price is None:
             return None
         
-        # Safe extraction of price
-        close_val = df['Close'].iloc[-1]
-        if isinstance(close_val, pd.Series):
-             close_val = close_val.iloc[0]
-        current_price = float(close_val)
         start_price = data.get('start_price', current_price)
         initial_investment = data.get('initial_investment', config.INITIAL_CASH)
         
@@ -130,20 +302,26 @@ class BenchmarkTracker:
         if not benchmark:
             return
         
-        snapshot = {
-            'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'portfolio_value': portfolio_value,
-            'portfolio_return': portfolio_return,
-            'benchmark_value': benchmark['current_value'],
-            'benchmark_return': benchmark['return_pct'],
-            'alpha': portfolio_return - benchmark['return_pct']
-        }
+        # O(1) append to the full history
+        self.history_store.append(
+            portfolio_value=portfolio_value,
+            portfolio_return=portfolio_return,
+            benchmark_value=benchmark['current_value'],
+            benchmark_return=benchmark['return_pct'],
+            alpha=portfolio_return - benchmark['return_pct']
+        )
         
-        data['history'].append(snapshot)
-        
-        # Keep last 100 snapshots
-        if len(data['history']) > 100:
-            data['history'] = data['history'][-100:]
+        self._write_dashboard_view(data)
+    
+    def _write_dashboard_view(self, data):
+        """Regenerate benchmark.json with metadata and the most recent snapshots."""
+        data['history'] = [
+            {
+                'date': datetime.fromtimestamp(record['timestamp']).strftime("%Y-%m-%d %H:%M:%S"),
+                **{name: float(record[name]) for name in HISTORY_FIELDS}
+            }
+            for record in self.history_store.tail(config.BENCHMARK_VIEW_POINTS)
+        ]
         
         with open(self.benchmark_file, 'w') as f:
-            json.dump(data, f, indent=4)
+            json.dump(data, f, separators=(',', ':'))
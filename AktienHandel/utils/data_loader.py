@@ -1,7 +1,96 @@
 import yfinance as yf
 import pandas as pd
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import random
+import threading
 import time
+from utils.rate_limit import TokenBucket, SingleFlight
+from utils.price_panel import PricePanel, read_manifest
+from utils.file_lock import FileLock
+import config
+
+
+# Outbound request control shared by every caller in the process
+_flights = SingleFlight()
+_limiters = {}
+_limiters_lock = threading.Lock()
+_rate_share = 1  # Processes splitting config.RATE_LIMITS (see split_rate_limits)
+
+
+def get_rate_limiter(upstream):
+    """Token bucket for an upstream (config.RATE_LIMITS, falling back to 'default')."""
+    with _limiters_lock:
+        if upstream not in _limiters:
+            rate, burst = config.RATE_LIMITS.get(upstream, config.RATE_LIMITS['default'])
+            _limiters[upstream] = TokenBucket(rate / _rate_share, max(1, burst / _rate_share))
+        return _limiters[upstream]
+
+
+def split_rate_limits(processes):
+    """
+    Limit this process to its share of every upstream's rate and burst, so
+    `processes` processes downloading at once (e.g. scan workers, as their pool
+    initializer) stay within config.RATE_LIMITS together.
+    
+    Args:
+        processes (int): Processes sharing the limits (1 = the full limits)
+    """
+    global _rate_share
+    with _limiters_lock:
+        _rate_share = max(1, processes)
+        _limiters.clear()  # Buckets inherited from the parent (fork) had the full rate
+
+
+def _request(upstream, key, fn):
+    """
+    Perform an upstream request once per key at a time, within the upstream's rate limit.
+    Callers that arrive while the same request is in flight share its result.
+    
+    Args:
+        upstream (str): Rate-limit bucket (e.g. 'yahoo')
+        key (tuple): Request identity (same key = same response)
+        fn (callable): Performs the request and returns the final (not to be mutated) result
+    """
+    def call():
+        get_rate_limiter(upstream).acquire()
+        return fn()
+    
+    result, shared = _flights.do((upstream,) + tuple(key), call)
+    if shared:
+        # Every caller, the one that ran the request included, gets its own frames,
+        # so nobody mutates another caller's data
+        if isinstance(result, pd.DataFrame):
+            return result.copy()
+        if isinstance(result, dict):
+            return {k: v.copy() if isinstance(v, pd.DataFrame) else v for k, v in result.items()}
+    return result
+
+
+def get_data_access_stats():
+    """
+    Counters of the data-access layer.
+    
+    Returns:
+        dict: {'upstreams': {name: {'requests', 'throttled_seconds'}},
+               'coalescing': {'calls', 'executed', 'deduplicated'}}
+    """
+    with _limiters_lock:
+        upstreams = {name: bucket.stats() for name, bucket in _limiters.items()}
+    return {'upstreams': upstreams, 'coalescing': _flights.stats()}
+
+
+def _download_history(ticker, period, interval):
+    data = yf.download(ticker, period=period, interval=interval, progress=False, multi_level_index=False)
+    
+    # Handle potential MultiIndex columns (common in newer yfinance versions)
+    if isinstance(data.columns, pd.MultiIndex):
+        data.columns = data.columns.get_level_values(0)
+        
+    # Deduplicate columns if any (e.g. sometimes yfinance returns duplicate columns)
+    return data.loc[:, ~data.columns.duplicated()]
+
 
 def fetch_data(ticker, period="1y", interval="1d"):
     """
@@ -16,14 +105,8 @@ def fetch_data(ticker, period="1y", interval="1d"):
         pd.DataFrame: DataFrame containing the historical data.
     """
     try:
-        data = yf.download(ticker, period=period, interval=interval, progress=False, multi_level_index=False)
-        
-        # Handle potential MultiIndex columns (common in newer yfinance versions)
-        if isinstance(data.columns, pd.MultiIndex):
-            data.columns = data.columns.get_level_values(0)
-            
-        # Deduplicate columns if any (e.g. sometimes yfinance returns duplicate columns)
-        data = data.loc[:, ~data.columns.duplicated()]
+        data = _request('yahoo', ('history', ticker, period, interval),
+                        lambda: _download_history(ticker, period, interval))
         
         if data.empty:
             print(f"[DataLoader] Warning: No data found for {ticker}")
@@ -34,64 +117,317 @@ def fetch_data(ticker, period="1y", interval="1d"):
         return None
 
 
-def fetch_batch_data(tickers, period="1y", interval="1d", max_workers=5):
+def _download_batch(tickers, period="1y", interval="1d"):
+    """
+    One yfinance request for a list of tickers. Raises on request errors.
+    Identical concurrent requests are coalesced and all requests are rate limited.
+    
+    Returns:
+        dict: ticker -> DataFrame for tickers that returned data
+    """
+    return _request('yahoo', ('batch', tuple(tickers), period, interval),
+                    lambda: _download_batch_uncached(tickers, period, interval))
+
+
+def _download_batch_uncached(tickers, period, interval):
+    if len(tickers) == 1:
+        data = _download_history(tickers[0], period, interval)
+        return {tickers[0]: data} if not data.dropna(how='all').empty else {}
+
+    data = yf.download(tickers, period=period, interval=interval, group_by='ticker', progress=False, threads=True)
+    if data.empty:
+        return {}
+    
+    # With group_by='ticker' the columns are a MultiIndex (Ticker, Price)
+    if not isinstance(data.columns, pd.MultiIndex):
+        print("[DataLoader] Warning: Batch download returned unexpected structure.")
+        return {}
+    
+    results = {}
+    requested = set(tickers)
+    for ticker in data.columns.levels[0]:
+        if ticker in requested:  # Ensure we only get what we asked for
+            ticker_df = data[ticker]
+            # Tickers that failed inside a batch come back as all-NaN columns
+            if not ticker_df.dropna(how='all').empty:
+                results[ticker] = ticker_df.copy()
+    return results
+
+
+class BulkDownloader:
     """
-    Fetches data for multiple tickers using yfinance batch download.
+    Chunked, concurrent batch downloader with per-ticker retries and quarantine.
+    
+    Tickers are requested in chunks of `chunk_size` on up to `max_workers`
+    threads. Tickers missing from a chunk (or from a chunk that raised) are
+    retried one by one with exponential backoff and jitter. Consecutive
+    failures per ticker are persisted; a ticker that keeps failing is skipped
+    for `quarantine_days`. Calls where nothing downloaded at all are treated
+    as an outage and not held against any ticker. Throughput of the last call
+    is kept in `metrics`. Several processes (e.g. sharded scan workers) can
+    share one health file: each save merges this process's changes into the
+    file under a lock.
+    """
+
+    def __init__(self, chunk_size=None, max_workers=None, max_retries=None, backoff_base=None,
+                 backoff_max=None, quarantine_after=None, quarantine_days=None, health_file=None,
+                 download=None, sleep=time.sleep):
+        self.chunk_size = chunk_size or config.DOWNLOAD_CHUNK_SIZE
+        self.max_workers = max_workers or config.DOWNLOAD_MAX_WORKERS
+        self.max_retries = config.DOWNLOAD_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = config.DOWNLOAD_BACKOFF_BASE if backoff_base is None else backoff_base
+        self.backoff_max = config.DOWNLOAD_BACKOFF_MAX if backoff_max is None else backoff_max
+        self.quarantine_after = quarantine_after or config.QUARANTINE_AFTER_FAILURES
+        self.quarantine_days = config.QUARANTINE_DAYS if quarantine_days is None else quarantine_days
+        self.health_file = health_file if health_file is not None else config.DOWNLOAD_HEALTH_FILE
+        self.download_fn = download or _download_batch
+        self.sleep = sleep
+        self.health = self._load_health()  # ticker -> {'attempts', 'failures', 'consecutive', 'quarantined_until'}
+        self.metrics = {}
+        self._changes = {}  # ticker -> attempts/failures recorded since the last save
+        self._lock = threading.Lock()
+
+    def download(self, tickers, period="1y", interval="1d", max_workers=None):
+        """
+        Download many tickers, returning whatever could be fetched.
+        
+        Args:
+            tickers (list): Ticker symbols
+            period (str): History period
+            interval (str): Data interval
+            max_workers (int): Concurrent chunk requests (defaults to the instance setting)
+            
+        Returns:
+            dict: ticker -> DataFrame
+        """
+        started = time.time()
+        tickers = list(dict.fromkeys(tickers))
+        active = [t for t in tickers if not self.is_quarantined(t)]
+        skipped = len(tickers) - len(active)
+        if skipped:
+            print(f"[DataLoader] Skipping {skipped} quarantined ticker(s)")
+        
+        chunks = [active[i:i + self.chunk_size] for i in range(0, len(active), self.chunk_size)]
+        results = {}
+        requests_made = len(chunks)
+        retries = 0
+        workers = max(1, min(max_workers or self.max_workers, len(chunks) or 1))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for chunk_result in pool.map(lambda chunk: self._try_download(chunk, period, interval), chunks):
+                results.update(chunk_result)
+        
+            # Retry what is missing one ticker at a time, backing off between rounds
+            missing = [t for t in active if t not in results]
+            for attempt in range(self.max_retries):
+                if not missing:
+                    break
+                self.sleep(self._backoff(attempt))
+                retries += len(missing)
+                requests_made += len(missing)
+                for single in pool.map(lambda t: self._try_download([t], period, interval), missing):
+                    results.update(single)
+                missing = [t for t in missing if t not in results]
+                if not results:
+                    break  # Nothing at all came back: likely offline, stop hammering
+        
+        # Only blame individual tickers when others downloaded fine (not an outage)
+        if results:
+            for ticker in active:
+                self._record(ticker, ticker in results)
+            self._save_health()
+        
+        elapsed = max(time.time() - started, 1e-9)
+        nbytes = sum(int(df.memory_usage(index=True).sum()) for df in results.values())
+        self.metrics = {
+            'requested': len(tickers),
+            'downloaded': len(results),
+            'failed': len(active) - len(results),
+            'quarantined': skipped,
+            'requests': requests_made,
+            'retries': retries,
+            'seconds': elapsed,
+            'tickers_per_sec': len(results) / elapsed,
+            'bytes': nbytes,  # in-memory size of the returned frames
+            'bytes_per_sec': nbytes / elapsed,
+        }
+        if len(tickers) > 1:
+            print(f"[DataLoader] {len(results)}/{len(tickers)} tickers in {elapsed:.1f}s "
+                  f"({self.metrics['tickers_per_sec']:.1f} tickers/s, {nbytes / elapsed / 1e6:.2f} MB/s, "
+                  f"{requests_made} requests, {len(active) - len(results)} failed)")
+        return results
+
+    def is_quarantined(self, ticker):
+        entry = self.health.get(ticker)
+        return bool(entry and entry.get('quarantined_until', 0) > time.time())
+
+    def failure_rate(self, ticker):
+        """Share of download attempts that failed for a ticker (0.0 if never tried)."""
+        entry = self.health.get(ticker)
+        if not entry or not entry['attempts']:
+            return 0.0
+        return entry['failures'] / entry['attempts']
+
+    def _try_download(self, tickers, period, interval):
+        try:
+            return self.download_fn(tickers, period, interval)
+        except Exception as e:
+            print(f"[DataLoader] Request for {len(tickers)} ticker(s) failed: {e}")
+            return {}
+
+    def _backoff(self, attempt):
+        """Exponential backoff with full jitter in [0.5, 1.5] x base * 2^attempt."""
+        return min(self.backoff_max, self.backoff_base * (2 ** attempt)) * random.uniform(0.5, 1.5)
+
+    def _record(self, ticker, success):
+        with self._lock:
+            entry = self.health.setdefault(ticker, {'attempts': 0, 'failures': 0, 'consecutive': 0, 'quarantined_until': 0})
+            entry['attempts'] += 1
+            change = self._changes.setdefault(ticker, {'attempts': 0, 'failures': 0})
+            change['attempts'] += 1
+            change['failures'] += not success
+            if success:
+                entry['consecutive'] = 0
+                entry['quarantined_until'] = 0
+                return
+            entry['failures'] += 1
+            entry['consecutive'] += 1
+            if entry['consecutive'] >= self.quarantine_after:
+                entry['quarantined_until'] = time.time() + self.quarantine_days * 86400
+                print(f"[DataLoader] Quarantined {ticker} for {self.quarantine_days} days after {entry['consecutive']} failed downloads")
+
+    def _load_health(self):
+        if not self.health_file or not os.path.exists(self.health_file):
+            return {}
+        try:
+            with open(self.health_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_health(self):
+        """
+        Merge the changes since the last save into the health file. Counters are
+        added to what other processes saved meanwhile; the streak and quarantine
+        of a ticker come from the process that tried it last.
+        """
+        if not self.health_file:
+            return
+        with self._lock:
+            changes, self._changes = self._changes, {}
+            latest = {t: dict(self.health[t]) for t in changes}
+        try:
+            with FileLock(self.health_file + '.lock'):
+                health = self._load_health()
+                for ticker, change in changes.items():
+                    entry = health.setdefault(ticker, {'attempts': 0, 'failures': 0})
+                    entry['attempts'] += change['attempts']
+                    entry['failures'] += change['failures']
+                    entry['consecutive'] = latest[ticker]['consecutive']
+                    entry['quarantined_until'] = latest[ticker]['quarantined_until']
+                tmp_file = f"{self.health_file}.{os.getpid()}.tmp"
+                with open(tmp_file, 'w') as f:
+                    json.dump(health, f)
+                os.replace(tmp_file, self.health_file)
+            with self._lock:
+                for ticker, entry in health.items():
+                    if ticker not in self._changes:
+                        self.health[ticker] = entry
+        except OSError as e:
+            print(f"[DataLoader] Could not save download health: {e}")
+
+
+_bulk_downloader = None
+
+
+def get_bulk_downloader():
+    """Shared BulkDownloader (one health table per process)."""
+    global _bulk_downloader
+    if _bulk_downloader is None:
+        _bulk_downloader = BulkDownloader()
+    return _bulk_downloader
+
+
+def fetch_batch_data(tickers, period="1y", interval="1d", max_workers=None):
+    """
+    Fetches data for multiple tickers in chunked, retried batch downloads.
     
     Args:
         tickers (list): List of ticker symbols
         period (str): History period
         interval (str): Data interval
-        max_workers (int): Ignored (kept for compatibility)
+        max_workers (int): Concurrent chunk requests (default config.DOWNLOAD_MAX_WORKERS)
         
     Returns:
-        dict: Dictionary mapping ticker -> DataFrame
+        dict: Dictionary mapping ticker -> DataFrame (partial on failures)
     """
     if not tickers:
         return {}
+    return get_bulk_downloader().download(tickers, period=period, interval=interval, max_workers=max_workers)
+
+
+def fetch_price_panel(tickers, period="1y", interval="1d", max_workers=None, chunk_size=None):
+    """
+    Like fetch_batch_data, but returns the compact columnar PricePanel
+    (shared date index, float32 prices) instead of one DataFrame per ticker.
+    The panel is filled chunk by chunk, so only one chunk of DataFrames is in
+    memory at a time.
+    
+    Args:
+        chunk_size (int): Tickers downloaded before converting them to the panel
+                          (default: one request per download worker)
+    
+    Returns:
+        PricePanel: Panel of the tickers that returned data
+    """
+    tickers = list(dict.fromkeys(tickers))
+    chunk_size = chunk_size or config.DOWNLOAD_CHUNK_SIZE * (max_workers or config.DOWNLOAD_MAX_WORKERS)
+    chunks = (fetch_batch_data(tickers[i:i + chunk_size], period=period, interval=interval, max_workers=max_workers)
+              for i in range(0, len(tickers), chunk_size))
+    return PricePanel.from_chunks(chunks)
+
+
+def publish_price_panel(panel, period, interval="1d", directory=None):
+    """
+    Export a panel to config.PRICE_PANEL_DIR for other processes to attach.
+    
+    Returns:
+        dict: The written manifest
+    """
+    return panel.save(directory or config.PRICE_PANEL_DIR, period=period, interval=interval)
+
+
+_shared_panels = {}  # directory -> (generation, PricePanel)
+
+
+def get_shared_panel(period, interval="1d", max_age=None, directory=None):
+    """
+    The published price panel, memory-mapped read-only (attached once per export).
+    
+    Args:
+        period (str): History period the panel must have been downloaded with
+        interval (str): Bar interval the panel must have
+        max_age (float): Max seconds since publication (default config.PRICE_PANEL_MAX_AGE)
+        directory (str): Export directory (default config.PRICE_PANEL_DIR)
         
-    results = {}
-    try:
-        # Use yfinance native batch download which is faster and more reliable
-        data = yf.download(tickers, period=period, interval=interval, group_by='ticker', progress=False, threads=True)
-        
-        if data.empty:
-            return {}
-            
-        # Check if we got a single level content (if only 1 ticker passed effectively) or MultiIndex
-        if len(tickers) == 1:
-            # Re-use fetch_data logic for single ticker consistency or wrap
-            # But yf.download with list might return scalar columns if length is 1
-            ticker = tickers[0]
-            if not data.empty:
-                 results[ticker] = data
-            return results
-            
-        # If multiple tickers, columns should be MultiIndex (Ticker, Price) due to group_by='ticker'
-        if isinstance(data.columns, pd.MultiIndex):
-            # Iterate through the top level (Tickers)
-            # Valid tickers will be in the top level
-            # Note: yfinance might change levels based on auto_adjust. 
-            # With group_by='ticker', level 0 is Ticker.
-            
-            # Get valid tickers present in columns
-            downloaded_tickers = data.columns.levels[0]
-            
-            for ticker in downloaded_tickers:
-                if ticker in tickers: # Ensure we only get what we asked for
-                    ticker_df = data[ticker].copy()
-                    if not ticker_df.empty:
-                         # Drop NaNs if any (e.g. some days missing) - optional
-                         # ticker_df.dropna(how='all', inplace=True) 
-                         results[ticker] = ticker_df
-        else:
-            # Fallback if something weird happens or structure is different
-            print("[DataLoader] Warning: Batch download returned unexpected structure.")
-            
-    except Exception as e:
-        print(f"[DataLoader] Error in batch fetch: {e}")
-            
-    return results
+    Returns:
+        PricePanel: Shared panel, or None if none is published, it is stale or it does not match
+    """
+    directory = directory or config.PRICE_PANEL_DIR
+    max_age = config.PRICE_PANEL_MAX_AGE if max_age is None else max_age
+    manifest = read_manifest(directory)
+    if manifest is None or time.time() - manifest['created'] > max_age:
+        return None
+    if manifest['meta'].get('period') != period or manifest['meta'].get('interval') != interval:
+        return None
+    
+    cached = _shared_panels.get(directory)
+    if cached is None or cached[0] != manifest['generation']:
+        panel = PricePanel.attach(directory)
+        if panel is None:
+            return None
+        cached = (panel.manifest['generation'], panel)
+        _shared_panels[directory] = cached
+    return cached[1]
 
 
 def get_ticker_info(ticker):
@@ -105,8 +441,7 @@ def get_ticker_info(ticker):
         dict: Ticker info or None if error
     """
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
+        info = _request('yahoo', ('info', ticker), lambda: yf.Ticker(ticker).info)
         
         # Extract key metrics
         return {
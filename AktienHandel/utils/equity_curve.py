@@ -0,0 +1,65 @@
+"""
+Equity Curve - Persisted history of portfolio valuations with a running peak.
+
+Every record stores the portfolio value together with the highest value seen
+so far, so the current drawdown is available from the last record alone.
+"""
+
+from utils.timeseries_store import TimeSeriesStore
+import config
+
+
+class EquityCurve:
+    """Append-only portfolio value series used for drawdown enforcement."""
+
+    def __init__(self, path=None):
+        self.store = TimeSeriesStore(path or config.EQUITY_CURVE_FILE, ['value', 'peak'])
+
+    def append(self, value, timestamp=None):
+        """
+        Record a portfolio valuation.
+
+        Args:
+            value (float): Total portfolio value
+            timestamp (float): Unix timestamp (defaults to now)
+
+        Returns:
+            float: Current drawdown after this valuation
+        """
+        peak = max(self.peak(), value)
+        self.store.append(timestamp=timestamp, value=value, peak=peak)
+        return (peak - value) / peak if peak > 0 else 0.0
+
+    def peak(self):
+        """Highest recorded value (starts at INITIAL_CASH)."""
+        last = self.store.last()
+        if last is None:
+            return config.INITIAL_CASH
+        return float(last['peak'])
+
+    def current_value(self):
+        """Most recently recorded value, or None if nothing was recorded yet."""
+        last = self.store.last()
+        return None if last is None else float(last['value'])
+
+    def current_drawdown(self, value=None):
+        """
+        Drawdown from the running peak as a fraction (0.0 at a new high, 0.12 = 12% below).
+
+        Args:
+            value (float): Optional live value to measure instead of the last record
+        """
+        if value is None:
+            value = self.current_value()
+            if value is None:
+                return 0.0
+        peak = max(self.peak(), value)
+        return (peak - value) / peak if peak > 0 else 0.0
+
+    def is_breached(self, value=None):
+        """True if the drawdown has reached config.MAX_DRAWDOWN_PCT."""
+        return self.current_drawdown(value) >= config.MAX_DRAWDOWN_PCT
+
+    def history(self):
+        """All recorded valuations as a structured array (timestamp, value, peak)."""
+        return self.store.read()
@@ -0,0 +1,130 @@
+"""
+Exposure Book - Tracks per-position and per-asset-class market values.
+
+Values come from the shared price snapshot that ExecutionAgent stores in the
+portfolio state ('current_prices'). The book is rebuilt once per valuation and
+then updated incrementally on every fill, so allocation checks are plain
+dictionary lookups instead of loops over the holdings.
+"""
+
+from utils.universe_manager import UniverseManager
+
+
+class ExposureBook:
+    """
+    Market value per position and per asset class ('stock', 'crypto').
+    """
+
+    def __init__(self, universe_mgr=None):
+        self.universe_mgr = universe_mgr or UniverseManager()
+        self.quantities = {}
+        self.prices = {}
+        self.positions = {}
+        self.asset_classes = {'stock': 0.0, 'crypto': 0.0}
+
+    def rebuild(self, holdings, prices):
+        """
+        Rebuild all values from holdings and a price snapshot.
+
+        Args:
+            holdings (dict): ticker -> quantity
+            prices (dict): ticker -> latest price
+        """
+        self.quantities = {}
+        self.prices = {}
+        self.positions = {}
+        self.asset_classes = {'stock': 0.0, 'crypto': 0.0}
+        for ticker, quantity in holdings.items():
+            self._set_position(ticker, quantity, prices.get(ticker, 0.0))
+
+    def apply_fill(self, ticker, action, quantity, price):
+        """
+        Update the book for an executed trade.
+
+        Args:
+            ticker (str): Ticker symbol
+            action (str): 'BUY' or 'SELL'
+            quantity (int): Filled quantity
+            price (float): Fill price (becomes the position's mark)
+        """
+        signed_qty = quantity if action == 'BUY' else -quantity
+        self._set_position(ticker, self.quantities.get(ticker, 0) + signed_qty, price)
+
+    def update_price(self, ticker, price):
+        """Re-mark an existing position at a new price."""
+        if ticker in self.quantities:
+            self._set_position(ticker, self.quantities[ticker], price)
+
+    def position_value(self, ticker):
+        """Market value of a single position (0 if not held)."""
+        return self.positions.get(ticker, 0.0)
+
+    def class_value(self, asset_class):
+        """Total market value held in an asset class."""
+        return self.asset_classes.get(asset_class, 0.0)
+
+    def to_dict(self):
+        """JSON-serializable snapshot stored in the portfolio state."""
+        return {
+            'positions': dict(self.positions),
+            'asset_classes': dict(self.asset_classes)
+        }
+
+    def _set_position(self, ticker, quantity, price):
+        asset_class = self.universe_mgr.get_asset_type(ticker)
+        old_value = self.positions.pop(ticker, 0.0)
+        self.asset_classes[asset_class] = self.asset_classes.get(asset_class, 0.0) - old_value
+
+        if quantity <= 0:
+            self.quantities.pop(ticker, None)
+            self.prices.pop(ticker, None)
+            return
+
+        value = quantity * price
+        self.quantities[ticker] = quantity
+        self.prices[ticker] = price
+        self.positions[ticker] = value
+        self.asset_classes[asset_class] += value
+
+
+def get_allocations(portfolio_state, universe_mgr=None):
+    """
+    Per-asset-class market values for a portfolio state.
+
+    Uses the 'exposure' snapshot written by ExecutionAgent when present and
+    otherwise values the holdings with the state's 'current_prices'.
+
+    Args:
+        portfolio_state (dict): Portfolio state from ExecutionAgent
+        universe_mgr (UniverseManager): Optional shared universe manager
+
+    Returns:
+        dict: asset class -> market value (always has 'stock' and 'crypto')
+    """
+    exposure = portfolio_state.get('exposure')
+    if exposure and 'asset_classes' in exposure:
+        return exposure['asset_classes']
+
+    book = ExposureBook(universe_mgr)
+    book.rebuild(portfolio_state.get('holdings', {}), portfolio_state.get('current_prices', {}))
+    return book.asset_classes
+
+
+def get_position_values(portfolio_state, universe_mgr=None):
+    """
+    Per-position market values for a portfolio state.
+
+    Args:
+        portfolio_state (dict): Portfolio state from ExecutionAgent
+        universe_mgr (UniverseManager): Optional shared universe manager
+
+    Returns:
+        dict: ticker -> market value
+    """
+    exposure = portfolio_state.get('exposure')
+    if exposure and 'positions' in exposure:
+        return exposure['positions']
+
+    book = ExposureBook(universe_mgr)
+    book.rebuild(portfolio_state.get('holdings', {}), portfolio_state.get('current_prices', {}))
+    return book.positions
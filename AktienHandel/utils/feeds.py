@@ -0,0 +1,132 @@
+"""
+Feeds - Bar event sources for the event-driven trading session.
+
+A feed is an iterable of bar events in time order:
+
+    {'ticker': 'AAPL', 'time': Timestamp, 'Open': .., 'High': .., 'Low': ..,
+     'Close': .., 'Volume': ..}
+
+ReplayFeed replays stored bars (DataFrames, a directory of <ticker>.csv files
+or the intraday bar cache) and stands in for a live bar/quote subscription;
+anything yielding the same events can be plugged into TradingSession.
+
+PanelFeed streams a PricePanel (stored or synthetic, see utils.simulator) at
+a fixed message rate for load tests. Its events carry 'due', the
+time.perf_counter() time the message was scheduled for, so consumers can
+measure queueing lag and end-to-end latency.
+"""
+
+import heapq
+import os
+import time
+import numpy as np
+import pandas as pd
+
+
+BAR_FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+
+def _events(ticker, df):
+    fields = [f for f in BAR_FIELDS if f in df.columns]
+    columns = [df[f].to_numpy() for f in fields]
+    for i, when in enumerate(df.index):
+        event = {'ticker': ticker, 'time': when}
+        for field, values in zip(fields, columns):
+            event[field] = float(values[i])
+        yield event
+
+
+class ReplayFeed:
+    """
+    Replays stored bars of many tickers merged in timestamp order.
+    """
+
+    def __init__(self, frames, speed=0.0, sleep=time.sleep):
+        """
+        Args:
+            frames (dict): ticker -> OHLCV DataFrame with a DatetimeIndex
+            speed (float): 0 replays as fast as possible; otherwise the replay runs
+                           `speed` times faster than the bars' own clock
+            sleep (callable): Used to pace the replay (for tests)
+        """
+        self.frames = {t: df.sort_index() for t, df in frames.items() if df is not None and not df.empty}
+        self.speed = speed
+        self.sleep = sleep
+
+    @classmethod
+    def from_directory(cls, directory, tickers=None, speed=0.0):
+        """Replay <ticker>.csv files (as written by DataFrame.to_csv) from a directory."""
+        frames = {}
+        for filename in sorted(os.listdir(directory)):
+            ticker, ext = os.path.splitext(filename)
+            if ext != '.csv' or (tickers is not None and ticker not in tickers):
+                continue
+            df = pd.read_csv(os.path.join(directory, filename), index_col=0)
+            df.index = pd.DatetimeIndex(pd.to_datetime(df.index))
+            frames[ticker] = df
+        return cls(frames, speed=speed)
+
+    @classmethod
+    def from_bar_store(cls, store, tickers, interval='1h', days=30, speed=0.0):
+        """Replay the last `days` of cached intraday bars (see utils.bars.BarStore)."""
+        return cls({t: store.get(t, interval, days) for t in tickers}, speed=speed)
+
+    def subscribe(self, tickers):
+        """Restrict the feed to a watchlist."""
+        wanted = set(tickers)
+        self.frames = {t: df for t, df in self.frames.items() if t in wanted}
+        return self
+
+    def __len__(self):
+        return sum(len(df) for df in self.frames.values())
+
+    def __iter__(self):
+        streams = [_events(ticker, df) for ticker, df in self.frames.items()]
+        previous = None
+        for event in heapq.merge(*streams, key=lambda e: e['time']):
+            if self.speed and previous is not None and event['time'] > previous:
+                self.sleep((event['time'] - previous).total_seconds() / self.speed)
+            previous = event['time']
+            yield event
+
+
+class PanelFeed:
+    """
+    Streams every bar of a PricePanel, timestamp by timestamp, at a target message rate.
+    """
+
+    def __init__(self, panel, rate=0.0, clock=time.perf_counter, sleep=time.sleep):
+        """
+        Args:
+            panel (PricePanel): Bars to stream
+            rate (float): Target bar messages per second (0 = as fast as the consumer takes them)
+            clock (callable): Monotonic clock in seconds
+            sleep (callable): Used to hold back messages that are not due yet
+        """
+        self.panel = panel
+        self.rate = rate
+        self.clock = clock
+        self.sleep = sleep
+
+    def __len__(self):
+        return int(np.count_nonzero(~np.isnan(self.panel.field('Close'))))
+
+    def __iter__(self):
+        panel = self.panel
+        fields = [(field, panel.field(field)) for field in BAR_FIELDS]
+        close = panel.field('Close')
+        start = self.clock()
+        sent = 0
+        for t, when in enumerate(panel.dates):
+            rows = {field: array[t] for field, array in fields}
+            for j in np.flatnonzero(~np.isnan(close[t])):
+                due = start + sent / self.rate if self.rate else self.clock()
+                if self.rate:
+                    ahead = due - self.clock()
+                    if ahead > 0.001:  # Sleep only when meaningfully early; sleep granularity is ~1 ms
+                        self.sleep(ahead)
+                event = {'ticker': panel.tickers[j], 'time': when, 'due': due}
+                for field, row in rows.items():
+                    event[field] = float(row[j])
+                sent += 1
+                yield event
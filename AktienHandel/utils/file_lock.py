@@ -0,0 +1,56 @@
+"""
+File Lock - Exclusive cross-process lock on a lock file.
+
+Used by the portfolio journal to serialize sessions and by the data loader
+to merge ticker health updates from concurrent processes.
+"""
+
+import os
+import threading
+import time
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+
+class FileLock:
+    """
+    Exclusive cross-process lock on a lock file. Re-entrant within a process.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._handle = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            self._handle = open(self.path, 'a+')
+            if os.name == 'nt':
+                self._handle.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(self._handle.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        time.sleep(0.1)  # LK_LOCK gives up after ~10s; keep waiting
+            else:
+                fcntl.flock(self._handle.fileno(), fcntl.LOCK_EX)
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._depth -= 1
+        if self._depth == 0:
+            if os.name == 'nt':
+                self._handle.seek(0)
+                msvcrt.locking(self._handle.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._handle.fileno(), fcntl.LOCK_UN)
+            self._handle.close()
+            self._handle = None
+        self._thread_lock.release()
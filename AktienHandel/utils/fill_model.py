@@ -0,0 +1,124 @@
+"""
+Fill Model - Simulated execution costs for paper trading and backtests.
+
+Models the half spread, square-root market impact from the order's share of
+average daily volume, commissions and partial fills once an order would
+exceed the allowed volume participation. All inputs may be arrays, so a
+backtester can price thousands of orders in one call.
+"""
+
+import numpy as np
+import config
+
+
+TRADING_DAYS_PER_YEAR = 252
+DEFAULT_VOLATILITY = 0.30  # Annualized, used when an order carries no volatility estimate
+
+
+class FillModel:
+    """
+    Spread + impact + commission fill simulator.
+
+    impact = impact_coef * daily_volatility * sqrt(filled_qty / avg_volume)
+    fill_price = price * (1 + side * (half_spread + impact))
+    """
+
+    def __init__(self, spread_bps=None, crypto_spread_bps=None, impact_coef=None,
+                 commission_bps=None, min_commission=None, max_participation=None):
+        self.spread_bps = config.FILL_SPREAD_BPS if spread_bps is None else spread_bps
+        self.crypto_spread_bps = config.FILL_CRYPTO_SPREAD_BPS if crypto_spread_bps is None else crypto_spread_bps
+        self.impact_coef = config.FILL_IMPACT_COEF if impact_coef is None else impact_coef
+        self.commission_bps = config.FILL_COMMISSION_BPS if commission_bps is None else commission_bps
+        self.min_commission = config.FILL_MIN_COMMISSION if min_commission is None else min_commission
+        self.max_participation = config.FILL_MAX_PARTICIPATION if max_participation is None else max_participation
+
+    def simulate(self, prices, quantities, sides, avg_volumes=None, volatilities=None, is_crypto=None):
+        """
+        Simulate fills for a batch of orders.
+
+        Args:
+            prices: Reference (last close) prices
+            quantities: Requested quantities (whole units)
+            sides: +1 for BUY, -1 for SELL (or 'BUY'/'SELL' strings)
+            avg_volumes: Average daily volume per order (NaN/0 = unknown, no cap or impact);
+                         in units for stocks, in quote currency for crypto (as Yahoo reports it)
+            volatilities: Annualized volatility per order (NaN = DEFAULT_VOLATILITY)
+            is_crypto: Boolean mask selecting the crypto spread
+
+        Returns:
+            dict: Arrays 'filled_qty', 'fill_price', 'notional', 'fees',
+                  'cash_flow' (negative for buys) and 'cost_bps' (slippage + fees
+                  relative to the reference price)
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        quantities = np.asarray(quantities, dtype=np.int64)
+        n = prices.shape
+        sides = np.asarray(sides)
+        if sides.dtype.kind in 'US':
+            sides = np.where(sides == 'SELL', -1.0, 1.0)
+        sides = np.broadcast_to(sides.astype(np.float64), n)
+
+        adv = _broadcast(avg_volumes, n)
+        vol = _broadcast(volatilities, n)
+        vol = np.where(np.isnan(vol), DEFAULT_VOLATILITY, vol)
+        crypto = np.broadcast_to(np.asarray(False if is_crypto is None else is_crypto), n)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            adv = np.where(crypto, adv / prices, adv)  # crypto volume -> units
+
+        # Partial fills: cap each order at max_participation of daily volume
+        known_volume = np.nan_to_num(adv) > 0
+        cap = np.where(known_volume, np.floor(self.max_participation * np.nan_to_num(adv)), np.inf)
+        filled = np.minimum(quantities, cap).astype(np.int64)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            participation = np.where(known_volume, filled / adv, 0.0)
+        impact = self.impact_coef * vol / np.sqrt(TRADING_DAYS_PER_YEAR) * np.sqrt(participation)
+        half_spread = np.where(crypto, self.crypto_spread_bps, self.spread_bps) / 2e4
+
+        fill_price = prices * (1.0 + sides * (half_spread + impact))
+        notional = filled * fill_price
+        fees = np.where(filled > 0, np.maximum(self.min_commission, notional * self.commission_bps / 1e4), 0.0)
+        cash_flow = -sides * notional - fees
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            reference = filled * prices
+            cost_bps = np.where(reference > 0, (sides * (notional - reference) + fees) / reference * 1e4, 0.0)
+
+        return {
+            'filled_qty': filled,
+            'fill_price': fill_price,
+            'notional': notional,
+            'fees': fees,
+            'cash_flow': cash_flow,
+            'cost_bps': cost_bps
+        }
+
+    def fill(self, price, quantity, side, avg_volume=None, volatility=None, is_crypto=False):
+        """
+        Simulate a single order.
+
+        Returns:
+            dict: Scalar versions of the simulate() fields
+        """
+        result = self.simulate([price], [quantity], [side],
+                               None if avg_volume is None else [avg_volume],
+                               None if volatility is None else [volatility],
+                               [is_crypto])
+        return {key: value[0].item() for key, value in result.items()}
+
+    def max_affordable(self, cash, price, avg_volume=None, volatility=None, is_crypto=False):
+        """Largest BUY quantity whose simulated cash cost fits in `cash`."""
+        quantity = int(cash // price)
+        while quantity > 0:
+            result = self.fill(price, quantity, 'BUY', avg_volume, volatility, is_crypto)
+            if -result['cash_flow'] <= cash:
+                return quantity
+            # Step down by the overshoot, at least one unit
+            quantity -= max(1, int((-result['cash_flow'] - cash) // result['fill_price']))
+        return 0
+
+
+def _broadcast(values, shape):
+    if values is None:
+        return np.full(shape, np.nan)
+    return np.broadcast_to(np.asarray(values, dtype=np.float64), shape)
@@ -0,0 +1,170 @@
+"""
+Incremental Indicators - O(1) per-bar updates of the scanner/strategy indicators.
+
+The batch functions in utils.indicators recompute over the whole history.
+For an event-driven session every new bar only needs the running state of
+its own ticker updated: ring buffers with running sums give SMAs, rolling
+volatility and momentum, and Wilder RSI keeps its two averages. Values match
+the batch functions on the same data.
+"""
+
+import numpy as np
+from utils.indicators import window_bars, bars_per_day, periods_per_year
+
+
+class RollingWindow:
+    """
+    The last `size` values with O(1) running mean and standard deviation.
+    """
+
+    def __init__(self, size):
+        self.size = max(1, int(size))
+        self.values = np.zeros(self.size)
+        self.count = 0  # Values pushed so far
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    @property
+    def full(self):
+        return self.count >= self.size
+
+    def push(self, value):
+        slot = self.count % self.size
+        if self.full:
+            old = self.values[slot]
+            self.total -= old
+            self.total_sq -= old * old
+        self.values[slot] = value
+        self.total += value
+        self.total_sq += value * value
+        self.count += 1
+        if slot == self.size - 1:
+            # Re-sum once per cycle so floating-point drift cannot accumulate
+            self.total = float(self.values.sum())
+            self.total_sq = float(np.dot(self.values, self.values))
+
+    def mean(self):
+        n = min(self.count, self.size)
+        return self.total / n if n else np.nan
+
+    def std(self):
+        """Sample standard deviation (ddof=1)."""
+        n = min(self.count, self.size)
+        if n < 2:
+            return np.nan
+        variance = (self.total_sq - self.total * self.total / n) / (n - 1)
+        return float(np.sqrt(max(variance, 0.0)))
+
+    def oldest(self):
+        """Oldest value still in the window."""
+        return self.values[self.count % self.size] if self.full else self.values[0]
+
+
+class WilderRSI:
+    """
+    Relative Strength Index with Wilder smoothing, updated per price.
+    """
+
+    def __init__(self, window=14):
+        self.window = window
+        self.prev = None
+        self.count = 0
+        self.avg_gain = None
+        self.avg_loss = None
+        self._seed_gain = 0.0
+        self._seed_loss = 0.0
+
+    def push(self, price):
+        if self.prev is None:
+            self.prev = price
+            return
+        delta = price - self.prev
+        self.prev = price
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+        self.count += 1
+        if self.avg_gain is None:
+            # Seed with the simple mean of the first window changes
+            self._seed_gain += gain
+            self._seed_loss += loss
+            if self.count == self.window:
+                self.avg_gain = self._seed_gain / self.window
+                self.avg_loss = self._seed_loss / self.window
+        else:
+            self.avg_gain = (self.avg_gain * (self.window - 1) + gain) / self.window
+            self.avg_loss = (self.avg_loss * (self.window - 1) + loss) / self.window
+
+    def value(self):
+        if self.avg_gain is None:
+            return np.nan
+        if self.avg_loss == 0:
+            return 100.0 if self.avg_gain > 0 else np.nan
+        return 100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss)
+
+
+class IndicatorState:
+    """
+    Running indicators of one ticker, with windows expressed in time.
+    """
+
+    def __init__(self, interval='1d', asset_type='stock'):
+        bars = lambda window: window_bars(window, interval, asset_type)
+        self.sma20 = RollingWindow(bars('20d'))
+        self.sma50 = RollingWindow(bars('50d'))
+        self.sma200 = RollingWindow(bars('200d'))
+        self.volume = RollingWindow(bars('20d'))
+        self.recent_volume = RollingWindow(5)
+        self.returns = RollingWindow(bars('50d'))  # Volatility window
+        self.rsi = WilderRSI(14)
+        self.bars_per_day = bars_per_day(interval, asset_type)
+        self.periods_per_year = periods_per_year(interval, asset_type)
+        self.price = np.nan
+        self.bars = 0
+
+    def update(self, close, volume=0.0):
+        """
+        Add one bar.
+
+        Returns:
+            bool: False if the bar had no close and was ignored
+        """
+        if close is None or np.isnan(close):
+            return False
+        if self.bars:
+            self.returns.push(close / self.price - 1.0)
+        volume = 0.0 if volume is None or np.isnan(volume) else float(volume)
+        for window in (self.sma20, self.sma50, self.sma200):
+            window.push(close)
+        self.volume.push(volume)
+        self.recent_volume.push(volume)
+        self.rsi.push(close)
+        self.price = float(close)
+        self.bars += 1
+        return True
+
+    def snapshot(self):
+        """
+        Current indicator values (NaN until a window is filled).
+
+        Returns:
+            dict: price, bars, sma20, sma50, sma200, momentum, volume_ratio,
+                  avg_volume (per day), volatility (annualized), rsi
+        """
+        full_mean = lambda window: window.mean() if window.full else np.nan
+        avg_volume = full_mean(self.volume)
+        if avg_volume > 0:
+            volume_ratio = self.recent_volume.mean() / avg_volume
+        else:
+            volume_ratio = 1.0
+        return {
+            'price': self.price,
+            'bars': self.bars,
+            'sma20': full_mean(self.sma20),
+            'sma50': full_mean(self.sma50),
+            'sma200': full_mean(self.sma200),
+            # Change from the oldest close of the 20-day window, as indicators.momentum
+            'momentum': self.price / self.sma20.oldest() - 1.0 if self.sma20.full else np.nan,
+            'volume_ratio': volume_ratio,
+            'avg_volume': avg_volume * self.bars_per_day if avg_volume > 0 else 0.0,
+            'volatility': self.returns.std() * np.sqrt(self.periods_per_year),
+            'rsi': self.rsi.value(),
+        }
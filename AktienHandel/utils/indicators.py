@@ -0,0 +1,306 @@
+"""
+Technical Indicators - Shared NumPy implementation of the indicators used by
+the scanner, analyst and strategies.
+
+Every function accepts a 1-D price series (list, ndarray or pandas Series) or a
+2-D dates x tickers array/DataFrame. Time always runs along axis 0, so a
+2-D input is processed for all tickers at once. Rolling indicators return an
+array of the same shape as the input (leading values are NaN until the window
+is filled); summary statistics reduce axis 0 and return a float for 1-D input
+or one value per ticker for 2-D input.
+
+Windows are counted in bars. window_bars converts durations such as '50d'
+(50 sessions) or '4h' into bar counts for a bar interval, so the same
+indicator settings work for daily and intraday bars.
+"""
+
+import numpy as np
+
+
+TRADING_DAYS_PER_YEAR = 252
+
+# Bar interval -> minutes per bar
+INTERVAL_MINUTES = {'1m': 1, '2m': 2, '5m': 5, '15m': 15, '30m': 30, '60m': 60, '90m': 90, '1h': 60, '1d': 1440}
+
+# Trading minutes per session (stocks: regular US hours, crypto trades around the clock)
+SESSION_MINUTES = {'stock': 390, 'crypto': 1440}
+
+
+def bars_per_day(interval='1d', asset_type='stock'):
+    """Bars in one trading session (a partial last bar counts as one)."""
+    minutes = INTERVAL_MINUTES[interval]
+    if minutes >= 1440:
+        return 1
+    return int(np.ceil(SESSION_MINUTES[asset_type] / minutes))
+
+
+def window_bars(window, interval='1d', asset_type='stock'):
+    """
+    Convert a time window to a number of bars.
+
+    Args:
+        window (str or int): Duration like '50d' (sessions), '4h' or '90m'
+                             (trading time); an int is already a bar count
+        interval (str): Bar interval ('1m', '5m', '15m', '1h', '1d', ...)
+        asset_type (str): 'stock' or 'crypto' (session length)
+
+    Returns:
+        int: Number of bars (at least 1)
+    """
+    if isinstance(window, (int, np.integer)):
+        return int(window)
+    amount, unit = float(window[:-1]), window[-1]
+    if unit == 'd':
+        bars = amount * bars_per_day(interval, asset_type)
+    elif unit in ('h', 'm'):
+        bars = amount * (60 if unit == 'h' else 1) / INTERVAL_MINUTES[interval]
+    else:
+        raise ValueError(f"Unknown window unit in {window!r} (use d, h or m)")
+    return max(1, int(round(bars)))
+
+
+def calendar_days(window, asset_type='stock'):
+    """
+    Calendar days of history that contain a window of sessions, e.g. for
+    sizing a download so a '200d' average can be computed.
+
+    Args:
+        window (str or int): Duration like '200d' (see window_bars) or a session count
+        asset_type (str): 'stock' (5 sessions a week, plus holidays) or 'crypto' (every day)
+
+    Returns:
+        int: Calendar days
+    """
+    sessions = window_bars(window, '1d', asset_type)
+    if asset_type == 'crypto':
+        return sessions
+    return int(np.ceil(sessions * 7 / 5 * 365 / 360))  # ~9 exchange holidays a year
+
+
+def periods_per_year(interval='1d', asset_type='stock'):
+    """Bars per year, for annualizing statistics of bars at `interval`."""
+    return TRADING_DAYS_PER_YEAR * bars_per_day(interval, asset_type)
+
+
+def as_array(values):
+    """
+    Convert price data to a float64 ndarray without copying when possible.
+
+    Args:
+        values: list, ndarray, pandas Series or DataFrame
+
+    Returns:
+        np.ndarray: 1-D or 2-D float array (time along axis 0)
+    """
+    if hasattr(values, 'to_numpy'):
+        return values.to_numpy(dtype=np.float64, copy=False)
+    return np.asarray(values, dtype=np.float64)
+
+
+def _reduce(result):
+    """Return a plain float for 0-d results, the array otherwise."""
+    if np.ndim(result) == 0:
+        return float(result)
+    return result
+
+
+def last(values):
+    """Last row of a series (float for 1-D, per-ticker array for 2-D)."""
+    return _reduce(as_array(values)[-1])
+
+
+def returns(prices):
+    """
+    Simple period-over-period returns.
+
+    Returns:
+        np.ndarray: Array with one row less than the input
+    """
+    prices = as_array(prices)
+    return prices[1:] / prices[:-1] - 1.0
+
+
+def sma(prices, window):
+    """
+    Simple moving average computed with a cumulative sum (O(n)).
+
+    Args:
+        prices: Price series or dates x tickers array
+        window (int): Number of observations per average
+
+    Returns:
+        np.ndarray: Moving average, NaN for the first window-1 rows
+    """
+    prices = as_array(prices)
+    out = np.full(prices.shape, np.nan)
+    if window <= 0 or len(prices) < window:
+        return out
+
+    # NaNs only invalidate the windows that contain them
+    missing = np.isnan(prices)
+    csum = np.cumsum(np.where(missing, 0.0, prices), axis=0)
+    nan_count = np.cumsum(missing, axis=0)
+
+    out[window - 1] = csum[window - 1]
+    out[window:] = csum[window:] - csum[:-window]
+    out[window - 1:] /= window
+
+    gaps = nan_count[window - 1:].copy()
+    gaps[1:] -= nan_count[:-window]
+    out[window - 1:][gaps > 0] = np.nan
+    return out
+
+
+def ema(prices, span):
+    """
+    Exponential moving average (same as pandas ewm(span, adjust=False)).
+
+    Args:
+        prices: Price series or dates x tickers array
+        span (int): EMA span, alpha = 2 / (span + 1)
+
+    Returns:
+        np.ndarray: Exponential moving average
+    """
+    prices = as_array(prices)
+    out = np.empty(prices.shape)
+    if len(prices) == 0:
+        return out
+
+    alpha = 2.0 / (span + 1.0)
+    out[0] = prices[0]
+    for i in range(1, len(prices)):
+        prev = out[i - 1]
+        value = np.where(np.isnan(prev), prices[i], alpha * prices[i] + (1.0 - alpha) * prev)
+        # Missing prices carry the previous average forward
+        out[i] = np.where(np.isnan(prices[i]), prev, value)
+    return out
+
+
+def _wilder(values, window):
+    """Wilder smoothing seeded with the simple mean of the first window values."""
+    out = np.full(values.shape, np.nan)
+    if len(values) < window:
+        return out
+
+    out[window - 1] = values[:window].mean(axis=0)
+    for i in range(window, len(values)):
+        smoothed = (out[i - 1] * (window - 1) + values[i]) / window
+        out[i] = np.where(np.isnan(values[i]), out[i - 1], smoothed)
+    return out
+
+
+def rsi(prices, window=14):
+    """
+    Relative Strength Index using Wilder smoothing.
+
+    Args:
+        prices: Price series or dates x tickers array
+        window (int): Lookback window (default 14)
+
+    Returns:
+        np.ndarray: RSI values between 0 and 100, NaN until the window is filled
+    """
+    prices = as_array(prices)
+    out = np.full(prices.shape, np.nan)
+    if len(prices) <= window:
+        return out
+
+    delta = np.diff(prices, axis=0)
+    avg_gain = _wilder(np.clip(delta, 0, None), window)
+    avg_loss = _wilder(np.clip(-delta, 0, None), window)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        out[1:] = 100.0 - 100.0 / (1.0 + rs)
+    # No losses in the window means maximum strength
+    out[1:][(avg_loss == 0) & (avg_gain > 0)] = 100.0
+    return out
+
+
+def atr(high, low, close, window=14):
+    """
+    Average True Range using Wilder smoothing.
+
+    Args:
+        high, low, close: Price series or dates x tickers arrays
+        window (int): Lookback window (default 14)
+
+    Returns:
+        np.ndarray: ATR values, NaN until the window is filled
+    """
+    high = as_array(high)
+    low = as_array(low)
+    close = as_array(close)
+
+    true_range = high - low
+    if len(close) > 1:
+        prev_close = close[:-1]
+        true_range[1:] = np.maximum.reduce([
+            high[1:] - low[1:],
+            np.abs(high[1:] - prev_close),
+            np.abs(low[1:] - prev_close),
+        ])
+    return _wilder(true_range, window)
+
+
+def volatility(prices, periods_per_year=TRADING_DAYS_PER_YEAR):
+    """
+    Annualized volatility of simple returns (sample standard deviation).
+
+    Returns:
+        float or np.ndarray: Annualized volatility
+    """
+    rets = returns(prices)
+    if len(rets) < 2:
+        return _reduce(np.zeros(rets.shape[1:]))
+    return _reduce(np.nanstd(rets, axis=0, ddof=1) * np.sqrt(periods_per_year))
+
+
+def drawdown(prices):
+    """
+    Percentage drawdown from the running peak (0 at new highs, negative below).
+
+    Returns:
+        np.ndarray: Drawdown series with the same shape as the input
+    """
+    prices = as_array(prices)
+    peak = np.fmax.accumulate(prices, axis=0)
+    return (prices - peak) / peak
+
+
+def max_drawdown(prices):
+    """
+    Largest peak-to-trough decline over the series.
+
+    Returns:
+        float or np.ndarray: Most negative drawdown (e.g. -0.25 for -25%)
+    """
+    return _reduce(np.nanmin(drawdown(prices), axis=0))
+
+
+def momentum(prices, window):
+    """
+    Relative change from the price `window` observations back (inclusive of
+    the latest row) to the latest price.
+
+    Args:
+        prices: Price series or dates x tickers array
+        window (int): Lookback in observations (e.g. 20 for a 20-day momentum)
+
+    Returns:
+        float or np.ndarray: Momentum as a fraction (0.05 = +5%)
+    """
+    prices = as_array(prices)
+    return _reduce(prices[-1] / prices[-window] - 1.0)
+
+
+def total_return(prices):
+    """
+    Return from the first to the last observation.
+
+    Returns:
+        float or np.ndarray: Total return as a fraction
+    """
+    prices = as_array(prices)
+    return _reduce(prices[-1] / prices[0] - 1.0)
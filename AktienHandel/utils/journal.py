@@ -0,0 +1,166 @@
+"""
+Portfolio Journal - Crash-safe persistence for portfolio.json and the trade log.
+
+Every fill is first appended to a write-ahead log (WAL) and fsynced. The new
+portfolio state is then written to a temp file and atomically renamed over
+portfolio.json, after which the WAL is cleared. If a session dies in between,
+the next load replays the outstanding WAL records, so cash/holdings and the
+trade log always end up consistent. A cross-process file lock serializes
+sessions (e.g. a dashboard-triggered run next to a manual one).
+"""
+
+import json
+import os
+from utils.file_lock import FileLock
+from utils.trade_log import TradeLog
+
+
+# Fields owned by the journal; they only change through fills
+LEDGER_FIELDS = ['cash', 'holdings', 'trade_count', 'last_trade', 'fees_paid', 'journal_seq']
+
+
+def apply_fill(state, fill):
+    """
+    Apply one fill to the ledger fields of a portfolio state (in place).
+
+    Args:
+        state (dict): Portfolio state
+        fill (dict): {'date', 'ticker', 'action', 'quantity', 'price', 'total', 'reason'}
+                     plus optional 'fees' (already included in 'total')
+    """
+    holdings = state.setdefault('holdings', {})
+    ticker = fill['ticker']
+    quantity = fill['quantity']
+
+    if fill['action'] == 'BUY':
+        state['cash'] = state.get('cash', 0) - fill['total']
+        holdings[ticker] = holdings.get(ticker, 0) + quantity
+    else:
+        state['cash'] = state.get('cash', 0) + fill['total']
+        holdings[ticker] = holdings.get(ticker, 0) - quantity
+        if holdings[ticker] <= 0:
+            del holdings[ticker]
+            state.get('current_prices', {}).pop(ticker, None)
+
+    state['last_trade'] = {
+        'ticker': ticker,
+        'action': fill['action'],
+        'quantity': quantity,
+        'price': fill['price'],
+        'timestamp': fill['date']
+    }
+    state['trade_count'] = state.get('trade_count', 0) + 1
+    if fill.get('fees'):
+        state['fees_paid'] = state.get('fees_paid', 0) + fill['fees']
+
+
+def _trade_row(fill):
+    return [fill['date'], fill['ticker'], fill['action'], fill['quantity'], fill['price'], fill['total'], fill['reason']]
+
+
+class PortfolioJournal:
+    """
+    Write-ahead journaled store for the portfolio snapshot and trade log.
+    """
+
+    def __init__(self, portfolio_file, trade_log_file, wal_file, lock_file):
+        self.portfolio_file = portfolio_file
+        self.trade_log = TradeLog(trade_log_file)
+        self.wal_file = wal_file
+        self.lock = FileLock(lock_file)
+
+    def load(self):
+        """
+        Read the latest snapshot, replaying any fills left in the WAL by a crash.
+
+        Returns:
+            dict: Portfolio state
+        """
+        with self.lock:
+            with open(self.portfolio_file, 'r') as f:
+                state = json.load(f)
+
+            pending = [r for r in self._read_wal() if r['seq'] > state.get('journal_seq', 0)]
+            if pending:
+                for record in pending:
+                    for fill in record['fills']:
+                        apply_fill(state, fill)
+                    self._append_trade_rows(record['fills'], skip_logged=True)
+                    state['journal_seq'] = record['seq']
+                self._write_snapshot(state)
+                print(f"[Journal] Replayed {len(pending)} uncommitted WAL record(s)")
+            self._clear_wal()
+            return state
+
+    def commit(self, state, fills):
+        """
+        Durably record fills and the resulting state as one transaction.
+
+        The caller has already applied the fills to `state` (see apply_fill).
+        Order: WAL append + fsync -> trade log rows -> atomic snapshot -> WAL clear.
+
+        Args:
+            state (dict): Portfolio state after the fills
+            fills (list): Fill dicts applied to the state
+        """
+        with self.lock:
+            seq = state.get('journal_seq', 0) + 1
+            with open(self.wal_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'seq': seq, 'fills': fills}) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+            self._append_trade_rows(fills)
+            state['journal_seq'] = seq
+            self._write_snapshot(state)
+            self._clear_wal()
+
+    def checkpoint(self, state):
+        """
+        Atomically write a snapshot that carries no new fills (valuations, summaries).
+        Ledger fields are taken from disk so a concurrent session's fills are never lost.
+        """
+        with self.lock:
+            if os.path.exists(self.portfolio_file):
+                on_disk = self.load()
+                for field in LEDGER_FIELDS:
+                    if field in on_disk:
+                        state[field] = on_disk[field]
+            self._write_snapshot(state)
+
+    def append_trade_rows(self, fills):
+        """Append fills to the trade log without touching the snapshot."""
+        with self.lock:
+            self._append_trade_rows(fills)
+
+    def _write_snapshot(self, state):
+        tmp_file = self.portfolio_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(state, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.portfolio_file)
+
+    def _append_trade_rows(self, fills, skip_logged=False):
+        rows = [_trade_row(fill) for fill in fills]
+        if skip_logged:
+            logged = self.trade_log.tail_rows(len(rows))
+            rows = [row for row in rows if [str(v) for v in row] not in logged]
+        self.trade_log.append(rows)
+
+    def _read_wal(self):
+        if not os.path.exists(self.wal_file):
+            return []
+        records = []
+        with open(self.wal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break  # torn final write, never committed
+        return records
+
+    def _clear_wal(self):
+        if os.path.exists(self.wal_file) and os.path.getsize(self.wal_file) > 0:
+            with open(self.wal_file, 'w'):
+                pass
@@ -0,0 +1,356 @@
+"""
+Mock LLM - Deterministic local stand-in for an Ollama server.
+
+Implements the parts of the Ollama HTTP API that LLMClient uses
+(GET /api/tags, POST /api/generate, streaming or not) and answers with
+canned replies in the formats the agents parse: DECISION/CONFIDENCE/REASON
+for trade signals, STRATEGY/MAX_NEW_POSITIONS/REASON for portfolio guidance
+and a short summary for everything else.
+
+Timing is modelled like a real model server: a time-to-first-token drawn
+from a latency distribution, prompt processing and generation at fixed token
+rates, and at most `parallel` requests served at once (later ones queue, as
+with OLLAMA_NUM_PARALLEL). Errors (HTTP 500) and timeouts (no response) can be
+injected at a given rate.
+
+Every random draw is seeded from the seed, the prompt and how often that
+prompt was seen, so a run is reproducible regardless of thread scheduling,
+and the reply to a prompt is always the same (safe to cache).
+"""
+
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import config
+
+
+LATENCY_MODELS = ('fixed', 'uniform', 'lognormal')
+
+REASONS = {
+    'BUY': ["Price above both moving averages with rising momentum",
+            "Strong uptrend with moderate volatility",
+            "Breakout above the 50-day average on good relative strength"],
+    'SELL': ["Price broke below the 50-day average",
+             "Trend weakening while volatility rises",
+             "Momentum fading after an extended run"],
+    'HOLD': ["Mixed signals, no clear trend",
+             "Trend intact but the entry is extended",
+             "Waiting for confirmation of the move"],
+}
+
+GUIDANCE = {
+    'AGGRESSIVE': "Portfolio trails MSCI World, add strong trend positions",
+    'CONSERVATIVE': "Protect the lead over MSCI World while volatility is high",
+    'HOLD': "Positioning is balanced against the benchmark, keep current holdings",
+}
+
+SUMMARIES = [
+    "The price trades above its 50-day average and the longer trend is intact. "
+    "Volatility is moderate, so the position looks constructive but not extended.",
+    "The price sits below its 50-day average while the 200-day trend flattens. "
+    "Drawdown risk is elevated until momentum recovers.",
+    "Recent trades leaned into momentum names and the portfolio tracks the benchmark closely. "
+    "Keeping position sizes disciplined should preserve the edge over MSCI World.",
+]
+
+
+def parse_latency(spec):
+    """
+    Parse a latency spec such as 'fixed:0.2', 'uniform:0.1:0.5' or 'lognormal:0.4:0.5'.
+
+    Returns:
+        tuple: (model, *params) as accepted by MockOllamaServer
+    """
+    model, *params = spec.split(':')
+    if model not in LATENCY_MODELS:
+        raise ValueError(f"Unknown latency model: {model} (use one of {LATENCY_MODELS})")
+    return (model, *[float(p) for p in params])
+
+
+def canned_reply(prompt, rng):
+    """
+    Reply in the format the prompt asks for.
+
+    Args:
+        prompt (str): The prompt sent to /api/generate
+        rng (np.random.Generator): Source of the reply's variation
+
+    Returns:
+        tuple: (kind, text) with kind 'decision', 'strategy' or 'text'
+    """
+    if 'DECISION:' in prompt:
+        decision = rng.choice(['BUY', 'SELL', 'HOLD'], p=[0.35, 0.2, 0.45])
+        confidence = int(rng.integers(40, 91))
+        reason = REASONS[decision][rng.integers(len(REASONS[decision]))]
+        return 'decision', f"DECISION: {decision}\nCONFIDENCE: {confidence}\nREASON: {reason}"
+    if 'STRATEGY:' in prompt:
+        strategy = rng.choice(list(GUIDANCE), p=[0.4, 0.3, 0.3])
+        positions = int(rng.integers(1, 6)) if strategy == 'AGGRESSIVE' else 0
+        return 'strategy', f"STRATEGY: {strategy}\nMAX_NEW_POSITIONS: {positions}\nREASON: {GUIDANCE[strategy]}"
+    return 'text', SUMMARIES[rng.integers(len(SUMMARIES))]
+
+
+def count_tokens(text):
+    """Rough token count (about 4 characters per token, as for English text)."""
+    return max(1, len(text) // 4)
+
+
+class MockOllamaServer:
+    """
+    Threaded HTTP server speaking the Ollama API with simulated model timing.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=('lognormal', 0.3, 0.4), tokens_per_sec=40.0,
+                 prompt_tokens_per_sec=800.0, parallel=4, error_rate=0.0, timeout_rate=0.0, hang=120.0,
+                 seed=0, models=None, replies=canned_reply):
+        """
+        Args:
+            host (str): Interface to bind
+            port (int): Port to bind (0 picks a free port, see url)
+            latency (tuple): Time to first token: ('fixed', s), ('uniform', low, high)
+                             or ('lognormal', median, sigma), in seconds
+            tokens_per_sec (float): Generation speed (0 = instant)
+            prompt_tokens_per_sec (float): Prompt processing speed (0 = instant)
+            parallel (int): Requests served at once; more wait in a queue (None = unlimited)
+            error_rate (float): Share of requests answered with HTTP 500
+            timeout_rate (float): Share of requests that never get a response
+            hang (float): Seconds a timed-out request is held before the connection is dropped
+            seed (int): Seed for replies, latencies and injected faults
+            models (list): Model names served (default: config.LOCAL_AI_MODEL)
+            replies (callable): (prompt, rng) -> (kind, text)
+        """
+        if latency[0] not in LATENCY_MODELS:
+            raise ValueError(f"Unknown latency model: {latency[0]} (use one of {LATENCY_MODELS})")
+        self.latency = tuple(latency)
+        self.tokens_per_sec = tokens_per_sec
+        self.prompt_tokens_per_sec = prompt_tokens_per_sec
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.hang = hang
+        self.seed = seed
+        self.models = list(models or [config.LOCAL_AI_MODEL])
+        self.replies = replies
+        self.slots = threading.BoundedSemaphore(parallel) if parallel else None
+
+        self._lock = threading.Lock()
+        self._seen = {}  # prompt digest -> requests so far
+        self._stopping = threading.Event()
+        self._thread = None
+        self.reset_stats()
+
+        handler = type('MockOllamaHandler', (_Handler,), {'mock': self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve in a background thread; returns self."""
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='mock-ollama', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and release held (timed-out) requests."""
+        self._stopping.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {'requests': 0, 'completed': 0, 'errors': 0, 'timeouts': 0,
+                           'prompt_tokens': 0, 'eval_tokens': 0, 'busy_seconds': 0.0,
+                           'queue_seconds': 0.0, 'active': 0, 'max_active': 0,
+                           'kinds': {'decision': 0, 'strategy': 0, 'text': 0}}
+
+    def stats(self):
+        """
+        Request counters since start (or reset_stats).
+
+        Returns:
+            dict: requests, completed, errors, timeouts, prompt_tokens, eval_tokens,
+                  busy_seconds (simulated model time), queue_seconds (waiting for a slot),
+                  max_active (most requests in flight at once) and kinds (replies per format)
+        """
+        with self._lock:
+            stats = {k: v for k, v in self._stats.items() if k != 'active'}
+            stats['kinds'] = dict(self._stats['kinds'])
+        return stats
+
+    def _count(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self._stats[key] += value
+
+    def _rng(self, prompt, model):
+        """Generators for the reply (per prompt) and for timing/faults (per prompt and attempt)."""
+        digest = hashlib.sha256(f"{model}\0{prompt}".encode('utf-8')).digest()
+        key = int.from_bytes(digest[:8], 'little')
+        with self._lock:
+            attempt = self._seen.get(key, 0)
+            self._seen[key] = attempt + 1
+        return np.random.default_rng([self.seed, key]), np.random.default_rng([self.seed, key, attempt + 1])
+
+    def _first_token_delay(self, rng):
+        model, *params = self.latency
+        if model == 'fixed':
+            return params[0]
+        if model == 'uniform':
+            return rng.uniform(params[0], params[1])
+        return params[0] * np.exp(params[1] * rng.standard_normal())
+
+    def generate(self, body):
+        """
+        Plan one /api/generate call (everything except the waiting).
+
+        Returns:
+            dict: fault (None, 'error' or 'timeout'), kind, text, prompt_tokens,
+                  eval_tokens, load, prompt_eval and eval (seconds)
+        """
+        prompt = body.get('prompt', '')
+        reply_rng, rng = self._rng(prompt, body.get('model', ''))
+        draw = rng.random()
+        if draw < self.timeout_rate:
+            fault = 'timeout'
+        elif draw < self.timeout_rate + self.error_rate:
+            fault = 'error'
+        else:
+            fault = None
+
+        kind, text = self.replies(prompt, reply_rng)
+        limit = (body.get('options') or {}).get('num_predict')
+        prompt_tokens, eval_tokens = count_tokens(prompt), count_tokens(text)
+        if limit and limit > 0 and eval_tokens > limit:
+            text, eval_tokens = text[:limit * 4], limit
+        rate = lambda tokens, per_sec: tokens / per_sec if per_sec else 0.0
+        return {'fault': fault, 'kind': kind, 'text': text, 'prompt_tokens': prompt_tokens,
+                'eval_tokens': eval_tokens, 'load': max(0.0, float(self._first_token_delay(rng))),
+                'prompt_eval': rate(prompt_tokens, self.prompt_tokens_per_sec),
+                'eval': rate(eval_tokens, self.tokens_per_sec)}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    mock = None  # Set per server
+    server_version = 'MockOllama/1.0'
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/api/tags':
+            now = datetime.now(timezone.utc).isoformat()
+            self._send_json(200, {'models': [
+                {'name': name, 'model': name, 'modified_at': now, 'size': 0,
+                 'digest': hashlib.sha256(name.encode('utf-8')).hexdigest(),
+                 'details': {'format': 'mock', 'family': 'mock'}}
+                for name in self.mock.models]})
+        elif self.path == '/':
+            self.send_response(200)
+            self.send_header('Content-Length', '17')
+            self.end_headers()
+            self.wfile.write(b'Ollama is running')
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if self.path != '/api/generate':
+            self._send_json(404, {'error': 'not found'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send_json(400, {'error': 'invalid JSON body'})
+            return
+        mock = self.mock
+        model = body.get('model', '')
+        if model not in mock.models:
+            self._send_json(404, {'error': f"model '{model}' not found, try pulling it first"})
+            return
+
+        plan = mock.generate(body)
+        mock._count(requests=1)
+        if plan['fault'] == 'timeout':
+            mock._count(timeouts=1)
+            mock._stopping.wait(mock.hang)
+            self.close_connection = True  # Drop the connection without a response
+            return
+
+        queued = time.perf_counter()
+        if mock.slots:
+            mock.slots.acquire()
+        try:
+            started = time.perf_counter()
+            with mock._lock:
+                mock._stats['active'] += 1
+                mock._stats['max_active'] = max(mock._stats['max_active'], mock._stats['active'])
+            time.sleep(plan['load'] + plan['prompt_eval'])
+            if plan['fault'] == 'error':
+                mock._count(errors=1)
+                self._send_json(500, {'error': 'model runner has unexpectedly stopped'})
+            elif body.get('stream', True):
+                self._stream(model, plan)
+            else:
+                time.sleep(plan['eval'])
+                self._send_json(200, self._final(model, plan, plan['text']))
+            if plan['fault'] is None:
+                mock._count(completed=1, prompt_tokens=plan['prompt_tokens'], eval_tokens=plan['eval_tokens'])
+                with mock._lock:
+                    mock._stats['kinds'][plan['kind']] += 1
+        finally:
+            busy = time.perf_counter() - started
+            with mock._lock:
+                mock._stats['active'] -= 1
+                mock._stats['busy_seconds'] += busy
+                mock._stats['queue_seconds'] += started - queued
+            if mock.slots:
+                mock.slots.release()
+
+    def _final(self, model, plan, response):
+        ns = lambda seconds: int(seconds * 1e9)
+        return {'model': model, 'created_at': datetime.now(timezone.utc).isoformat(),
+                'response': response, 'done': True, 'done_reason': 'stop',
+                'total_duration': ns(plan['load'] + plan['prompt_eval'] + plan['eval']),
+                'load_duration': ns(plan['load']),
+                'prompt_eval_count': plan['prompt_tokens'], 'prompt_eval_duration': ns(plan['prompt_eval']),
+                'eval_count': plan['eval_tokens'], 'eval_duration': ns(plan['eval'])}
+
+    def _stream(self, model, plan):
+        """Newline-delimited JSON chunks, one per word, paced at the token rate."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        self.close_connection = True  # No Content-Length: the end of the body is the connection close
+        words = plan['text'].split(' ')
+        pause = plan['eval'] / len(words)
+        for i, word in enumerate(words):
+            time.sleep(pause)
+            chunk = {'model': model, 'created_at': datetime.now(timezone.utc).isoformat(),
+                     'response': word if i == 0 else ' ' + word, 'done': False}
+            self.wfile.write(json.dumps(chunk).encode('utf-8') + b'\n')
+        self.wfile.write(json.dumps(self._final(model, plan, '')).encode('utf-8') + b'\n')
@@ -0,0 +1,134 @@
+"""
+Portfolio Optimizer - Position weights for a set of BUY candidates.
+
+Weights are fractions of total portfolio value, long-only, capped per
+position and bounded by the cash budget. Expected returns come from the
+signals: alpha = confidence * volatility * information ratio (a signal of
+confidence 1 is worth SIGNAL_INFORMATION_RATIO units of its own risk), so the
+covariance term decides how correlated candidates share the budget.
+
+Methods:
+    mean_variance: max  mu'w - risk_aversion/2 * w'Cov w
+    kelly:         mean-variance with risk_aversion = 1 / KELLY_FRACTION
+    risk_parity:   equal risk contribution, scaled to the budget
+"""
+
+import numpy as np
+import config
+
+
+TRADING_DAYS_PER_YEAR = 252
+METHODS = ('fixed', 'mean_variance', 'risk_parity', 'kelly')
+
+
+def project_capped_simplex(weights, caps, budget, iterations=60):
+    """
+    Euclidean projection onto {0 <= w <= caps, sum(w) <= budget}.
+
+    Args:
+        weights (np.ndarray): Unconstrained weights
+        caps (np.ndarray): Upper bound per weight
+        budget (float): Upper bound on the sum
+
+    Returns:
+        np.ndarray: Projected weights
+    """
+    clipped = np.clip(weights, 0.0, caps)
+    if clipped.sum() <= budget:
+        return clipped
+
+    # Find the shift tau with sum(clip(w - tau, 0, caps)) == budget by bisection
+    lo, hi = 0.0, float(np.max(weights))
+    for _ in range(iterations):
+        tau = (lo + hi) / 2
+        if np.clip(weights - tau, 0.0, caps).sum() > budget:
+            lo = tau
+        else:
+            hi = tau
+    return np.clip(weights - hi, 0.0, caps)
+
+
+def expected_returns(cov, confidence):
+    """Daily alpha per candidate from signal confidence and its own volatility."""
+    daily_ir = config.SIGNAL_INFORMATION_RATIO / np.sqrt(TRADING_DAYS_PER_YEAR)
+    return np.asarray(confidence, dtype=np.float64) * np.sqrt(np.diag(cov)) * daily_ir
+
+
+def mean_variance(mu, cov, caps, budget, risk_aversion, iterations=500):
+    """
+    Long-only mean-variance weights by projected gradient ascent.
+
+    Args:
+        mu (np.ndarray): Expected daily returns
+        cov (np.ndarray): Daily return covariance
+        caps (np.ndarray): Max weight per candidate
+        budget (float): Max total weight (cash / total value)
+        risk_aversion (float): Penalty on portfolio variance
+
+    Returns:
+        np.ndarray: Weights
+    """
+    lipschitz = risk_aversion * max(np.linalg.eigvalsh(cov).max(), 1e-12)
+    step = 1.0 / lipschitz
+    weights = np.zeros(len(mu))
+    for _ in range(iterations):
+        gradient = mu - risk_aversion * cov @ weights
+        updated = project_capped_simplex(weights + step * gradient, caps, budget)
+        if np.abs(updated - weights).max() < 1e-10:
+            return updated
+        weights = updated
+    return weights
+
+
+def risk_parity(cov, caps, budget, iterations=200):
+    """
+    Equal-risk-contribution weights scaled to the budget, then capped.
+
+    Returns:
+        np.ndarray: Weights
+    """
+    vol = np.sqrt(np.maximum(np.diag(cov), 1e-12))
+    weights = (1.0 / vol) / (1.0 / vol).sum()
+    for _ in range(iterations):
+        # Fixed point of w_i * (Cov w)_i = const
+        marginal = np.maximum(cov @ weights, 1e-12)
+        updated = np.sqrt(weights / marginal)
+        updated /= updated.sum()
+        if np.abs(updated - weights).max() < 1e-10:
+            weights = updated
+            break
+        weights = updated
+    return project_capped_simplex(weights * budget, caps, budget)
+
+
+def optimize(returns, caps, budget, method='mean_variance', confidence=None):
+    """
+    Solve for candidate weights.
+
+    Args:
+        returns (np.ndarray): T x N daily returns of the candidates
+        caps (np.ndarray): Max weight per candidate (position/crypto limits)
+        budget (float): Max total weight (cash / total value)
+        method (str): 'mean_variance', 'risk_parity' or 'kelly'
+        confidence (np.ndarray): Signal confidence per candidate (defaults to 1)
+
+    Returns:
+        np.ndarray: Weights as fractions of total portfolio value
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    n = returns.shape[1]
+    caps = np.broadcast_to(np.asarray(caps, dtype=np.float64), (n,))
+    budget = max(0.0, float(budget))
+
+    cov = np.atleast_2d(np.cov(returns, rowvar=False))
+    cov = cov + np.eye(n) * 1e-6 * np.trace(cov) / n  # ridge keeps the solve well conditioned
+
+    if method == 'risk_parity':
+        return risk_parity(cov, caps, budget)
+
+    mu = expected_returns(cov, np.ones(n) if confidence is None else confidence)
+    if method == 'kelly':
+        return mean_variance(mu, cov, caps, budget, 1.0 / config.KELLY_FRACTION)
+    if method == 'mean_variance':
+        return mean_variance(mu, cov, caps, budget, config.MV_RISK_AVERSION)
+    raise ValueError(f"Unknown optimization method: {method}")
@@ -0,0 +1,104 @@
+"""
+Order Book - Collects the session's approved orders and nets them before execution.
+
+Orders are queued while the session runs and executed together at the end,
+so the portfolio is persisted and revalued once per session instead of once
+per trade. Opposing orders on the same ticker are netted into a single order.
+"""
+
+import copy
+from utils.exposure import ExposureBook
+
+
+class OrderBook:
+    """
+    Pending orders for one trading session.
+    """
+
+    def __init__(self, universe_mgr=None):
+        self.orders = []  # (signal, quantity) in arrival order
+        self.exposure = ExposureBook(universe_mgr)
+
+    def __len__(self):
+        return len(self.orders)
+
+    def add(self, signal, quantity):
+        """
+        Queue an approved order.
+
+        Args:
+            signal (dict): Trade signal with 'ticker', 'signal' and 'price'
+            quantity (int): Approved quantity
+        """
+        if quantity > 0:
+            self.orders.append((signal, quantity))
+
+    def clear(self):
+        self.orders = []
+
+    def project(self, portfolio):
+        """
+        Portfolio state as if all pending orders had filled at their signal price.
+        Lets risk checks and position sizing see cash and positions already committed.
+
+        Args:
+            portfolio (dict): Portfolio state from ExecutionAgent.get_portfolio_state()
+
+        Returns:
+            dict: Projected copy (the input is not modified)
+        """
+        if not self.orders:
+            return portfolio
+
+        state = copy.deepcopy(portfolio)
+        holdings = state.setdefault('holdings', {})
+        prices = state.setdefault('current_prices', {})
+
+        for signal, quantity in self.orders:
+            ticker = signal['ticker']
+            value = signal['price'] * quantity
+            if signal['signal'] == 'BUY':
+                state['cash'] = state.get('cash', 0) - value
+                holdings[ticker] = holdings.get(ticker, 0) + quantity
+            else:
+                state['cash'] = state.get('cash', 0) + value
+                holdings[ticker] = holdings.get(ticker, 0) - quantity
+                if holdings[ticker] <= 0:
+                    del holdings[ticker]
+                    prices.pop(ticker, None)
+                    continue
+            prices.setdefault(ticker, signal['price'])
+
+        self.exposure.rebuild(holdings, prices)
+        state['exposure'] = self.exposure.to_dict()
+        return state
+
+    def net(self):
+        """
+        Net opposing orders per ticker.
+
+        Returns:
+            list: (signal, quantity) per ticker with a non-zero net quantity,
+                  in order of each ticker's first arrival
+        """
+        by_ticker = {}
+        for signal, quantity in self.orders:
+            entry = by_ticker.setdefault(signal['ticker'], {'BUY': [], 'SELL': []})
+            entry[signal['signal']].append((signal, quantity))
+
+        netted = []
+        for ticker, sides in by_ticker.items():
+            bought = sum(q for _, q in sides['BUY'])
+            sold = sum(q for _, q in sides['SELL'])
+            if bought == sold:
+                if bought:
+                    print(f"[OrderBook] {ticker}: BUY {bought} and SELL {sold} cancel out")
+                continue
+
+            side = 'BUY' if bought > sold else 'SELL'
+            signals = [s for s, _ in sides[side]]
+            merged = dict(signals[-1])  # latest signal carries the freshest price
+            if len(signals) > 1 or sides['BUY'] and sides['SELL']:
+                merged['reason'] = " | ".join(str(s.get('reason', '')) for s, _ in sides['BUY'] + sides['SELL'])
+            netted.append((merged, abs(bought - sold)))
+        return netted
@@ -0,0 +1,405 @@
+"""
+Perf - Offline environment and per-stage profiling for end-to-end benchmarks.
+
+OfflineMarket answers yfinance downloads (yf.download, yf.Ticker) from a
+synthetic price panel, so the whole data path (rate limits, coalescing,
+batching, caches) runs as in production without touching the network.
+offline_environment() installs it together with a guard that blocks (and
+counts) every other outbound connection, and points all data files at a
+scratch directory. StageProfiler attributes wall time, CPU time, peak RSS,
+network calls and LLM calls to the stages of a trading session.
+
+Counters live in shared memory, so downloads made by forked scan workers are
+counted too. diff_results compares two result files to catch regressions.
+"""
+
+import contextlib
+import csv
+import hashlib
+import ipaddress
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+import numpy as np
+import pandas as pd
+import config
+from utils.price_panel import FIELDS, PricePanel
+from utils.simulator import synthetic_panel
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+NETWORK_KINDS = ('history', 'batch', 'info', 'http', 'socket')  # Yahoo requests, other HTTP, raw sockets
+LLM_KIND = 'llm'
+SECTORS = ['Technology', 'Healthcare', 'Financials', 'Consumer Discretionary', 'Industrials',
+           'Communication Services', 'Consumer Staples', 'Energy', 'Utilities', 'Real Estate', 'Materials']
+
+# yfinance period -> trading days
+PERIOD_DAYS = {'1d': 1, '5d': 5, '1mo': 21, '3mo': 63, '6mo': 126, '1y': 252, '2y': 504, '5y': 1260}
+
+# Singletons that cache file paths or downloaded data: reset on entry, restored on exit
+_SINGLETONS = [('utils.data_loader', '_bulk_downloader'), ('utils.bars', '_bar_store')]
+_CACHES = [('utils.data_loader', '_limiters'), ('utils.data_loader', '_shared_panels'),
+           ('utils.benchmark', '_price_cache'), ('utils.benchmark', '_price_periods')]
+_PATHS = ['PORTFOLIO_FILE', 'TRADE_LOG_FILE', 'PORTFOLIO_WAL_FILE', 'PORTFOLIO_LOCK_FILE', 'BENCHMARK_FILE',
+          'EQUITY_CURVE_FILE', 'BENCHMARK_HISTORY_FILE', 'DOWNLOAD_HEALTH_FILE']
+_DIRS = ['UNIVERSE_DIR', 'PRICE_PANEL_DIR', 'BAR_CACHE_DIR']
+
+
+def period_days(period):
+    """Trading days covered by a yfinance period ('6mo', '1y', '30d', 'max', ...)."""
+    if period in PERIOD_DAYS:
+        return PERIOD_DAYS[period]
+    if period.endswith('d') and period[:-1].isdigit():
+        return int(period[:-1])
+    return None  # 'max', 'ytd': everything
+
+
+def peak_rss_mb(children=False):
+    """High-water resident set size of this process (or its largest finished child), or None."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    scale = 1 if os.uname().sysname == 'Darwin' else 1024  # macOS reports bytes, Linux KiB
+    return usage.ru_maxrss * scale / 2 ** 20
+
+
+def _children_cpu():
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+def synthetic_universe(n_tickers, prefix='SIM'):
+    """Ticker names of a synthetic stock universe (SIM00000, SIM00001, ...)."""
+    return [f"{prefix}{i:05d}" for i in range(n_tickers)]
+
+
+def write_universe(directory, name, tickers):
+    """Write a universe file (see utils.universe_manager) with sectors assigned round-robin."""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"{name}.csv"), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['symbol', 'exchange', 'asset_class', 'sector'])
+        for i, ticker in enumerate(tickers):
+            writer.writerow([ticker, 'US', 'stock', SECTORS[i % len(SECTORS)]])
+
+
+class OfflineMarket:
+    """
+    Synthetic daily OHLCV served through the yfinance calls the data loader makes.
+    """
+
+    def __init__(self, tickers, days=520, seed=0, model='gbm', on_request=None):
+        """
+        Args:
+            tickers (list): Tickers generated up front in one vectorized pass
+            days (int): Trading days of history, ending today
+            seed (int): Random seed (other tickers are seeded from their name)
+            model (str): Price model (see utils.simulator)
+            on_request (callable): Called with 'history', 'batch' or 'info' per request
+        """
+        self.days = days
+        self.seed = seed
+        self.model = model
+        self.on_request = on_request or (lambda kind: None)
+        self.dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days, name='Date')
+        self.panel = self._generate(list(tickers), seed)
+        self._extra = {}  # Tickers outside the universe (benchmarks, ...)
+
+    def _generate(self, tickers, seed):
+        panel = synthetic_panel(len(tickers), self.days, '1d', model=self.model, seed=seed)
+        return PricePanel(self.dates, tickers, {field: panel.field(field) for field in FIELDS})
+
+    def frame(self, ticker, period='1y', interval='1d'):
+        """One ticker's bars for a period (empty for intraday intervals and unknown data)."""
+        if interval != '1d':
+            return pd.DataFrame(columns=['Close', 'High', 'Low', 'Open', 'Volume'])
+        if ticker in self.panel:
+            df = self.panel.frame(ticker)
+        else:
+            if ticker not in self._extra:
+                seed = int.from_bytes(hashlib.sha256(ticker.encode('utf-8')).digest()[:4], 'little')
+                self._extra[ticker] = self._generate([ticker], seed).frame(ticker)
+            df = self._extra[ticker]
+        days = period_days(period)
+        df = df.iloc[-days:] if days else df
+        return df[['Close', 'High', 'Low', 'Open', 'Volume']].astype(np.float64)
+
+    def download(self, tickers, period='1mo', interval='1d', group_by='column', multi_level_index=True, **kwargs):
+        """Stand-in for yf.download (same column layout for one ticker or a list)."""
+        if isinstance(tickers, str):
+            tickers = tickers.replace(',', ' ').split()
+            single = len(tickers) == 1
+        else:
+            tickers = list(tickers)
+            single = False
+        self.on_request('history' if single else 'batch')
+        frames = {t: self.frame(t, period, interval) for t in tickers}
+        if single and not multi_level_index:
+            return frames[tickers[0]]
+        data = pd.concat(frames, axis=1, names=['Ticker', 'Price'])
+        return data if group_by == 'ticker' else data.swaplevel(axis=1).sort_index(axis=1)
+
+    def ticker(self, symbol):
+        """Stand-in for yf.Ticker: .info and .history()."""
+        market = self
+
+        class Ticker:
+            ticker = symbol
+
+            @property
+            def info(self):
+                market.on_request('info')
+                close = market.frame(symbol, '3mo')
+                return {'symbol': symbol, 'shortName': f"{symbol} Corp", 'sector': 'Technology',
+                        'industry': 'Software', 'marketCap': int(close['Close'].iloc[-1] * 1e9),
+                        'averageVolume': int(close['Volume'].mean() * 100)}
+
+            def history(self, period='1mo', interval='1d', **kwargs):
+                market.on_request('history')
+                return market.frame(symbol, period, interval)
+
+        return Ticker()
+
+
+class StageProfiler:
+    """
+    Wall time, CPU time, peak RSS growth and call counts per named stage.
+
+    rss_growth_mb is how far the process's peak RSS rose while the stage ran
+    (the largest rise over its calls), so a stage that allocates less than an
+    earlier stage's peak reports 0 rather than inheriting that peak.
+
+    Stages do not nest: time spent in a wrapped call made from inside another
+    stage stays with the outer stage. Everything outside a stage is 'other'.
+    Wrapped calls on other threads (e.g. analyses started while the scan is
+    running) count their calls and outbound requests towards their own stage,
+    but not their time, which overlaps the main thread's stages.
+    """
+
+    def __init__(self, stages):
+        self.stages = list(stages) + ['other']
+        self.kinds = list(NETWORK_KINDS) + [LLM_KIND]
+        self.results = {stage: {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'rss_growth_mb': None}
+                        for stage in self.stages}
+        # Shared with forked scan workers, whose downloads count towards the stage that started them
+        self._counts = multiprocessing.Array('q', len(self.stages) * len(self.kinds))
+        self.current = 'other'  # Stage of the thread that created the profiler
+        self._owner = threading.get_ident()
+        self._background = threading.local()  # Stage of a wrapped call on another thread
+        self._lock = threading.Lock()
+
+    def _stage_of_thread(self):
+        return getattr(self._background, 'stage', None) or self.current
+
+    def count(self, kind):
+        """Record one outbound call of a kind for the current stage."""
+        index = self.stages.index(self._stage_of_thread()) * len(self.kinds) + self.kinds.index(kind)
+        with self._counts.get_lock():
+            self._counts[index] += 1
+
+    def counts(self, stage=None):
+        """Calls per kind for one stage, or summed over all stages."""
+        values = np.array(self._counts[:], dtype=np.int64).reshape(len(self.stages), len(self.kinds))
+        row = values[self.stages.index(stage)] if stage else values.sum(axis=0)
+        return dict(zip(self.kinds, row.tolist()))
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        if threading.get_ident() != self._owner:
+            if getattr(self._background, 'stage', None):
+                yield  # Already inside a stage on this thread
+                return
+            self._background.stage = name
+            try:
+                yield
+            finally:
+                self._background.stage = None
+                with self._lock:
+                    self.results[name]['calls'] += 1
+            return
+        if self.current != 'other':
+            yield  # Already inside a stage
+            return
+        self.current = name
+        wall, cpu, children = time.perf_counter(), time.process_time(), _children_cpu()
+        rss = peak_rss_mb()
+        try:
+            yield
+        finally:
+            result = self.results[name]
+            with self._lock:
+                result['calls'] += 1
+            result['wall_s'] += time.perf_counter() - wall
+            result['cpu_s'] += time.process_time() - cpu + _children_cpu() - children
+            if rss is not None:
+                result['rss_growth_mb'] = max(result['rss_growth_mb'] or 0.0, peak_rss_mb() - rss)
+            self.current = 'other'
+
+    def wrap(self, name, fn):
+        """A callable that runs fn inside a stage."""
+        def timed(*args, **kwargs):
+            with self.stage(name):
+                return fn(*args, **kwargs)
+        return timed
+
+    def instrument(self, obj, method, name):
+        """Replace a bound method of an object with its stage-timed version."""
+        setattr(obj, method, self.wrap(name, getattr(obj, method)))
+
+    def report(self, wall_s, cpu_s):
+        """
+        Per-stage results, with 'other' as the rest of the given totals.
+
+        Returns:
+            dict: stage -> calls, wall_s, cpu_s, rss_growth_mb, network (calls per kind), llm_calls
+        """
+        stages = {}
+        for stage in self.stages:
+            result = dict(self.results[stage])
+            if stage == 'other':
+                result['wall_s'] = max(0.0, wall_s - sum(self.results[s]['wall_s'] for s in self.stages[:-1]))
+                result['cpu_s'] = max(0.0, cpu_s - sum(self.results[s]['cpu_s'] for s in self.stages[:-1]))
+            counts = self.counts(stage)
+            result['llm_calls'] = counts.pop(LLM_KIND)
+            result['network'] = counts
+            stages[stage] = result
+        return stages
+
+
+def _is_loopback(host):
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return host == 'localhost'
+
+
+@contextlib.contextmanager
+def offline_environment(workdir, profiler, market, llm_url=None, settings=None):
+    """
+    Run with synthetic market data, an isolated data directory and no outbound network.
+
+    Inside the block yfinance is answered by `market`, HTTP requests go only to
+    `llm_url` (counted as LLM calls when they hit /api/generate), and any other
+    HTTP request or non-loopback connection is refused and counted. Config file
+    paths point into `workdir`. Everything is restored on exit.
+
+    Args:
+        workdir (str): Scratch directory for portfolio, caches and universes
+        profiler (StageProfiler): Receives the call counts
+        market (OfflineMarket): Source of market data
+        llm_url (str): Base URL of the (mock) LLM server allowed through
+        settings (dict): Further config attributes to override
+    """
+    import importlib
+    import requests
+    import yfinance
+
+    patches = []  # (object, attribute, original)
+
+    def patch(obj, attr, value):
+        patches.append((obj, attr, getattr(obj, attr)))
+        setattr(obj, attr, value)
+
+    original_request = requests.Session.request
+    original_connect = socket.socket.connect
+    original_connect_ex = socket.socket.connect_ex
+    llm_base = llm_url.rstrip('/') if llm_url else None
+
+    def guarded_request(session, method, url, *args, **kwargs):
+        if llm_base and url.startswith(llm_base):
+            if urlsplit(url).path == '/api/generate':
+                profiler.count(LLM_KIND)
+            return original_request(session, method, url, *args, **kwargs)
+        profiler.count('http')
+        raise requests.exceptions.ConnectionError(f"Offline benchmark: blocked request to {urlsplit(url).netloc}")
+
+    def refuse(sock, address):
+        if sock.family in (socket.AF_INET, socket.AF_INET6) and not _is_loopback(address[0]):
+            profiler.count('socket')
+            raise OSError(f"Offline benchmark: blocked connection to {address[0]}")
+
+    def guarded_connect(sock, address):
+        refuse(sock, address)
+        return original_connect(sock, address)
+
+    def guarded_connect_ex(sock, address):
+        refuse(sock, address)
+        return original_connect_ex(sock, address)
+
+    market.on_request = profiler.count
+    patch(yfinance, 'download', market.download)
+    patch(yfinance, 'Ticker', market.ticker)
+    patch(requests.Session, 'request', guarded_request)
+    patch(socket.socket, 'connect', guarded_connect)
+    patch(socket.socket, 'connect_ex', guarded_connect_ex)
+    for name in _PATHS:
+        patch(config, name, os.path.join(workdir, os.path.basename(getattr(config, name))))
+    for name in _DIRS:
+        patch(config, name, os.path.join(workdir, os.path.basename(getattr(config, name))))
+    if llm_url:
+        patch(config, 'AI_PROVIDER', 'local')
+        patch(config, 'LOCAL_AI_URL', llm_base)
+    for name, value in (settings or {}).items():
+        patch(config, name, value)
+    for module, attr in _SINGLETONS:
+        patch(importlib.import_module(module), attr, None)
+    for module, attr in _CACHES:
+        patch(importlib.import_module(module), attr, {})
+    try:
+        yield
+    finally:
+        for obj, attr, value in reversed(patches):
+            setattr(obj, attr, value)
+
+
+def _flatten(results):
+    """(size, stage, metric) -> value for every comparable number in a result file."""
+    rows = {}
+    for size, run in results['runs'].items():
+        for metric in ('wall_s', 'cpu_s', 'peak_rss_mb', 'network_calls', 'llm_calls'):
+            rows[(size, 'total', metric)] = run.get(metric)
+        for stage, result in run['stages'].items():
+            for metric in ('wall_s', 'cpu_s', 'rss_growth_mb', 'llm_calls'):
+                rows[(size, stage, metric)] = result.get(metric)
+            rows[(size, stage, 'network_calls')] = sum(result['network'].values())
+    return rows
+
+
+# Changes smaller than these are noise, whatever the ratio
+MIN_DIFFERENCE = {'wall_s': 0.1, 'cpu_s': 0.1, 'peak_rss_mb': 5.0, 'rss_growth_mb': 5.0, 'network_calls': 1,
+                  'llm_calls': 1}
+
+
+def diff_results(baseline, results, threshold=0.2):
+    """
+    Compare a benchmark run against a baseline.
+
+    Times and memory regress when they grow by more than `threshold` (and by
+    more than MIN_DIFFERENCE); call counts regress on any increase, since the
+    offline environment makes them deterministic.
+
+    Returns:
+        list: Rows (size, stage, metric, baseline, current, change, regressed) for
+              every metric present in both, largest relative change first
+    """
+    before, after = _flatten(baseline), _flatten(results)
+    rows = []
+    for key in sorted(set(before) & set(after)):
+        old, new = before[key], after[key]
+        if old is None or new is None:
+            continue
+        metric = key[2]
+        change = (new - old) / old if old else (0.0 if new == old else float('inf'))
+        if metric.endswith('_calls'):
+            regressed = new >= old + MIN_DIFFERENCE[metric]
+        else:
+            regressed = change > threshold and new - old >= MIN_DIFFERENCE[metric]
+        rows.append(key + (old, new, change, regressed))
+    return sorted(rows, key=lambda row: -abs(row[5]))
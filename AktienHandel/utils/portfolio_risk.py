@@ -0,0 +1,211 @@
+"""
+Portfolio Risk Engine - Covariance-based risk metrics for proposed trades.
+
+Keeps a rolling window of daily closes for held and candidate tickers (fed
+from data the scanner already downloaded) and evaluates VaR/CVaR, beta to
+the benchmark and sector concentration for any number of proposed trades in
+one matrix product, so risk gates add no per-candidate network calls.
+"""
+
+import numpy as np
+import pandas as pd
+from utils.data_loader import fetch_batch_data
+from utils.exposure import get_position_values
+from utils.universe_manager import UniverseManager
+import config
+
+
+MIN_OBSERVATIONS = 20  # Fewer aligned returns than this give no meaningful VaR
+MIN_HISTORY_FRACTION = 0.5  # Tickers with less history than this share of the longest one are left out
+
+
+class PortfolioRiskEngine:
+    """
+    Rolling return history plus vectorized VaR, CVaR, beta and sector checks.
+    """
+
+    def __init__(self, universe_mgr=None):
+        self.universe_mgr = universe_mgr or UniverseManager()
+        self.benchmark_ticker = config.BENCHMARK_TICKER
+        self.window = config.RISK_LOOKBACK_DAYS
+        self.confidence = config.VAR_CONFIDENCE
+        self.closes = {}  # ticker -> pd.Series of the last window+1 closes
+        self.failed = set()  # Tickers whose download returned no usable history (not retried)
+        self._matrix_key = None
+        self._matrix = ([], np.empty((0, 0)))
+
+    def add_series(self, ticker, closes):
+        """
+        Register a close price series (e.g. df['Close'] from a previous download).
+
+        Args:
+            ticker (str): Ticker symbol
+            closes (pd.Series): Close prices indexed by date
+        """
+        closes = closes.dropna().iloc[-(self.window + 1):]
+        if len(closes) < 2:
+            return
+
+        index = pd.DatetimeIndex(closes.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        self.closes[ticker] = pd.Series(closes.to_numpy(dtype=np.float64), index=index.normalize())
+        self._matrix_key = None
+
+    def add_frames(self, data_dict):
+        """Register the 'Close' column of every DataFrame in a ticker -> DataFrame dict."""
+        for ticker, df in data_dict.items():
+            if df is not None and 'Close' in df:
+                self.add_series(ticker, df['Close'])
+
+    def add_panel(self, panel):
+        """Register the closes of every ticker in a PricePanel."""
+        for ticker in panel.tickers:
+            self.add_series(ticker, pd.Series(panel.series(ticker), index=panel.dates))
+
+    def ensure(self, tickers):
+        """
+        Download history for tickers that have none yet, in a single batch request.
+        Tickers that came back without history are remembered and not requested again.
+        """
+        missing = [t for t in dict.fromkeys(tickers) if t not in self.closes and t not in self.failed]
+        if missing:
+            self.add_frames(fetch_batch_data(missing, period="1y"))
+            self.failed.update(t for t in missing if t not in self.closes)
+
+    def return_matrix(self, tickers):
+        """
+        Aligned daily returns for the given tickers (cached until new history arrives).
+        Tickers with much shorter histories (e.g. recent listings) are left out rather
+        than cutting the window of all others down to their length.
+
+        Args:
+            tickers (list): Ticker symbols
+
+        Returns:
+            tuple: (list of tickers with history, T x N ndarray of returns)
+        """
+        key = tuple(tickers)
+        if key == self._matrix_key:
+            return self._matrix
+
+        available = [t for t in key if t in self.closes]
+        if available:
+            longest = max(len(self.closes[t]) for t in available)
+            required = max(MIN_OBSERVATIONS + 1, int(longest * MIN_HISTORY_FRACTION))
+            available = [t for t in available if len(self.closes[t]) >= required] or available
+        if available:
+            aligned = pd.concat([self.closes[t] for t in available], axis=1, join='inner')
+            prices = aligned.to_numpy(dtype=np.float64)[-(self.window + 1):]
+            matrix = prices[1:] / prices[:-1] - 1.0
+        else:
+            matrix = np.empty((0, 0))
+
+        self._matrix_key = key
+        self._matrix = (available, matrix)
+        return self._matrix
+
+    def covariance(self, tickers):
+        """
+        Sample covariance matrix of daily returns.
+
+        Returns:
+            tuple: (list of tickers with history, N x N covariance ndarray)
+        """
+        names, matrix = self.return_matrix(tickers)
+        if len(matrix) < 2:
+            return names, np.zeros((len(names), len(names)))
+        return names, np.atleast_2d(np.cov(matrix, rowvar=False))
+
+    def evaluate_trade(self, portfolio_state, ticker, trade_value):
+        """Risk metrics for a single proposed BUY (see evaluate_trades)."""
+        return self.evaluate_trades(portfolio_state, [ticker], [trade_value])[0]
+
+    def evaluate_trades(self, portfolio_state, tickers, trade_values):
+        """
+        Post-trade risk metrics for each proposed BUY, evaluated independently.
+
+        Each candidate k adds trade_values[k] of exposure to tickers[k] on top of
+        the current holdings. All candidates are scored in one T x N by N x K
+        matrix product of historical returns and position weights.
+
+        Args:
+            portfolio_state (dict): Portfolio state from ExecutionAgent
+            tickers (list): Candidate tickers
+            trade_values (list): Market value to add per candidate
+
+        Returns:
+            list: One dict per candidate with 'var_pct', 'cvar_pct',
+                  'marginal_var_pct', 'marginal_cvar_pct', 'beta',
+                  'marginal_beta', 'sector' and 'sector_pct'. Fractions are
+                  relative to total portfolio value; VaR/beta entries are
+                  None when there is not enough aligned history.
+        """
+        positions = get_position_values(portfolio_state, self.universe_mgr)
+        total_value = portfolio_state.get('total_value', 0) or 1.0
+        trade_values = np.asarray(trade_values, dtype=np.float64)
+
+        results = self._sector_concentration(positions, tickers, trade_values, total_value)
+
+        universe = list(dict.fromkeys(list(positions) + list(tickers) + [self.benchmark_ticker]))
+        self.ensure(universe)
+        names, returns = self.return_matrix(universe)
+        if len(returns) < MIN_OBSERVATIONS:
+            return results
+
+        col = {t: i for i, t in enumerate(names)}
+        current = np.zeros(len(names))
+        for t, value in positions.items():
+            if t in col:
+                current[col[t]] = value
+
+        # Column 0 is the current portfolio, column k+1 the portfolio after trade k
+        weights = np.repeat(current[:, None], len(tickers) + 1, axis=1)
+        for k, t in enumerate(tickers):
+            if t in col:
+                weights[col[t], k + 1] += trade_values[k]
+
+        pnl = returns @ weights
+        var = -np.quantile(pnl, 1.0 - self.confidence, axis=0)
+        tail = pnl <= -var
+        cvar = -(pnl * tail).sum(axis=0) / np.maximum(tail.sum(axis=0), 1)
+
+        beta = np.full(len(tickers) + 1, np.nan)
+        if self.benchmark_ticker in col:
+            centered = returns - returns.mean(axis=0)
+            bench = centered[:, col[self.benchmark_ticker]]
+            bench_var = bench @ bench
+            if bench_var > 0:
+                beta = (centered.T @ bench / bench_var) @ weights / total_value
+
+        for k, result in enumerate(results):
+            result['var_pct'] = float(var[k + 1] / total_value)
+            result['cvar_pct'] = float(cvar[k + 1] / total_value)
+            result['marginal_var_pct'] = float((var[k + 1] - var[0]) / total_value)
+            result['marginal_cvar_pct'] = float((cvar[k + 1] - cvar[0]) / total_value)
+            if not np.isnan(beta[k + 1]):
+                result['beta'] = float(beta[k + 1])
+                result['marginal_beta'] = float(beta[k + 1] - beta[0])
+        return results
+
+    def _sector_concentration(self, positions, tickers, trade_values, total_value):
+        sector_values = {}
+        for t, value in positions.items():
+            sector = self.universe_mgr.get_sector(t)
+            sector_values[sector] = sector_values.get(sector, 0.0) + value
+
+        results = []
+        for t, trade_value in zip(tickers, trade_values):
+            sector = self.universe_mgr.get_sector(t)
+            results.append({
+                'ticker': t,
+                'sector': sector,
+                'sector_pct': float((sector_values.get(sector, 0.0) + trade_value) / total_value),
+                'var_pct': None,
+                'cvar_pct': None,
+                'marginal_var_pct': None,
+                'marginal_cvar_pct': None,
+                'beta': None,
+                'marginal_beta': None
+            })
+        return results
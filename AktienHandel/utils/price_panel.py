@@ -0,0 +1,337 @@
+"""
+Price Panel - Compact columnar OHLCV store for many tickers.
+
+A dict of per-ticker DataFrames repeats the DatetimeIndex for every ticker and
+keeps OHLC as float64. PricePanel keeps one shared date index and one 2-D
+array per field (dates x tickers): float32 for Open/High/Low/Close and int64
+for Volume. The arrays are column-major, so each ticker's series is a
+contiguous slice that is handed out as a zero-copy view. Sessions a ticker did
+not trade are NaN (Volume 0).
+
+Daily OHLCV for 8,000 tickers over 5 years (~1,260 sessions) takes
+8,000 * 1,260 * (4 * 4 + 8) bytes ~= 242 MB.
+
+A panel can be exported as one .npy file per field plus a JSON manifest and
+attached read-only as memory maps, so process-pool workers and separate
+scripts share the same page cache instead of each loading a copy.
+"""
+
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+
+
+MANIFEST_FILE = 'manifest.json'
+PRICE_FIELDS = ('Open', 'High', 'Low', 'Close')
+VOLUME_FIELD = 'Volume'
+FIELDS = PRICE_FIELDS + (VOLUME_FIELD,)
+
+
+def _field_dtype(field):
+    return np.int64 if field == VOLUME_FIELD else np.float32
+
+
+def _naive_index(index):
+    """DatetimeIndex without timezone (local exchange time), so markets share one axis."""
+    index = pd.DatetimeIndex(index)
+    return index.tz_localize(None) if index.tz is not None else index
+
+
+def frames_memory_usage(frames):
+    """Bytes held by a ticker -> DataFrame dict, including every frame's index."""
+    return int(sum(df.memory_usage(index=True, deep=True).sum() for df in frames.values() if df is not None))
+
+
+def read_manifest(directory):
+    """Manifest of an exported panel, or None if the directory has none."""
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class PricePanel:
+    """
+    OHLCV for many tickers on a shared date index.
+    """
+
+    def __init__(self, dates, tickers, arrays):
+        """
+        Args:
+            dates (pd.DatetimeIndex): Sorted date index shared by all tickers (T)
+            tickers (list): Ticker symbols (N)
+            arrays (dict): field -> T x N array (missing fields are filled with NaN / 0)
+        """
+        self.dates = pd.DatetimeIndex(dates)
+        self.tickers = list(tickers)
+        self.manifest = None  # Set when the panel is attached from an export
+        self.columns = {ticker: i for i, ticker in enumerate(self.tickers)}
+        shape = (len(self.dates), len(self.tickers))
+
+        self.arrays = {}
+        for field in FIELDS:
+            dtype = _field_dtype(field)
+            array = arrays.get(field)
+            if array is None:
+                array = np.zeros(shape, dtype) if field == VOLUME_FIELD else np.full(shape, np.nan, dtype)
+            # No copy when the array already has the right dtype and layout (e.g. a memory map)
+            array = np.asarray(array, dtype=dtype, order='F')
+            if array.shape != shape:
+                raise ValueError(f"{field} array has shape {array.shape}, expected {shape}")
+            self.arrays[field] = array
+
+    @classmethod
+    def from_frames(cls, frames):
+        """
+        Build a panel from a ticker -> DataFrame dict (e.g. fetch_batch_data output).
+
+        Args:
+            frames (dict): ticker -> DataFrame with OHLCV columns and a DatetimeIndex
+
+        Returns:
+            PricePanel: Panel over the union of all dates
+        """
+        frames = {t: df for t, df in frames.items() if df is not None and not df.empty}
+        indexes = {t: _naive_index(df.index) for t, df in frames.items()}
+        if indexes:
+            dates = pd.DatetimeIndex(np.unique(np.concatenate([idx.to_numpy() for idx in indexes.values()])))
+        else:
+            dates = pd.DatetimeIndex([])
+
+        tickers = list(frames)
+        shape = (len(dates), len(tickers))
+        arrays = {field: np.zeros(shape, _field_dtype(field), order='F') if field == VOLUME_FIELD
+                  else np.full(shape, np.nan, _field_dtype(field), order='F') for field in FIELDS}
+
+        for j, ticker in enumerate(tickers):
+            df = frames[ticker]
+            rows = dates.get_indexer(indexes[ticker])
+            for field in FIELDS:
+                if field not in df:
+                    continue
+                values = df[field].to_numpy(dtype=np.float64)
+                if field == VOLUME_FIELD:
+                    values = np.nan_to_num(values, nan=0.0)
+                arrays[field][rows, j] = values
+
+        return cls(dates, tickers, arrays)
+
+    @classmethod
+    def concat(cls, panels):
+        """
+        Join panels of different tickers on the union of their dates.
+
+        Args:
+            panels (list): PricePanels (a ticker in several panels keeps its first column)
+
+        Returns:
+            PricePanel: Combined panel
+        """
+        panels = [panel for panel in panels if len(panel)]
+        if len(panels) == 1:
+            return panels[0]
+        if panels:
+            dates = pd.DatetimeIndex(np.unique(np.concatenate([panel.dates.to_numpy() for panel in panels])))
+        else:
+            dates = pd.DatetimeIndex([])
+        tickers = list(dict.fromkeys(t for panel in panels for t in panel.tickers))
+        columns = {ticker: j for j, ticker in enumerate(tickers)}
+        shape = (len(dates), len(tickers))
+        arrays = {field: np.zeros(shape, _field_dtype(field), order='F') if field == VOLUME_FIELD
+                  else np.full(shape, np.nan, _field_dtype(field), order='F') for field in FIELDS}
+
+        filled = set()
+        for panel in panels:
+            rows = dates.get_indexer(panel.dates)
+            for ticker in panel.tickers:
+                if ticker in filled:
+                    continue
+                filled.add(ticker)
+                j = columns[ticker]
+                for field in FIELDS:
+                    arrays[field][rows, j] = panel.series(ticker, field)
+        return cls(dates, tickers, arrays)
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """
+        Build a panel from ticker -> DataFrame dicts arriving one chunk at a time
+        (e.g. successive fetch_batch_data calls). Each chunk is converted to the
+        compact layout as it arrives, so only one chunk of DataFrames is alive at once.
+
+        Args:
+            chunks (iterable): ticker -> DataFrame dicts
+
+        Returns:
+            PricePanel: Panel of every ticker with data
+        """
+        return cls.concat([cls.from_frames(frames) for frames in chunks])
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def __contains__(self, ticker):
+        return ticker in self.columns
+
+    def field(self, field):
+        """Full dates x tickers array of one field."""
+        return self.arrays[field]
+
+    def series(self, ticker, field='Close'):
+        """
+        One ticker's values of a field as a zero-copy view.
+
+        Returns:
+            np.ndarray: Length-T array aligned with self.dates
+        """
+        return self.arrays[field][:, self.columns[ticker]]
+
+    def to_series(self, ticker, field='Close'):
+        """One ticker's field as a pandas Series (a copy), limited to sessions with a close."""
+        values = self.series(ticker, field)
+        traded = ~np.isnan(self.series(ticker, 'Close'))
+        return pd.Series(values[traded], index=self.dates[traded], name=field)
+
+    def view(self, ticker):
+        """Zero-copy views of every field of one ticker (field -> array)."""
+        j = self.columns[ticker]
+        return {field: array[:, j] for field, array in self.arrays.items()}
+
+    def frame(self, ticker):
+        """
+        One ticker as a DataFrame (a copy), limited to sessions with a close.
+        For code that still needs pandas, such as the indicator functions.
+        """
+        view = self.view(ticker)
+        traded = ~np.isnan(view['Close'])
+        return pd.DataFrame({field: values[traded] for field, values in view.items()}, index=self.dates[traded])
+
+    def to_frames(self):
+        """The panel as a ticker -> DataFrame dict in fetch_batch_data format."""
+        return {ticker: self.frame(ticker) for ticker in self.tickers}
+
+    def latest(self, field='Close'):
+        """
+        Last non-NaN value of a price field for every ticker.
+
+        Returns:
+            np.ndarray: Length-N array (NaN for tickers without data)
+        """
+        array = self.arrays[field]
+        if array.shape[0] == 0:
+            return np.full(array.shape[1], np.nan, dtype=array.dtype)
+        valid = ~np.isnan(array)
+        last = array.shape[0] - 1 - np.argmax(valid[::-1], axis=0)
+        values = array[last, np.arange(array.shape[1])]
+        return np.where(valid.any(axis=0), values, np.nan).astype(array.dtype)
+
+    def memory_usage(self):
+        """
+        Bytes per component.
+
+        Returns:
+            dict: field -> bytes, plus 'index' and 'total'
+        """
+        usage = {field: int(array.nbytes) for field, array in self.arrays.items()}
+        usage['index'] = int(self.dates.nbytes)
+        usage['total'] = sum(usage.values())
+        return usage
+
+    def memory_report(self, frames=None):
+        """
+        Human-readable memory summary.
+
+        Args:
+            frames (dict): Optional ticker -> DataFrame dict to compare against
+
+        Returns:
+            str: Report text
+        """
+        usage = self.memory_usage()
+        lines = [f"Price panel: {len(self.tickers)} tickers x {len(self.dates)} sessions"]
+        for name, size in usage.items():
+            if name != 'total':
+                lines.append(f"  {name:<8} {size / 1e6:>10.2f} MB")
+        lines.append(f"  {'total':<8} {usage['total'] / 1e6:>10.2f} MB")
+        if frames is not None:
+            frame_bytes = frames_memory_usage(frames)
+            ratio = frame_bytes / usage['total'] if usage['total'] else 0.0
+            lines.append(f"  DataFrames: {frame_bytes / 1e6:.2f} MB ({ratio:.1f}x the panel)")
+        return "\n".join(lines)
+
+    def save(self, directory, **meta):
+        """
+        Export as memory-mappable .npy files plus a JSON manifest.
+
+        Every export writes a new generation of files and swaps the manifest in
+        atomically last, so readers attached to the previous generation keep a
+        consistent view. Older generations are removed where the OS allows it
+        (mapped files stay readable on POSIX; Windows keeps them until unmapped).
+
+        Args:
+            directory (str): Target directory (created if missing)
+            **meta: Extra manifest entries (e.g. period, interval)
+
+        Returns:
+            dict: The written manifest
+        """
+        os.makedirs(directory, exist_ok=True)
+        generation = str(time.time_ns())
+
+        files = {}
+        for field, array in self.arrays.items():
+            files[field] = f"{field.lower()}.{generation}.npy"
+            np.save(os.path.join(directory, files[field]), np.asfortranarray(array))
+        dates_file = f"dates.{generation}.npy"
+        np.save(os.path.join(directory, dates_file), self.dates.to_numpy(dtype='datetime64[ns]'))
+
+        manifest = {
+            'generation': generation,
+            'created': time.time(),
+            'shape': [len(self.dates), len(self.tickers)],
+            'tickers': self.tickers,
+            'dates': dates_file,
+            'fields': files,
+            'meta': meta,
+        }
+        path = os.path.join(directory, MANIFEST_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(manifest, f)
+        os.replace(path + '.tmp', path)
+
+        for name in os.listdir(directory):
+            if name.endswith('.npy') and f".{generation}." not in name:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+        return manifest
+
+    @classmethod
+    def attach(cls, directory):
+        """
+        Map an exported panel read-only without copying its arrays.
+
+        Args:
+            directory (str): Directory written by save()
+
+        Returns:
+            PricePanel: Panel backed by memory maps, or None if nothing is exported
+        """
+        for _ in range(3):
+            manifest = read_manifest(directory)
+            if manifest is None:
+                return None
+            try:
+                arrays = {field: np.load(os.path.join(directory, name), mmap_mode='r')
+                          for field, name in manifest['fields'].items()}
+                dates = np.load(os.path.join(directory, manifest['dates']))
+            except FileNotFoundError:
+                continue  # A newer export replaced the files between reads; use its manifest
+            panel = cls(dates, manifest['tickers'], arrays)
+            panel.manifest = manifest
+            return panel
+        return None
@@ -0,0 +1,123 @@
+"""
+Rate Limit - Token-bucket throttling and single-flight request coalescing.
+
+TokenBucket caps the outbound request rate per upstream (e.g. Yahoo Finance)
+across all threads of the process. SingleFlight makes concurrent callers that
+ask for the same key share one in-flight call instead of each going upstream.
+"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second on average with bursts of up to `burst`.
+    """
+
+    def __init__(self, rate, burst, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = float(burst)
+        self.updated = clock()
+        self.requests = 0
+        self.waited = 0.0  # total seconds callers spent throttled
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available right now; never blocks."""
+        with self._lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                self.requests += 1
+                return True
+            return False
+
+    def acquire(self, tokens=1):
+        """
+        Block until tokens are available, then take them.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    self.requests += 1
+                    self.waited += waited
+                    return waited
+                delay = (tokens - self.tokens) / self.rate
+            self.sleep(delay)
+            waited += delay
+
+    def stats(self):
+        return {'requests': self.requests, 'throttled_seconds': round(self.waited, 3)}
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.executed = 0
+        self.deduplicated = 0
+        self._inflight = {}  # key -> [Event, result, exception, waiters]
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """
+        Run fn() unless a call for `key` is already in flight, in which case wait for it.
+
+        Args:
+            key (hashable): Identity of the request
+            fn (callable): Performs the request
+
+        Returns:
+            tuple: (result, shared) where shared is True if the result was handed to more than
+                   one caller (the one that ran fn() included)
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._inflight.get(key)
+            if call is None:
+                call = [threading.Event(), None, None, 0]
+                self._inflight[key] = call
+                leader = True
+                self.executed += 1
+            else:
+                leader = False
+                call[3] += 1
+                self.deduplicated += 1
+
+        if not leader:
+            call[0].wait()
+            if call[2] is not None:
+                raise call[2]
+            return call[1], True
+
+        try:
+            call[1] = fn()
+        except Exception as e:
+            call[2] = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]  # No caller can join after this
+            call[0].set()
+        return call[1], call[3] > 0
+
+    def stats(self):
+        return {'calls': self.calls, 'executed': self.executed, 'deduplicated': self.deduplicated}
@@ -0,0 +1,65 @@
+"""
+Simulator - Synthetic OHLCV for load-testing the trading loop.
+
+Prices follow geometric Brownian motion, optionally with Merton jumps
+(Poisson arrivals, normally distributed log jump sizes). All tickers and bars
+are generated in one vectorized pass and returned as a PricePanel, so they can
+be streamed with utils.feeds.PanelFeed exactly like stored data.
+"""
+
+import numpy as np
+import pandas as pd
+from utils.indicators import INTERVAL_MINUTES, periods_per_year
+from utils.price_panel import PricePanel
+
+
+MODELS = ('gbm', 'jump')
+
+
+def synthetic_panel(n_tickers, n_bars, interval='1m', model='gbm', mu=0.08, sigma=0.30,
+                    jump_intensity=5.0, jump_mean=-0.02, jump_std=0.05, seed=None,
+                    start='2024-01-02 09:30', prefix='SIM'):
+    """
+    Generate OHLCV bars for many tickers.
+
+    Args:
+        n_tickers (int): Number of tickers (named SIM00000, SIM00001, ...)
+        n_bars (int): Bars per ticker
+        interval (str): Bar interval, sets the time step (and timestamps)
+        model (str): 'gbm' or 'jump' (GBM plus Merton jumps)
+        mu (float): Annual drift
+        sigma (float): Typical annual volatility (each ticker draws 0.5x - 1.5x of it)
+        jump_intensity (float): Expected jumps per year ('jump' model)
+        jump_mean (float): Mean log jump size
+        jump_std (float): Standard deviation of the log jump size
+        seed (int): Random seed for reproducible runs
+
+    Returns:
+        PricePanel: n_bars x n_tickers panel
+    """
+    if model not in MODELS:
+        raise ValueError(f"Unknown price model: {model} (use one of {MODELS})")
+    rng = np.random.default_rng(seed)
+    dt = 1.0 / periods_per_year(interval)
+    shape = (n_bars, n_tickers)
+
+    sigmas = sigma * rng.uniform(0.5, 1.5, n_tickers)
+    drift = (mu - 0.5 * sigmas ** 2) * dt
+    log_returns = drift + sigmas * np.sqrt(dt) * rng.standard_normal(shape)
+    if model == 'jump':
+        jumps = rng.poisson(jump_intensity * dt, shape)
+        log_returns += jumps * jump_mean + np.sqrt(jumps) * jump_std * rng.standard_normal(shape)
+        # Compensate the drift so jumps do not change the expected return
+        log_returns -= jump_intensity * (np.exp(jump_mean + 0.5 * jump_std ** 2) - 1.0) * dt
+
+    first = rng.uniform(10.0, 500.0, n_tickers)
+    close = first * np.exp(np.cumsum(log_returns, axis=0))
+    open_ = np.vstack([first, close[:-1]])
+    wick = np.abs(rng.standard_normal((2,) + shape)) * sigmas * np.sqrt(dt) * 0.5
+    high = np.maximum(open_, close) * (1.0 + wick[0])
+    low = np.minimum(open_, close) * (1.0 - wick[1])
+    volume = rng.lognormal(np.log(1e4), 0.5, shape)
+
+    dates = pd.date_range(start, periods=n_bars, freq=f"{INTERVAL_MINUTES[interval]}min")
+    tickers = [f"{prefix}{i:05d}" for i in range(n_tickers)]
+    return PricePanel(dates, tickers, {'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume})
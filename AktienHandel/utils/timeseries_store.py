@@ -0,0 +1,116 @@
+"""
+Time Series Store - Append-only fixed-width binary records on disk.
+
+Each record is a row of little-endian float64 fields, the first of which is a
+Unix timestamp. Appends write one record at the end of the file and the
+latest record is read with a single seek, so both are O(1) regardless of how
+much history has been kept. Range reads memory-map the file and binary-search
+the (monotonic) timestamps, touching only the pages that are returned.
+"""
+
+import os
+import time
+import numpy as np
+
+
+class TimeSeriesStore:
+    """
+    Fixed-width float64 records: ('timestamp', *fields).
+    """
+
+    def __init__(self, path, fields):
+        """
+        Args:
+            path (str): Binary file holding the records
+            fields (list): Names of the value columns after 'timestamp'
+        """
+        self.path = path
+        self.fields = list(fields)
+        self.dtype = np.dtype([('timestamp', '<f8')] + [(name, '<f8') for name in self.fields])
+
+    def __len__(self):
+        if not os.path.exists(self.path):
+            return 0
+        return os.path.getsize(self.path) // self.dtype.itemsize
+
+    def append(self, timestamp=None, **values):
+        """
+        Append one record. Missing fields are stored as NaN.
+
+        Args:
+            timestamp (float): Unix timestamp (defaults to now)
+            **values: One value per field
+        """
+        record = np.zeros(1, dtype=self.dtype)
+        record['timestamp'] = time.time() if timestamp is None else timestamp
+        for name in self.fields:
+            record[name] = values.get(name, np.nan)
+
+        self._truncate_partial_record()
+        with open(self.path, 'ab') as f:
+            f.write(record.tobytes())
+        return record[0]
+
+    def last(self):
+        """
+        Read the most recent record.
+
+        Returns:
+            np.void: Record with field access (record['timestamp']) or None if empty
+        """
+        count = len(self)
+        if count == 0:
+            return None
+        with open(self.path, 'rb') as f:
+            f.seek((count - 1) * self.dtype.itemsize)
+            return np.frombuffer(f.read(self.dtype.itemsize), dtype=self.dtype)[0]
+
+    def read(self):
+        """Read all records into a structured array."""
+        if len(self) == 0:
+            return np.zeros(0, dtype=self.dtype)
+        return np.fromfile(self.path, dtype=self.dtype, count=len(self))
+
+    def read_range(self, start=None, end=None):
+        """
+        Records with start <= timestamp <= end as a read-only memory-mapped view.
+
+        Args:
+            start (float or datetime): Inclusive lower bound (None = beginning)
+            end (float or datetime): Inclusive upper bound (None = latest)
+
+        Returns:
+            np.ndarray: Structured array view (no copy) of the matching records
+        """
+        records = self._memmap()
+        timestamps = records['timestamp']
+        lo = 0 if start is None else np.searchsorted(timestamps, _to_timestamp(start), side='left')
+        hi = len(records) if end is None else np.searchsorted(timestamps, _to_timestamp(end), side='right')
+        return records[lo:hi]
+
+    def tail(self, count):
+        """The last `count` records as a memory-mapped view."""
+        records = self._memmap()
+        return records[max(0, len(records) - count):]
+
+    def _memmap(self):
+        count = len(self)
+        if count == 0:
+            return np.zeros(0, dtype=self.dtype)
+        return np.memmap(self.path, dtype=self.dtype, mode='r', shape=(count,))
+
+    def _truncate_partial_record(self):
+        """Drop a trailing partial record left behind by an interrupted write."""
+        if not os.path.exists(self.path):
+            return
+        size = os.path.getsize(self.path)
+        if size % self.dtype.itemsize:
+            with open(self.path, 'r+b') as f:
+                f.truncate(size - size % self.dtype.itemsize)
+
+
+def _to_timestamp(value):
+    """Accept Unix timestamps or datetime-like objects."""
+    if hasattr(value, 'timestamp'):
+        return value.timestamp()
+    return float(value)
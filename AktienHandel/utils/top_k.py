@@ -0,0 +1,64 @@
+"""
+Top K - Bounded min-heap that keeps the K highest-scoring items of a stream.
+
+Pushing is O(log K) and memory is O(K) however many items pass through, so
+screening can rank candidates as they are produced instead of collecting and
+sorting the full list.
+"""
+
+import heapq
+import itertools
+
+
+class TopK:
+    """
+    Keeps the k items with the highest score.
+    """
+
+    def __init__(self, k, key=None):
+        """
+        Args:
+            k (int): Number of items to keep
+            key (callable): Score function (defaults to item['score'])
+        """
+        self.k = k
+        self.key = key or (lambda item: item.get('score', 0))
+        self._heap = []  # (score, sequence, item); sequence breaks ties without comparing items
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, item):
+        """
+        Offer an item.
+
+        Returns:
+            bool: True if the item is now among the top k
+        """
+        if self.k <= 0:
+            return False
+        entry = (self.key(item), next(self._counter), item)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+            return True
+        if entry[0] <= self._heap[0][0]:
+            return False
+        heapq.heapreplace(self._heap, entry)
+        return True
+
+    def extend(self, items):
+        for item in items:
+            self.push(item)
+        return self
+
+    def threshold(self):
+        """Lowest score still kept (None until the heap is full)."""
+        return self._heap[0][0] if len(self._heap) == self.k else None
+
+    def __contains__(self, item):
+        return any(entry[2] is item for entry in self._heap)
+
+    def items(self):
+        """Kept items, highest score first."""
+        return [entry[2] for entry in sorted(self._heap, key=lambda e: (-e[0], e[1]))]
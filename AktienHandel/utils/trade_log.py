@@ -0,0 +1,106 @@
+"""
+Trade Log - Append and tail access to trade_log.csv without parsing the whole file.
+
+Recent trades are read by seeking backwards from the end of the file and
+parsing only the last records. A small ring buffer keeps them in memory and
+is updated on every append, so repeated lookups cost O(N) in the number of
+trades requested, independent of the log size. The buffer is re-read when
+the file size changes underneath it (another process appended).
+
+Records are expected to be single-line CSV rows (as written by append).
+"""
+
+import csv
+import io
+import os
+from collections import deque
+
+
+HEADER = ['Date', 'Ticker', 'Action', 'Quantity', 'Price', 'Total', 'Reason']
+
+
+class TradeLog:
+    """
+    CSV trade log with seek-from-end reads and an in-memory ring buffer.
+    """
+
+    def __init__(self, path, buffer_size=50, block_size=4096):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.block_size = block_size
+        self._recent = None  # deque of row lists, loaded on first use
+        self._size = None  # file size the buffer corresponds to
+        self._header = None
+
+    def ensure_header(self):
+        """Create the log with its header row if it does not exist."""
+        if not os.path.exists(self.path):
+            with open(self.path, 'w', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerow(HEADER)
+
+    def append(self, rows):
+        """
+        Append rows and fsync them.
+
+        Args:
+            rows (list): Row lists in HEADER order
+        """
+        if not rows:
+            return
+        self._sync_buffer()
+        with open(self.path, 'a', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._recent.extend([str(value) for value in row] for row in rows)
+        self._size = os.path.getsize(self.path)
+
+    def tail_rows(self, count):
+        """Last `count` records as lists of strings (header excluded)."""
+        if count <= 0:
+            return []
+        if count > self.buffer_size:
+            return self._read_tail(count)
+        self._sync_buffer()
+        return list(self._recent)[-count:]
+
+    def tail(self, count):
+        """Last `count` records as dicts keyed by the CSV header."""
+        header = self._read_header()
+        return [dict(zip(header, row)) for row in self.tail_rows(count)]
+
+    def _sync_buffer(self):
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if self._recent is None or size != self._size:
+            self._recent = deque(self._read_tail(self.buffer_size), maxlen=self.buffer_size)
+            self._size = size
+
+    def _read_header(self):
+        if self._header is None:
+            if not os.path.exists(self.path):
+                return HEADER
+            with open(self.path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+                self._header = next(csv.reader(f), HEADER)
+        return self._header
+
+    def _read_tail(self, count):
+        """Seek backwards block by block until `count` complete records are covered."""
+        if not os.path.exists(self.path):
+            return []
+
+        with open(self.path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            data = b''
+            # count + 1 newlines guarantee `count` complete lines (or we hit the start)
+            while position > 0 and data.count(b'\n') <= count:
+                step = min(self.block_size, position)
+                position -= step
+                f.seek(position)
+                data = f.read(step) + data
+
+        # The first line is either cut in the middle or, at the file start, the header
+        lines = data.decode('utf-8', errors='replace').splitlines()[1:]
+        rows = [row for row in csv.reader(io.StringIO('\n'.join(lines))) if row]
+        return rows[-count:]
@@ -1,60 +1,177 @@
 """
 Universe Manager - Manages the expanded trading universe of stocks and cryptocurrencies.
+
+Universes are symbol files in config.UNIVERSE_DIR, one per named universe
+(e.g. data/universes/sp500.csv -> UNIVERSE_MODE = 'sp500'). Each file has the
+columns symbol, exchange, asset_class and sector, as CSV or Parquet. Files are
+read once per process into a shared symbol index; dropping in a larger file
+such as russell3000.csv makes it available without code changes.
+
+The index maps every symbol to its metadata (asset class, exchange, currency,
+trading calendar, sector), so all lookups are hash lookups, and crypto_mask
+classifies whole ticker arrays at once.
 """
 
-# Top S&P 500 stocks (representative sample of 100 most liquid)
-SP500_STOCKS = [
-    'AAPL', 'MSFT', 'GOOGL', 'AMZN', 'NVDA', 'META', 'TSLA', 'BRK-B', 'UNH', 'JNJ',
-    'XOM', 'JPM', 'V', 'PG', 'MA', 'HD', 'CVX', 'LLY', 'ABBV', 'MRK',
-    'AVGO', 'PEP', 'KO', 'COST', 'WMT', 'TMO', 'MCD', 'CSCO', 'ACN', 'ABT',
-    'DHR', 'VZ', 'NEE', 'ADBE', 'CRM', 'NKE', 'TXN', 'PM', 'LIN', 'CMCSA',
-    'UPS', 'RTX', 'HON', 'ORCL', 'INTC', 'QCOM', 'AMD', 'INTU', 'AMGN', 'COP',
-    'UNP', 'BMY', 'LOW', 'BA', 'SBUX', 'GE', 'CAT', 'T', 'DE', 'SPGI',
-    'AXP', 'BLK', 'IBM', 'GILD', 'MMM', 'ADI', 'MDLZ', 'ADP', 'TJX', 'SYK',
-    'CVS', 'AMT', 'ISRG', 'BKNG', 'VRTX', 'CI', 'ZTS', 'PLD', 'C', 'TMUS',
-    'MO', 'REGN', 'DUK', 'SO', 'MS', 'MMC', 'BDX', 'PNC', 'GS', 'CB',
-    'EOG', 'SLB', 'USB', 'NOC', 'SCHW', 'FIS', 'ITW', 'EL', 'HCA', 'CL'
-]
-
-# NASDAQ-100 stocks (tech-heavy)
-NASDAQ100_STOCKS = [
-    'AAPL', 'MSFT', 'GOOGL', 'GOOG', 'AMZN', 'NVDA', 'META', 'TSLA', 'AVGO', 'COST',
-    'ASML', 'PEP', 'AZN', 'CSCO', 'ADBE', 'TMUS', 'CMCSA', 'AMD', 'NFLX', 'INTC',
-    'TXN', 'INTU', 'QCOM', 'HON', 'AMGN', 'SBUX', 'AMAT', 'ISRG', 'BKNG', 'ADP',
-    'GILD', 'ADI', 'VRTX', 'REGN', 'MDLZ', 'LRCX', 'MU', 'PYPL', 'PANW', 'CSX',
-    'SNPS', 'CDNS', 'CHTR', 'MELI', 'KLAC', 'MAR', 'ABNB', 'ORLY', 'MNST', 'CRWD',
-    'FTNT', 'ADSK', 'NXPI', 'AEP', 'WDAY', 'MRVL', 'DASH', 'KDP', 'CTAS', 'PAYX',
-    'ROST', 'ODFL', 'PCAR', 'CPRT', 'FAST', 'KHC', 'EA', 'DXCM', 'CEG', 'GEHC',
-    'CTSH', 'EXC', 'VRSK', 'LULU', 'XEL', 'IDXX', 'TEAM', 'CCEP', 'TTD', 'FANG',
-    'CSGP', 'ANSS', 'ZS', 'DDOG', 'ON', 'TTWO', 'BIIB', 'WBD', 'ILMN', 'MDB',
-    'GFS', 'CDW', 'MRNA', 'WBA', 'ARM', 'SMCI', 'DLTR', 'ZM', 'ALGN', 'RIVN'
-]
-
-# Major European stocks (DAX, FTSE)
-EUROPEAN_STOCKS = [
-    'SAP', 'ASML', 'SIE.DE', 'OR.PA', 'MC.PA', 'RMS.PA', 'ALV.DE', 'AI.PA',
-    'SAN.PA', 'ITX.MC', 'IBE.MC', 'ABI.BR', 'SHEL', 'BP', 'VOD', 'GSK',
-    'AZN', 'HSBA.L', 'RIO', 'ULVR.L', 'DGE.L', 'NG.L', 'BARC.L', 'LLOY.L'
-]
-
-# Major Cryptocurrencies (yfinance format with -USD suffix)
-CRYPTOCURRENCIES = [
-    'BTC-USD',   # Bitcoin
-    'ETH-USD',   # Ethereum
-    'BNB-USD',   # Binance Coin
-    'XRP-USD',   # Ripple
-    'ADA-USD',   # Cardano
-    'SOL-USD',   # Solana
-    'DOGE-USD',  # Dogecoin
-    'MATIC-USD', # Polygon
-    'DOT-USD',   # Polkadot
-    'AVAX-USD',  # Avalanche
-    'LINK-USD',  # Chainlink
-    'UNI-USD',   # Uniswap
-    'ATOM-USD',  # Cosmos
-    'LTC-USD',   # Litecoin
-    'XLM-USD',   # Stellar
-]
+import csv
+import os
+import numpy as np
+import config
+
+
+UNIVERSE_FIELDS = ['symbol', 'exchange', 'asset_class', 'sector']
+OPTIONAL_FIELDS = ['currency', 'calendar']  # Derived from the exchange when a file omits them
+
+# Exchange -> (quote currency, trading calendar code)
+EXCHANGES = {
+    'US': ('USD', 'XNYS'),
+    'NYSE': ('USD', 'XNYS'),
+    'NASDAQ': ('USD', 'XNAS'),
+    'XETRA': ('EUR', 'XETR'),
+    'EURONEXT': ('EUR', 'XPAR'),
+    'BME': ('EUR', 'XMAD'),
+    'LSE': ('GBp', 'XLON'),
+    'CRYPTO': ('USD', '24/7'),
+}
+
+# Modes built from several universe files (None = every non-crypto universe)
+COMPOSITE_UNIVERSES = {
+    'us_stocks': ['sp500', 'nasdaq100'],
+    'all': None,
+}
+
+CRYPTO_UNIVERSE = 'crypto'
+
+
+def load_universe_file(path):
+    """
+    Read one universe file.
+
+    Args:
+        path (str): .csv or .parquet file with UNIVERSE_FIELDS columns
+
+    Returns:
+        list: Record dicts (missing fields default to '')
+    """
+    if path.endswith('.parquet'):
+        import pandas as pd
+        try:
+            rows = pd.read_parquet(path).fillna('').astype(str).to_dict('records')
+        except ImportError:
+            print(f"[Universe] Skipping {os.path.basename(path)}: install pyarrow to read Parquet files")
+            return []
+    else:
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+
+    records = []
+    for row in rows:
+        symbol = (row.get('symbol') or '').strip()
+        if symbol:
+            record = {field: (row.get(field) or '').strip() for field in UNIVERSE_FIELDS + OPTIONAL_FIELDS}
+            record['symbol'] = symbol
+            records.append(_complete_record(record))
+    return records
+
+
+def _complete_record(record):
+    """Fill asset class, exchange, currency and calendar that a file left empty."""
+    symbol = record['symbol']
+    if not record.get('asset_class'):
+        record['asset_class'] = 'crypto' if symbol.endswith('-USD') else 'stock'
+    if not record.get('exchange') and record['asset_class'] == 'crypto':
+        record['exchange'] = 'CRYPTO'
+    if not record.get('sector'):
+        record['sector'] = 'Crypto' if record['asset_class'] == 'crypto' else 'Unknown'
+    currency, calendar = EXCHANGES.get(record.get('exchange', ''), ('', ''))
+    record['currency'] = record.get('currency') or currency
+    record['calendar'] = record.get('calendar') or calendar
+    return record
+
+
+class UniverseIndex:
+    """
+    All universe files of a directory: symbol metadata plus named member lists.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.symbols = {}  # symbol -> record (first file that lists it wins)
+        self.members = {}  # universe name -> tuple of symbols in file order
+        self._unions = {}  # tuple of names -> sorted tuple of symbols
+
+        for filename in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+            name, ext = os.path.splitext(filename)
+            if ext not in ('.csv', '.parquet') or name in self.members:
+                continue
+            records = load_universe_file(os.path.join(directory, filename))
+            for record in records:
+                self.symbols.setdefault(record['symbol'], record)
+            self.members[name] = tuple(dict.fromkeys(r['symbol'] for r in records))
+
+        self.crypto_symbols = frozenset(s for s, r in self.symbols.items() if r['asset_class'] == 'crypto')
+        self._listed = np.array(sorted(self.symbols), dtype=str)
+        self._crypto = np.array(sorted(self.crypto_symbols), dtype=str)
+
+    def lookup(self, symbol):
+        """Metadata for a symbol; unlisted symbols get a record inferred from the ticker format."""
+        record = self.symbols.get(symbol)
+        if record is None:
+            record = _complete_record({'symbol': symbol, 'exchange': '', 'asset_class': '', 'sector': ''})
+        return record
+
+    def is_crypto(self, symbol):
+        if symbol in self.symbols:
+            return symbol in self.crypto_symbols
+        return symbol.endswith('-USD')
+
+    def crypto_mask(self, symbols):
+        """
+        Vectorized is_crypto.
+
+        Args:
+            symbols (list or np.ndarray): Tickers
+
+        Returns:
+            np.ndarray: Boolean mask, True for cryptocurrencies
+        """
+        symbols = np.asarray(symbols, dtype=str)
+        if symbols.size == 0:
+            return np.zeros(symbols.shape, dtype=bool)
+        listed = np.isin(symbols, self._listed)
+        return np.where(listed, np.isin(symbols, self._crypto), np.char.endswith(symbols, '-USD'))
+
+    def union(self, names):
+        """Sorted, de-duplicated symbols of several universes (cached per name set)."""
+        key = tuple(sorted(names))
+        if key not in self._unions:
+            symbols = set()
+            for name in key:
+                symbols.update(self.members.get(name, ()))
+            self._unions[key] = tuple(sorted(symbols))
+        return self._unions[key]
+
+    def stock_universes(self):
+        return [name for name in self.members if name != CRYPTO_UNIVERSE]
+
+
+_index_cache = {}
+
+
+def get_index(directory=None):
+    """
+    Shared UniverseIndex for a directory, reloaded only when its files change.
+    """
+    directory = directory or config.UNIVERSE_DIR
+    signature = tuple(
+        (entry.name, entry.stat().st_mtime_ns, entry.stat().st_size)
+        for entry in sorted(os.scandir(directory), key=lambda e: e.name)
+    ) if os.path.isdir(directory) else ()
+
+    cached = _index_cache.get(directory)
+    if cached is None or cached[0] != signature:
+        cached = (signature, UniverseIndex(directory))
+        _index_cache[directory] = cached
+    return cached[1]
 
 
 class UniverseManager:
@@ -62,75 +179,91 @@ class UniverseManager:
     Manages the trading universe - stocks and cryptocurrencies.
     Provides filtering and categorization capabilities.
     """
-    
-    def __init__(self):
-        self.sp500 = SP500_STOCKS
-        self.nasdaq100 = NASDAQ100_STOCKS
-        self.european = EUROPEAN_STOCKS
-        self.crypto = CRYPTOCURRENCIES
-    
+
+    def __init__(self, universe_dir=None):
+        self.index = get_index(universe_dir)
+        self.crypto = list(self.index.members.get(CRYPTO_UNIVERSE, ()))
+
     def get_universe(self, mode='all', enable_crypto=True, custom_list=None):
         """
         Get the trading universe based on configuration.
-        
+
         Args:
-            mode (str): Universe mode - 'all', 'sp500', 'nasdaq100', 'europe', 
-                       'crypto', 'us_stocks', 'custom'
+            mode (str): Universe mode - 'all', 'us_stocks', 'crypto', 'custom' or
+                        the name of any file in UNIVERSE_DIR ('sp500', 'nasdaq100', 'europe', ...)
             enable_crypto (bool): Whether to include cryptocurrencies
             custom_list (list): Custom ticker list (used when mode='custom')
-            
+
         Returns:
             dict: Dictionary with 'stocks' and 'crypto' lists
         """
-        stocks = []
-        crypto = []
-        
+        crypto = self.crypto if enable_crypto else []
+
         if mode == 'custom' and custom_list:
             # Use custom list
-            stocks = [t for t in custom_list if not t.endswith('-USD')]
-            crypto = [t for t in custom_list if t.endswith('-USD')]
-        elif mode == 'sp500':
-            stocks = self.sp500
-        elif mode == 'nasdaq100':
-            stocks = self.nasdaq100
-        elif mode == 'europe':
-            stocks = self.european
-        elif mode == 'crypto':
-            crypto = self.crypto if enable_crypto else []
-        elif mode == 'us_stocks':
-            # Combine SP500 and NASDAQ100, remove duplicates
-            stocks = list(set(self.sp500 + self.nasdaq100))
-        elif mode == 'all':
-            # All stocks across all regions
-            stocks = list(set(self.sp500 + self.nasdaq100 + self.european))
-            crypto = self.crypto if enable_crypto else []
+            stocks = sorted(t for t in set(custom_list) if not self.is_crypto(t))
+            crypto = sorted(t for t in set(custom_list) if self.is_crypto(t)) if enable_crypto else []
+        elif mode == CRYPTO_UNIVERSE:
+            stocks = ()
+        elif mode in COMPOSITE_UNIVERSES:
+            stocks = self.index.union(COMPOSITE_UNIVERSES[mode] or self.index.stock_universes())
+        elif mode in self.index.members:
+            stocks = self.index.union([mode])
         else:
             # Default to US stocks
-            stocks = list(set(self.sp500 + self.nasdaq100))
-        
-        # Add crypto if not already added and enabled
-        if enable_crypto and not crypto and mode != 'crypto':
-            crypto = self.crypto
-        
+            print(f"[Universe] Unknown universe '{mode}', using 'us_stocks'")
+            stocks = self.index.union(COMPOSITE_UNIVERSES['us_stocks'])
+
         return {
-            'stocks': sorted(stocks),
-            'crypto': sorted(crypto) if enable_crypto else []
+            'stocks': list(stocks),
+            'crypto': sorted(crypto)
         }
-    
+
     def get_total_count(self, mode='all', enable_crypto=True):
         """Get total count of tickers in the universe."""
         universe = self.get_universe(mode, enable_crypto)
         return len(universe['stocks']) + len(universe['crypto'])
-    
+
+    def get_info(self, ticker):
+        """
+        Metadata for a ticker.
+
+        Returns:
+            dict: {'symbol', 'exchange', 'asset_class', 'sector', 'currency', 'calendar'}
+                  (inferred from the ticker format if no universe file lists it)
+        """
+        return self.index.lookup(ticker)
+
     def is_crypto(self, ticker):
         """Check if a ticker is a cryptocurrency."""
-        return ticker.endswith('-USD') or ticker in self.crypto
-    
+        return self.index.is_crypto(ticker)
+
+    def crypto_mask(self, tickers):
+        """Boolean numpy mask of which tickers are cryptocurrencies."""
+        return self.index.crypto_mask(tickers)
+
+    def get_currency(self, ticker):
+        """Quote currency (e.g. 'USD', 'EUR', 'GBp')."""
+        return self.index.lookup(ticker)['currency']
+
+    def get_calendar(self, ticker):
+        """Trading calendar code (e.g. 'XNYS', 'XETR', '24/7' for crypto)."""
+        return self.index.lookup(ticker)['calendar']
+
     def get_asset_type(self, ticker):
         """
         Determine asset type.
-        
+
         Returns:
             str: 'crypto' or 'stock'
         """
         return 'crypto' if self.is_crypto(ticker) else 'stock'
+
+    def get_sector(self, ticker):
+        """
+        Determine sector without a network call.
+
+        Returns:
+            str: GICS sector, 'Crypto' for cryptocurrencies or 'Unknown'
+        """
+        return self.index.lookup(ticker)['sector']